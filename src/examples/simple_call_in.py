@@ -2,7 +2,7 @@ import sys
 import logging
 import logging.config
 
-from exosip2ctypes import initialize, Context, call, EventType
+from exosip2ctypes import initialize, Context, call, sdp, EventType
 
 logging.basicConfig(
     level=logging.DEBUG, stream=sys.stdout,
@@ -38,6 +38,8 @@ def on_exosip_event(context, evt):
 
 
 initialize()
+answerer = sdp.SdpAnswerer([('PCMU', 8000), ('PCMA', 8000)], '192.168.56.101', username='jack',
+                           session_name='conversation')
 ctx = Context(event_callback=on_exosip_event)
 # ctx.event_callback = on_exosip_event
 ctx.masquerade_contact('192.168.56.101', 5060)
@@ -64,19 +66,10 @@ while True:
         status = int(s)
         if status == 200:
             with ctx.lock:
+                offer = ctx.get_remote_sdp(latest_event.did)
                 msg = call.Answer(ctx, latest_event.tid, 200)
-                msg.content_type = 'application/sdp'
-                msg.add_body(
-                    "v=0\r\n"
-                    "o=jack 0 0 IN IP4 192.168.56.101\r\n"
-                    "s=conversation\r\n"
-                    "c=IN IP4 192.168.56.101\r\n"
-                    "t=0 0\r\n"
-                    "m=audio 54000 RTP/AVP 0 8 101\r\n"
-                    "a=rtpmap:0 PCMU/8000\r\n"
-                    "a=rtpmap:8 PCMA/8000\r\n"
-                    "a=rtpmap:101 telephone-event/8000\r\n"
-                )
+                msg.content_type = sdp.CONTENT_TYPE
+                msg.add_body(answerer.answer(offer, 54000))
                 ctx.call_send_answer(answer=msg)
         else:
             with ctx.lock:
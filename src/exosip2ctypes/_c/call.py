@@ -11,6 +11,11 @@ from ctypes import c_int, c_void_p, c_char_p, c_size_t
 from . import globs
 from .utils import ExosipFunc
 
+EXOSIP_SUBCRSTATE_UNKNOWN = 0
+EXOSIP_SUBCRSTATE_PENDING = 1
+EXOSIP_SUBCRSTATE_ACTIVE = 2
+EXOSIP_SUBCRSTATE_TERMINATED = 3
+
 
 class FuncCallSetReference(ExosipFunc):
     func_name = 'call_set_reference'
@@ -56,26 +61,26 @@ class FuncCallSendAck(ExosipFunc):
 
 class FuncCallBuildRefer(ExosipFunc):
     func_name = 'call_build_refer'
-    argtypes = [c_void_p, c_int, c_void_p, c_void_p]
+    argtypes = [c_void_p, c_int, c_char_p, c_void_p]
     restype = c_int
 
 
 class FuncCallBuildInfo(ExosipFunc):
     func_name = 'call_build_info'
     argtypes = [c_void_p, c_int, c_void_p]
-    restypes = c_int
+    restype = c_int
 
 
 class FuncCallBuildOptions(ExosipFunc):
     func_name = 'call_build_options'
     argtypes = [c_void_p, c_int, c_void_p]
-    restypes = c_int
+    restype = c_int
 
 
 class FuncCallBuildUpdate(ExosipFunc):
     func_name = 'call_build_update'
     argtypes = [c_void_p, c_int, c_void_p]
-    restypes = c_int
+    restype = c_int
 
 
 class FuncCallBuildNotify(ExosipFunc):
@@ -86,7 +91,7 @@ class FuncCallBuildNotify(ExosipFunc):
 
 class FuncCallSendRequest(ExosipFunc):
     func_name = 'call_send_request'
-    argtypes = [c_void_p, c_int, c_int]
+    argtypes = [c_void_p, c_int, c_void_p]
     restype = c_int
 
 
@@ -6,11 +6,54 @@ eXosip2 configuration API
 
 from __future__ import absolute_import, unicode_literals
 
-from ctypes import POINTER, c_int, c_void_p, c_char_p
+from ctypes import POINTER, Structure, c_int, c_void_p, c_char_p, c_char
 
 from . import globs
 from .utils import ExosipFunc
 
+EXOSIP_OPT_BASE_OPTION = 0
+EXOSIP_OPT_UDP_KEEP_ALIVE = EXOSIP_OPT_BASE_OPTION + 1
+EXOSIP_OPT_UDP_LEARN_PORT = EXOSIP_OPT_BASE_OPTION + 2
+EXOSIP_OPT_USE_RPORT = EXOSIP_OPT_BASE_OPTION + 7
+EXOSIP_OPT_SET_IPV4_FOR_GATEWAY = EXOSIP_OPT_BASE_OPTION + 8
+EXOSIP_OPT_ADD_DNS_CACHE = EXOSIP_OPT_BASE_OPTION + 9
+EXOSIP_OPT_DELETE_DNS_CACHE = EXOSIP_OPT_BASE_OPTION + 10
+EXOSIP_OPT_SET_IPV6_FOR_GATEWAY = EXOSIP_OPT_BASE_OPTION + 12
+EXOSIP_OPT_ADD_ACCOUNT_INFO = EXOSIP_OPT_BASE_OPTION + 13
+EXOSIP_OPT_DNS_CAPABILITIES = EXOSIP_OPT_BASE_OPTION + 14
+EXOSIP_OPT_SET_DSCP = EXOSIP_OPT_BASE_OPTION + 15
+EXOSIP_OPT_REGISTER_WITH_DATE = EXOSIP_OPT_BASE_OPTION + 16
+EXOSIP_OPT_SET_HEADER_USER_AGENT = EXOSIP_OPT_BASE_OPTION + 17
+EXOSIP_OPT_ENABLE_DNS_CACHE = EXOSIP_OPT_BASE_OPTION + 18
+EXOSIP_OPT_ENABLE_AUTOANSWERBYE = EXOSIP_OPT_BASE_OPTION + 19
+EXOSIP_OPT_ENABLE_IPV6 = EXOSIP_OPT_BASE_OPTION + 20
+EXOSIP_OPT_ENABLE_REUSE_TCP_PORT = EXOSIP_OPT_BASE_OPTION + 21
+EXOSIP_OPT_ENABLE_USE_EPHEMERAL_PORT = EXOSIP_OPT_BASE_OPTION + 22
+EXOSIP_OPT_SET_TLS_VERIFY_CERTIFICATE = EXOSIP_OPT_BASE_OPTION + 500
+EXOSIP_OPT_SET_TLS_CLIENT_CERTIFICATE_NAME = EXOSIP_OPT_BASE_OPTION + 502
+EXOSIP_OPT_SET_TLS_SERVER_CERTIFICATE_NAME = EXOSIP_OPT_BASE_OPTION + 503
+
+
+class DnsCache(Structure):
+    """
+    Structure for DNS cache entries (`struct eXosip_dns_cache`)
+    """
+    _fields_ = [
+        ('host', c_char * 1024),  #: host name
+        ('ip', c_char * 256),  #: resolved address
+    ]
+
+
+class AccountInfo(Structure):
+    """
+    Structure for account information (`struct eXosip_account_info`)
+    """
+    _fields_ = [
+        ('proxy', c_char * 1024),  #: proxy url
+        ('nat_ip', c_char * 256),  #: public address seen by the proxy
+        ('nat_port', c_int),  #: public port seen by the proxy
+    ]
+
 
 class FuncMalloc(ExosipFunc):
     func_name = 'malloc'
@@ -57,7 +100,7 @@ class FuncGetVersion(ExosipFunc):
 class FuncSetOption(ExosipFunc):
     func_name = 'set_option'
     argtypes = [c_void_p, c_int, c_void_p]
-    restype = c_char_p
+    restype = c_int
 
 
 class FuncMasqueradeContact(ExosipFunc):
@@ -65,6 +108,12 @@ class FuncMasqueradeContact(ExosipFunc):
     argtypes = [c_void_p, c_char_p, c_int]
 
 
+class FuncResetTransports(ExosipFunc):
+    func_name = 'reset_transports'
+    argtypes = [c_void_p]
+    restype = c_int
+
+
 globs.func_classes.extend([
     FuncMalloc,
     FuncInit,
@@ -76,4 +125,5 @@ globs.func_classes.extend([
     FuncGetVersion,
     FuncSetOption,
     FuncMasqueradeContact,
+    FuncResetTransports,
 ])
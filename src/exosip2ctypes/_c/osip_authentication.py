@@ -0,0 +1,55 @@
+"""
+oSIP authentication headers definition.
+
+(`WWW-Authenticate`, `Proxy-Authenticate`, `Authorization` and `Proxy-Authorization`)
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import Structure, c_char_p
+
+
+class WwwAuthenticate(Structure):
+    """
+    Definition of the WWW-Authenticate header. (also used for Proxy-Authenticate)
+
+    .. note:: Only the leading members of `osip_www_authenticate_t` are described.
+    """
+    _fields_ = [
+        ('auth_type', c_char_p),
+        ('realm', c_char_p),
+        ('domain', c_char_p),
+        ('nonce', c_char_p),
+        ('opaque', c_char_p),
+        ('stale', c_char_p),
+        ('algorithm', c_char_p),
+        ('qop_options', c_char_p),
+    ]
+
+
+ProxyAuthenticate = WwwAuthenticate
+
+
+class Authorization(Structure):
+    """
+    Definition of the Authorization header. (also used for Proxy-Authorization)
+
+    .. note:: Only the leading members of `osip_authorization_t` are described.
+    """
+    _fields_ = [
+        ('auth_type', c_char_p),
+        ('username', c_char_p),
+        ('realm', c_char_p),
+        ('nonce', c_char_p),
+        ('uri', c_char_p),
+        ('response', c_char_p),
+        ('digest', c_char_p),
+        ('algorithm', c_char_p),
+        ('cnonce', c_char_p),
+        ('opaque', c_char_p),
+        ('message_qop', c_char_p),
+        ('nonce_count', c_char_p),
+    ]
+
+
+ProxyAuthorization = Authorization
@@ -4,12 +4,28 @@ oSIP body API.
 
 from __future__ import absolute_import, unicode_literals
 
-from ctypes import POINTER, c_int, c_void_p, c_char_p, c_size_t
+from ctypes import POINTER, Structure, c_int, c_void_p, c_char_p, c_size_t
 
 from . import globs
 from .utils import OsipFunc
 
 
+class Body(Structure):
+    """
+    Structure for holding Body
+    """
+    _fields_ = [
+        #: buffer containing data (`char *`, may contain NUL bytes)
+        ('body', c_void_p),
+        #: length of data
+        ('length', c_size_t),
+        #: List of headers (when mime is used, `osip_list_t *`)
+        ('headers', c_void_p),
+        #: Content-Type (when mime is used, `osip_content_type_t *`)
+        ('content_type', c_void_p),
+    ]
+
+
 class FuncBodyToStr(OsipFunc):
     func_name = 'body_to_str'
     argtypes = [c_void_p, POINTER(c_char_p), POINTER(c_size_t)]
@@ -0,0 +1,19 @@
+"""
+oSIP cseq header definition.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import Structure, c_char_p
+
+
+class CSeq(Structure):
+    """
+    Definition of the CSeq header.
+    """
+    _fields_ = [
+        #: CSeq method
+        ('method', c_char_p),
+        #: CSeq number
+        ('number', c_char_p),
+    ]
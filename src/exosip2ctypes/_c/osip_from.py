@@ -4,12 +4,27 @@ oSIP from header definition.
 
 from __future__ import absolute_import, unicode_literals
 
-from ctypes import POINTER, c_int, c_void_p, c_char_p
+from ctypes import POINTER, Structure, c_int, c_void_p, c_char_p
 
 from . import globs
+from .osip_list import List
 from .utils import OsipFunc
 
 
+class From(Structure):
+    """
+    Definition of the From header. (also used for To, Contact, Route and Record-Route)
+    """
+    _fields_ = [
+        #: Display Name
+        ('displayname', c_char_p),
+        #: url (`osip_uri_t *`)
+        ('url', c_void_p),
+        #: other From parameters
+        ('gen_params', List),
+    ]
+
+
 class FuncFromToStr(OsipFunc):
     func_name = 'from_to_str'
     argtypes = [c_void_p, POINTER(c_char_p)]
@@ -4,7 +4,10 @@ osip_header Struct Reference
 
 from __future__ import absolute_import, unicode_literals
 
-from ctypes import Structure, c_char_p
+from ctypes import Structure, c_char_p, c_void_p
+
+from . import globs
+from .utils import OsipFunc
 
 
 class Header(Structure):
@@ -17,3 +20,13 @@ class Header(Structure):
         #: Value for header
         ('hvalue', c_char_p),
     ]
+
+
+class FuncHeaderFree(OsipFunc):
+    func_name = 'header_free'
+    argtypes = [c_void_p]
+
+
+globs.func_classes.extend([
+    FuncHeaderFree,
+])
@@ -0,0 +1,62 @@
+"""
+oSIP list API.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import POINTER, Structure, c_int, c_void_p
+
+from . import globs
+from .utils import OsipFunc
+
+
+class Node(Structure):
+    """
+    Internal node of an `osip_list_t` chain.
+    """
+    pass
+
+
+Node._fields_ = [
+    #: next node
+    ('next', POINTER(Node)),
+    #: element in current node
+    ('element', c_void_p),
+]
+
+
+class List(Structure):
+    """
+    Structure for referencing a list of elements.
+    """
+    _fields_ = [
+        #: Number of element in the list
+        ('nb_elt', c_int),
+        #: Next node containing element
+        ('node', POINTER(Node)),
+    ]
+
+
+def iter_elements(lst):
+    """Iterate over element pointers of an `osip_list_t` structure, in one pass.
+
+    :param List lst: The list structure (not pointer)
+    :return: Generator of element pointers (`int`)
+    """
+    node = lst.node
+    for _ in range(lst.nb_elt):
+        if not node:
+            break
+        yield node.contents.element
+        node = node.contents.next
+
+
+class FuncListRemove(OsipFunc):
+    func_name = 'list_remove'
+    argtypes = [c_void_p, c_int]
+    restype = c_int
+
+
+globs.func_classes.extend([
+    FuncListRemove,
+])
@@ -0,0 +1,64 @@
+"""
+osip_message Struct Reference
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import Structure, c_char_p, c_int, c_size_t, c_void_p
+
+from .osip_list import List
+
+#: `message_property` value telling oSIP that the message was modified and has to be serialized again
+MESSAGE_PROPERTY_MODIFIED = 2
+
+
+class Message(Structure):
+    """
+    Structure for SIP Message (REQUEST and RESPONSE).
+
+    .. attention:: The layout matches a libosip2 built **without** `MINISIZE`, which is the default build.
+    """
+    _fields_ = [
+        ('sip_version', c_char_p),
+        ('req_uri', c_void_p),
+        ('sip_method', c_char_p),
+        ('status_code', c_int),
+        ('reason_phrase', c_char_p),
+        ('accepts', List),
+        ('accept_encodings', List),
+        ('accept_languages', List),
+        ('alert_infos', List),
+        ('allows', List),
+        ('authentication_infos', List),
+        ('authorizations', List),
+        ('call_id', c_void_p),
+        ('call_infos', List),
+        ('contacts', List),
+        ('content_encodings', List),
+        ('content_length', c_void_p),
+        ('content_type', c_void_p),
+        ('cseq', c_void_p),
+        ('error_infos', List),
+        ('from_', c_void_p),
+        ('mime_version', c_void_p),
+        ('proxy_authenticates', List),
+        ('proxy_authentication_infos', List),
+        ('proxy_authorizations', List),
+        ('record_routes', List),
+        ('routes', List),
+        ('to', c_void_p),
+        ('vias', List),
+        ('www_authenticates', List),
+        #: Other headers
+        ('headers', List),
+        #: List of attachments
+        ('bodies', List),
+        #: internal value
+        ('message_property', c_int),
+        #: internal value
+        ('message', c_char_p),
+        #: internal value
+        ('message_length', c_size_t),
+        #: can be used by upper layer
+        ('application_data', c_void_p),
+    ]
@@ -14,6 +14,30 @@ from .utils import OsipFunc
 from .osip_call_id import CallId
 from .osip_content_length import ContentLength, Allow
 from .osip_header import Header
+from .osip_cseq import CSeq
+
+
+class FuncParserInit(OsipFunc):
+    prefix = ''
+    func_name = 'parser_init'
+    restype = c_int
+
+
+class FuncMessageInit(OsipFunc):
+    func_name = 'message_init'
+    argtypes = [POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageParse(OsipFunc):
+    func_name = 'message_parse'
+    argtypes = [c_void_p, c_char_p, c_size_t]
+    restype = c_int
+
+
+class FuncMessageFree(OsipFunc):
+    func_name = 'message_free'
+    argtypes = [c_void_p]
 
 
 class FuncMessageToStr(OsipFunc):
@@ -129,7 +153,59 @@ class FuncMessageSetAllow(OsipFunc):
     restype = c_int
 
 
+class FuncMessageGetVia(OsipFunc):
+    func_name = 'message_get_via'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageGetRoute(OsipFunc):
+    func_name = 'message_get_route'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageGetRecordRoute(OsipFunc):
+    func_name = 'message_get_record_route'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageGetCSeq(OsipFunc):
+    func_name = 'message_get_cseq'
+    argtypes = [c_void_p]
+    restype = POINTER(CSeq)
+
+
+class FuncMessageGetWwwAuthenticate(OsipFunc):
+    func_name = 'message_get_www_authenticate'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageGetProxyAuthenticate(OsipFunc):
+    func_name = 'message_get_proxy_authenticate'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageGetAuthorization(OsipFunc):
+    func_name = 'message_get_authorization'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncMessageGetProxyAuthorization(OsipFunc):
+    func_name = 'message_get_proxy_authorization'
+    argtypes = [c_void_p, c_int, POINTER(c_void_p)]
+    restype = c_int
+
+
 globs.func_classes.extend([
+    FuncParserInit,
+    FuncMessageInit,
+    FuncMessageParse,
+    FuncMessageFree,
     FuncMessageToStr,
     FuncMessageGetBody,
     FuncMessageSetBody,
@@ -149,4 +225,12 @@ globs.func_classes.extend([
     FuncMessageSetContact,
     FuncMessageGetAllow,
     FuncMessageSetAllow,
+    FuncMessageGetVia,
+    FuncMessageGetRoute,
+    FuncMessageGetRecordRoute,
+    FuncMessageGetCSeq,
+    FuncMessageGetWwwAuthenticate,
+    FuncMessageGetProxyAuthenticate,
+    FuncMessageGetAuthorization,
+    FuncMessageGetProxyAuthorization,
 ])
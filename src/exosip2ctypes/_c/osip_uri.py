@@ -0,0 +1,48 @@
+"""
+oSIP url definition.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import Structure, c_char_p
+
+from .osip_list import List
+
+
+class UriParam(Structure):
+    """
+    SIP url parameter. (also used as generic header parameter `osip_generic_param_t`)
+    """
+    _fields_ = [
+        #: uri parameter name
+        ('gname', c_char_p),
+        #: uri parameter value
+        ('gvalue', c_char_p),
+    ]
+
+
+GenericParam = UriParam
+
+
+class Uri(Structure):
+    """
+    Definition of the url.
+    """
+    _fields_ = [
+        #: Uri Scheme (sip or sips)
+        ('scheme', c_char_p),
+        #: Username
+        ('username', c_char_p),
+        #: Password
+        ('password', c_char_p),
+        #: Domain
+        ('host', c_char_p),
+        #: Port number
+        ('port', c_char_p),
+        #: Uri parameters
+        ('url_params', List),
+        #: Uri headers
+        ('url_headers', List),
+        #: Space for other url schemes. (http, mailto...)
+        ('string', c_char_p),
+    ]
@@ -0,0 +1,29 @@
+"""
+oSIP via header definition.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import Structure, c_char_p
+
+from .osip_list import List
+
+
+class Via(Structure):
+    """
+    Definition of the Via header.
+    """
+    _fields_ = [
+        #: SIP Version
+        ('version', c_char_p),
+        #: Protocol used by SIP Agent
+        ('protocol', c_char_p),
+        #: Host where to send answers
+        ('host', c_char_p),
+        #: Port where to send answers
+        ('port', c_char_p),
+        #: Comments about SIP Agent
+        ('comment', c_char_p),
+        #: Via parameters
+        ('via_params', List),
+    ]
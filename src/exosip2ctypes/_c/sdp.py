@@ -18,6 +18,34 @@ class FuncGetRemoteSdp(ExosipFunc):
     restype = c_void_p
 
 
-globs.func_classes.extend([
+class FuncGetLocalSdp(ExosipFunc):
+    func_name = 'get_local_sdp'
+    argtypes = [c_void_p, c_int]
+    restype = c_void_p
+
+
+class FuncGetRemoteSdpFromTid(ExosipFunc):
+    func_name = 'get_remote_sdp_from_tid'
+    argtypes = [c_void_p, c_int]
+    restype = c_void_p
+
 
+class FuncGetLocalSdpFromTid(ExosipFunc):
+    func_name = 'get_local_sdp_from_tid'
+    argtypes = [c_void_p, c_int]
+    restype = c_void_p
+
+
+class FuncGetSdpInfo(ExosipFunc):
+    func_name = 'get_sdp_info'
+    argtypes = [c_void_p]
+    restype = c_void_p
+
+
+globs.func_classes.extend([
+    FuncGetRemoteSdp,
+    FuncGetLocalSdp,
+    FuncGetRemoteSdpFromTid,
+    FuncGetLocalSdpFromTid,
+    FuncGetSdpInfo,
 ])
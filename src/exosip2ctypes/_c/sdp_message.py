@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+oSIP SDP parser and accessors API.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ctypes import POINTER, c_int, c_void_p, c_char_p
+
+from . import globs
+from .utils import OsipFunc
+
+
+class SdpMessageFunc(OsipFunc):
+    prefix = 'sdp_message_'
+
+
+class FuncInit(SdpMessageFunc):
+    func_name = 'init'
+    argtypes = [POINTER(c_void_p)]
+    restype = c_int
+
+
+class FuncParse(SdpMessageFunc):
+    func_name = 'parse'
+    argtypes = [c_void_p, c_char_p]
+    restype = c_int
+
+
+class FuncToStr(SdpMessageFunc):
+    func_name = 'to_str'
+    argtypes = [c_void_p, POINTER(c_char_p)]
+    restype = c_int
+
+
+class FuncFree(SdpMessageFunc):
+    func_name = 'free'
+    argtypes = [c_void_p]
+
+
+class FuncVVersionGet(SdpMessageFunc):
+    func_name = 'v_version_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncOUsernameGet(SdpMessageFunc):
+    func_name = 'o_username_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncOSessIdGet(SdpMessageFunc):
+    func_name = 'o_sess_id_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncOSessVersionGet(SdpMessageFunc):
+    func_name = 'o_sess_version_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncONettypeGet(SdpMessageFunc):
+    func_name = 'o_nettype_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncOAddrtypeGet(SdpMessageFunc):
+    func_name = 'o_addrtype_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncOAddrGet(SdpMessageFunc):
+    func_name = 'o_addr_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncSNameGet(SdpMessageFunc):
+    func_name = 's_name_get'
+    argtypes = [c_void_p]
+    restype = c_char_p
+
+
+class FuncCNettypeGet(SdpMessageFunc):
+    func_name = 'c_nettype_get'
+    argtypes = [c_void_p, c_int, c_int]
+    restype = c_char_p
+
+
+class FuncCAddrtypeGet(SdpMessageFunc):
+    func_name = 'c_addrtype_get'
+    argtypes = [c_void_p, c_int, c_int]
+    restype = c_char_p
+
+
+class FuncCAddrGet(SdpMessageFunc):
+    func_name = 'c_addr_get'
+    argtypes = [c_void_p, c_int, c_int]
+    restype = c_char_p
+
+
+class FuncEndofMedia(SdpMessageFunc):
+    func_name = 'endof_media'
+    argtypes = [c_void_p, c_int]
+    restype = c_int
+
+
+class FuncMMediaGet(SdpMessageFunc):
+    func_name = 'm_media_get'
+    argtypes = [c_void_p, c_int]
+    restype = c_char_p
+
+
+class FuncMPortGet(SdpMessageFunc):
+    func_name = 'm_port_get'
+    argtypes = [c_void_p, c_int]
+    restype = c_char_p
+
+
+class FuncMNumberOfPortGet(SdpMessageFunc):
+    func_name = 'm_number_of_port_get'
+    argtypes = [c_void_p, c_int]
+    restype = c_char_p
+
+
+class FuncMProtoGet(SdpMessageFunc):
+    func_name = 'm_proto_get'
+    argtypes = [c_void_p, c_int]
+    restype = c_char_p
+
+
+class FuncMPayloadGet(SdpMessageFunc):
+    func_name = 'm_payload_get'
+    argtypes = [c_void_p, c_int, c_int]
+    restype = c_char_p
+
+
+class FuncAAttFieldGet(SdpMessageFunc):
+    func_name = 'a_att_field_get'
+    argtypes = [c_void_p, c_int, c_int]
+    restype = c_char_p
+
+
+class FuncAAttValueGet(SdpMessageFunc):
+    func_name = 'a_att_value_get'
+    argtypes = [c_void_p, c_int, c_int]
+    restype = c_char_p
+
+
+globs.func_classes.extend([
+    FuncInit,
+    FuncParse,
+    FuncToStr,
+    FuncFree,
+    FuncVVersionGet,
+    FuncOUsernameGet,
+    FuncOSessIdGet,
+    FuncOSessVersionGet,
+    FuncONettypeGet,
+    FuncOAddrtypeGet,
+    FuncOAddrGet,
+    FuncSNameGet,
+    FuncCNettypeGet,
+    FuncCAddrtypeGet,
+    FuncCAddrGet,
+    FuncEndofMedia,
+    FuncMMediaGet,
+    FuncMPortGet,
+    FuncMNumberOfPortGet,
+    FuncMProtoGet,
+    FuncMPayloadGet,
+    FuncAAttFieldGet,
+    FuncAAttValueGet,
+])
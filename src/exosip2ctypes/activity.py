@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+
+"""
+Activity of the remotes of TCP/TLS contexts
+
+eXosip does not expose its sockets: whether a TCP/TLS connection is open, closed or reopened cannot be known here.
+:class:`ActivityMonitor` follows the SIP messages of a context instead,
+and keeps one :class:`RemoteActivity` per remote `(transport, host, port)`:
+
+* the remote of an inbound request is its sender, as given by the `received` and `rport` parameters
+  of its top Via (by the Via's host and port when they are absent);
+* the remote of a response to an outbound request is the request's next hop, its first Route or its request URI,
+  as written in the request: host names are not resolved;
+* a remote is *active* from one of its messages, and *idle* after `idle_timeout` seconds without any.
+  The messages of an activity period are likely to share a connection, but eXosip may close or open one at any time;
+* the first response round-trip time is the delay between a request to an idle remote, reported by
+  :meth:`ActivityMonitor.sent`, and the remote's next message. It is only measured for requests reported this way.
+
+Idle remotes are forgotten `forget_after` seconds after they became idle, and at most `max_remotes` are kept.
+
+CRLF keep-alives of TCP/TLS connections are driven by :attr:`option.Option.udp_keep_alive`:
+if they work, busy remotes stay active.
+The monitor closes nothing, :meth:`context.Context.reset_transports` closes all the connections of a context::
+
+    monitor = ActivityMonitor(ctx, idle_timeout=120, keep_alive=30)
+    monitor.bind()
+    ...
+    if monitor.reap() and not monitor.active_count:
+        with ctx.lock:
+            ctx.reset_transports()
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from .event import EventType
+from .listener import parse_destination
+from .option import Option
+from .utils import to_str, _monotonic
+
+__all__ = ['RemoteActivity', 'ActivityStats', 'ActivityMonitor']
+
+_INCOMING_REQUEST_EVENTS = frozenset([
+    EventType.call_invite, EventType.call_reinvite, EventType.call_ack, EventType.call_cancelled,
+    EventType.call_message_new, EventType.call_closed, EventType.message_new, EventType.subscription_notify,
+    EventType.in_subscription_new,
+])
+
+
+class RemoteActivity(object):
+    """Messages with one remote
+    """
+
+    __slots__ = ('transport', 'host', 'port', 'periods', 'messages', 'continued', 'first_seen', 'last_seen',
+                 'active', 'first_response_rtt', '_pending_since')
+
+    def __init__(self, transport, host, port):
+        #: Transport name, upper case
+        self.transport = transport
+        #: Remote host
+        self.host = host
+        #: Remote port
+        self.port = port
+        #: Count of activity periods
+        self.periods = 0
+        #: Count of messages
+        self.messages = 0
+        #: Count of messages while the remote was already active
+        self.continued = 0
+        #: Monotonic time of the first message
+        self.first_seen = None
+        #: Monotonic time of the last message
+        self.last_seen = None
+        #: Is the remote active
+        self.active = False
+        #: Last first response round-trip time, in seconds, `None` if not measured
+        self.first_response_rtt = None
+        self._pending_since = None
+
+    def __repr__(self):
+        return '<RemoteActivity {} {}:{} {}>'.format(
+            self.transport, self.host, self.port, 'active' if self.active else 'idle')
+
+    @property
+    def remote(self):
+        """`(transport, host, port)`
+
+        :rtype: tuple
+        """
+        return self.transport, self.host, self.port
+
+    @property
+    def resumptions(self):
+        """Count of activity periods after the first one
+
+        :rtype: int
+        """
+        return max(self.periods - 1, 0)
+
+
+#: Summary of an :class:`ActivityMonitor`
+ActivityStats = namedtuple('ActivityStats', [
+    'active', 'remotes', 'periods', 'resumptions', 'messages', 'continued_ratio', 'first_response_rtt', 'idled',
+    'forgotten'])
+
+
+class ActivityMonitor(object):
+    """Per remote activity of a context, inferred from its SIP messages
+    """
+
+    def __init__(self, context, idle_timeout=120, keep_alive=None, transports=('TCP', 'TLS'), forget_after=3600,
+                 max_remotes=10000):
+        """
+        :param context.Context context: eXosip context
+        :param float idle_timeout: Seconds without any message after which a remote is idle
+        :param int keep_alive: Interval of keep-alives set by :meth:`bind`, in seconds. `None` to keep the context's
+        :param transports: Followed transports, `None` for all
+        :param float forget_after: Seconds an idle remote is kept
+        :param int max_remotes: Max count of remotes, the least recently seen ones are forgotten beyond
+        """
+        self._context = context
+        self._idle_timeout = float(idle_timeout)
+        self._keep_alive = keep_alive
+        self._transports = frozenset(x.upper() for x in transports) if transports else None
+        self._forget_after = float(forget_after)
+        self._max_remotes = int(max_remotes)
+        # ordered by last message, so that forgetting only looks at its head
+        self._records = OrderedDict()
+        self._idled = 0
+        self._forgotten = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    @property
+    def context(self):
+        """eXosip context
+
+        :rtype: context.Context
+        """
+        return self._context
+
+    @property
+    def idle_timeout(self):
+        """Seconds without any message after which a remote is idle
+
+        :rtype: float
+        """
+        return self._idle_timeout
+
+    @idle_timeout.setter
+    def idle_timeout(self, val):
+        self._idle_timeout = float(val)
+
+    @property
+    def active_count(self):
+        """Count of active remotes
+
+        :rtype: int
+        """
+        return sum(1 for x in list(self._records.values()) if x.active)
+
+    @property
+    def active_by_remote(self):
+        """Active remotes, by `(host, port)`: one per transport
+
+        :rtype: dict
+        """
+        result = {}
+        for record in list(self._records.values()):
+            if record.active:
+                key = record.host, record.port
+                result[key] = result.get(key, 0) + 1
+        return result
+
+    @property
+    def stats(self):
+        """Summary of all remotes. `continued_ratio` is the fraction of messages with an already active remote,
+        `first_response_rtt` the average of the last first response round-trip time of each remote
+
+        :rtype: ActivityStats
+        """
+        with self._lock:
+            records = list(self._records.values())
+        messages = sum(x.messages for x in records)
+        rtts = [x.first_response_rtt for x in records if x.first_response_rtt is not None]
+        return ActivityStats(
+            sum(1 for x in records if x.active),
+            len(records),
+            sum(x.periods for x in records),
+            sum(x.resumptions for x in records),
+            messages,
+            float(sum(x.continued for x in records)) / messages if messages else None,
+            sum(rtts) / len(rtts) if rtts else None,
+            self._idled,
+            self._forgotten,
+        )
+
+    def get(self, transport, host, port):
+        """Activity of a remote
+
+        :rtype: RemoteActivity or None
+        """
+        return self._records.get((transport.upper(), host.lower(), port))
+
+    def bind(self):
+        """Follow the context's events, and set its keep-alive interval if one was given
+        """
+        if self._keep_alive is not None:
+            with self._context.lock:
+                self._context.set_option(Option.udp_keep_alive, self._keep_alive)
+        self._context.add_event_hook(self._hook)
+
+    def unbind(self):
+        """Stop following the context's events
+        """
+        self._context.remove_event_hook(self._hook)
+
+    def _hook(self, context, evt):
+        self.update(evt)
+
+    def sent(self, destination, transport='TCP', now=None):
+        """Report a request sent to a destination, to measure the first response round-trip time of idle remotes
+
+        :param str destination: SIP URI, or `host[:port]`, of the request's next hop
+        :param str transport: Transport name
+        :param float now: Monotonic time, default is now
+        """
+        host, port, _ = parse_destination(destination)
+        transport = transport.upper()
+        if self._transports is not None and transport not in self._transports:
+            return
+        if now is None:
+            now = _monotonic()
+        with self._lock:
+            record = self._record(transport, host, port or _default_port(transport))
+            if record._pending_since is None and not self._is_active(record, now):
+                record._pending_since = now
+
+    def update(self, evt, now=None):
+        """Account the message of an event
+
+        :param event.Event evt: Event
+        :param float now: Monotonic time, default is now
+        """
+        remote = _remote_of(evt)
+        if remote is None:
+            return
+        transport, host, port = remote
+        if self._transports is not None and transport not in self._transports:
+            return
+        self.touch(transport, host, port, now)
+
+    def touch(self, transport, host, port, now=None):
+        """Account a message with a remote
+
+        :param str transport: Transport name
+        :param str host: Remote host
+        :param int port: Remote port
+        :param float now: Monotonic time, default is now
+        :rtype: RemoteActivity
+        """
+        if now is None:
+            now = _monotonic()
+        with self._lock:
+            record = self._record(transport.upper(), host.lower(), port)
+            if record.active and not self._is_active(record, now):
+                record.active = False
+                self._idled += 1
+            if record.active:
+                record.continued += 1
+            else:
+                record.active = True
+                record.periods += 1
+                if record._pending_since is not None:
+                    record.first_response_rtt = now - record._pending_since
+                    record._pending_since = None
+            record.messages += 1
+            if record.first_seen is None:
+                record.first_seen = now
+            record.last_seen = now
+            del self._records[record.remote]
+            self._records[record.remote] = record
+            self._forget(now)
+        return record
+
+    def reap(self, now=None):
+        """Mark the remotes without any message for more than :attr:`idle_timeout` as idle,
+        and forget the ones idle for more than `forget_after`
+
+        Nothing is closed: eXosip's connections are not known.
+
+        :param float now: Monotonic time, default is now
+        :return: Remotes which became idle
+        :rtype: list(RemoteActivity)
+        """
+        if now is None:
+            now = _monotonic()
+        with self._lock:
+            idled = [x for x in self._records.values() if x.active and not self._is_active(x, now)]
+            for record in idled:
+                record.active = False
+            self._idled += len(idled)
+            self._forget(now)
+        return idled
+
+    def clear(self):
+        """Forget all remotes
+        """
+        with self._lock:
+            self._records = OrderedDict()
+            self._idled = self._forgotten = 0
+
+    def _is_active(self, record, now):
+        return record.active and now - record.last_seen <= self._idle_timeout
+
+    def _record(self, transport, host, port):
+        key = transport, host, port
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = RemoteActivity(transport, host, port)
+        return record
+
+    def _forget(self, now):
+        deadline = now - self._idle_timeout - self._forget_after
+        while self._records:
+            record = next(iter(self._records.values()))
+            if len(self._records) <= self._max_remotes:
+                seen = record.last_seen if record.last_seen is not None else record._pending_since
+                if seen is None or seen > deadline:
+                    break
+            del self._records[record.remote]
+            self._forgotten += 1
+
+
+def _default_port(transport):
+    return 5061 if transport == 'TLS' else 5060
+
+
+def _remote_of(evt):
+    request = evt.request
+    if request is None:
+        return None
+    via = request.via
+    if via is None or not via.protocol:
+        return None
+    transport = via.protocol.upper()
+    if evt.type in _INCOMING_REQUEST_EVENTS:
+        # inbound request, answered or not: the remote is its sender, as seen by the top Via
+        host = via.received or via.host
+        if not host:
+            return None
+        return transport, to_str(host).lower(), via.rport or via.port or _default_port(transport)
+    if evt.response is not None:
+        # response to an outbound request: the remote is its next hop
+        routes = request.routes
+        uri = routes[0].uri if routes else request.request_uri
+        if uri is None or not uri.host:
+            return None
+        return transport, to_str(uri.host).lower(), uri.port or _default_port(transport)
+    return None
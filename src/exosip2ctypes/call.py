@@ -11,18 +11,33 @@ This file provide the API needed to control calls. You can use it to:
 
 This API can be used to build the following messages:
    INVITE, INFO, OPTIONS, REFER, UPDATE, NOTIFY
+
+:func:`send_requests` sends a request in many dialogs at once.
+
+:class:`CallRegistry` keeps track of the calls, out of the context's events.
 """
 
 from __future__ import absolute_import, unicode_literals
 
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from ctypes import byref, create_string_buffer, c_void_p, c_int
 
+from enum import IntEnum
+
 from ._c import call
-from .error import raise_if_osip_error
+from .error import raise_if_osip_error, OsipError
+from .event import EventType
 from .message import ExosipMessage
 from .utils import to_bytes
 
-__all__ = ['InitInvite', 'Ack', 'Answer']
+__all__ = ['InitInvite', 'Ack', 'Answer', 'Request', 'Info', 'Options', 'Update', 'Refer', 'Notify', 'Prack',
+           'SubscriptionState', 'BulkResult', 'send_requests', 'CallState', 'CallRecord', 'CallRegistry',
+           'DTMF_RELAY_CONTENT_TYPE']
+
+#: Content-Type of RFC 2976 DTMF INFO bodies
+DTMF_RELAY_CONTENT_TYPE = 'application/dtmf-relay'
 
 
 class InitInvite(ExosipMessage):
@@ -162,3 +177,584 @@ class Answer(ExosipMessage):
         error_code = call.FuncCallSendAnswer.c_func(
             self.context.ptr, c_int(self._tid), c_int(self._status), self.ptr)
         raise_if_osip_error(error_code)
+
+
+class Request(ExosipMessage):
+    """default request within a call.
+    """
+
+    def __init__(self, context, did, method=None):
+        """Build a default request within a call.
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        :param str method: request type to build, eg `INFO`. Subclasses which build a given request ignore it.
+        :raises ValueError: if `method` is empty
+        """
+        ptr = c_void_p()  # osip_message_t *request = NULL;
+        err_code = self._build(context, c_int(did), method, byref(ptr))
+        raise_if_osip_error(err_code)
+        super(Request, self).__init__(ptr, context)
+        self._did = did
+
+    @staticmethod
+    def _build(context, did, method, p_ptr):
+        if not method:
+            raise ValueError('"method" of a request must not be empty')
+        return call.FuncCallBuildRequest.c_func(context.ptr, did, create_string_buffer(to_bytes(method)), p_ptr)
+
+    @property
+    def did(self):
+        """
+        :return: dialog id of call.
+        :rtype: int
+        """
+        return self._did
+
+    def send(self, future=False):
+        """Send the request within call.
+
+        :param bool future: Return a future of the final response instead of the transaction id
+        :return: id of the new transaction, or a :class:`transaction.TransactionFuture`
+        """
+        return self.context.call_send_request(self._did, self, future)
+
+
+class Info(Request):
+    """default INFO within a call.
+    """
+
+    def __init__(self, context, did):
+        """Build a default INFO within a call.
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        """
+        super(Info, self).__init__(context, did)
+
+    @staticmethod
+    def _build(context, did, method, p_ptr):
+        return call.FuncCallBuildInfo.c_func(context.ptr, did, p_ptr)
+
+    @classmethod
+    def dtmf(cls, context, did, signal, duration=160):
+        """Build an RFC 2976 DTMF INFO (`application/dtmf-relay`)
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        :param str signal: DTMF digit, one of `0-9`, `*`, `#`, `A-D`
+        :param int duration: Duration in milliseconds
+        :rtype: Info
+        """
+        msg = cls(context, did)
+        msg.content_type = DTMF_RELAY_CONTENT_TYPE
+        msg.add_body('Signal={}\r\nDuration={:d}\r\n'.format(signal, int(duration)))
+        return msg
+
+
+class Options(Request):
+    """default OPTIONS within a call.
+    """
+
+    def __init__(self, context, did):
+        """Build a default OPTIONS within a call.
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        """
+        super(Options, self).__init__(context, did)
+
+    @staticmethod
+    def _build(context, did, method, p_ptr):
+        return call.FuncCallBuildOptions.c_func(context.ptr, did, p_ptr)
+
+
+class Update(Request):
+    """default UPDATE within a call.
+    """
+
+    def __init__(self, context, did):
+        """Build a default UPDATE within a call.
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        """
+        super(Update, self).__init__(context, did)
+
+    @staticmethod
+    def _build(context, did, method, p_ptr):
+        return call.FuncCallBuildUpdate.c_func(context.ptr, did, p_ptr)
+
+
+class Refer(Request):
+    """default REFER within a call.
+    """
+
+    def __init__(self, context, did, refer_to):
+        """Build a default REFER within a call.
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        :param str refer_to: url for call transfer (Refer-To header).
+        """
+        self._refer_to = refer_to
+        super(Refer, self).__init__(context, did, refer_to)
+
+    @staticmethod
+    def _build(context, did, refer_to, p_ptr):
+        return call.FuncCallBuildRefer.c_func(context.ptr, did, create_string_buffer(to_bytes(refer_to)), p_ptr)
+
+    @property
+    def refer_to(self):
+        """url for call transfer.
+
+        :rtype: str
+        """
+        return self._refer_to
+
+
+class SubscriptionState(IntEnum):
+    """Enumeration of subscription states, for :class:`Notify`
+    """
+
+    unknown = call.EXOSIP_SUBCRSTATE_UNKNOWN
+    pending = call.EXOSIP_SUBCRSTATE_PENDING
+    active = call.EXOSIP_SUBCRSTATE_ACTIVE
+    terminated = call.EXOSIP_SUBCRSTATE_TERMINATED
+
+
+class Notify(Request):
+    """default NOTIFY within a call.
+    """
+
+    def __init__(self, context, did, subscription_status=SubscriptionState.active):
+        """Build a default NOTIFY within a call.
+
+        :param Context context: eXosip instance.
+        :param int did: dialog id of call.
+        :param SubscriptionState subscription_status: Subscription status of the request.
+        """
+        self._subscription_status = SubscriptionState(subscription_status)
+        super(Notify, self).__init__(context, did, self._subscription_status)
+
+    @staticmethod
+    def _build(context, did, subscription_status, p_ptr):
+        return call.FuncCallBuildNotify.c_func(context.ptr, did, c_int(subscription_status), p_ptr)
+
+    @property
+    def subscription_status(self):
+        """Subscription status of the request.
+
+        :rtype: SubscriptionState
+        """
+        return self._subscription_status
+
+
+class Prack(ExosipMessage):
+    """default PRACK for a 1xx reliable provisional response received.
+    """
+
+    def __init__(self, context, tid):
+        """Build a default PRACK for a 1xx received.
+
+        :param Context context: eXosip instance.
+        :param int tid: id of the INVITE transaction.
+        """
+        ptr = c_void_p()  # osip_message_t *prack = NULL;
+        err_code = call.FuncCallBuildPrack.c_func(context.ptr, c_int(tid), byref(ptr))
+        raise_if_osip_error(err_code)
+        super(Prack, self).__init__(ptr, context)
+        self._tid = tid
+
+    @property
+    def tid(self):
+        """
+        :return: id of the INVITE transaction.
+        :rtype: int
+        """
+        return self._tid
+
+    def send(self):
+        """Send the PRACK.
+        """
+        error_code = call.FuncCallSendPrack.c_func(self.context.ptr, c_int(self._tid), self.ptr)
+        raise_if_osip_error(error_code)
+
+
+class BulkResult(namedtuple('BulkResult', ['did', 'tid', 'error'])):
+    """Result of :func:`send_requests` for a dialog: transaction id on success, else the error
+    """
+    __slots__ = ()
+
+
+def send_requests(context, dids, build=Options):
+    """Build and send a request in each of many dialogs, under one acquisition of the context lock
+
+    :param Context context: eXosip instance.
+    :param dids: dialog ids of calls
+    :param callable build: Called as ``build(context, did)`` to build each request,
+        default is :class:`Options` for keepalive. eg, RFC 2976 DTMF::
+
+            send_requests(ctx, dids, lambda c, did: Info.dtmf(c, did, '5'))
+
+    :return: A :class:`BulkResult` per dialog, in order. Failures do not stop the burst.
+    :rtype: list
+    """
+    results = []
+    with context.lock:
+        for did in dids:
+            try:
+                tid = context.call_send_request(did, build(context, did))
+            except OsipError as err:
+                results.append(BulkResult(did, None, err))
+            else:
+                results.append(BulkResult(did, tid, None))
+    return results
+
+
+class CallState(IntEnum):
+    """Enumeration of call states tracked by :class:`CallRegistry`
+    """
+
+    #: INVITE sent, no response yet
+    calling = 0
+    #: INVITE received, not answered yet
+    incoming = 1
+    #: 1xx (other than 180) received
+    proceeding = 2
+    #: 180 received
+    ringing = 3
+    #: 2xx sent or received
+    established = 4
+    #: call failed, cancelled or closed, waiting for eXosip to release it
+    terminated = 5
+
+
+_EVENT_STATES = {
+    EventType.call_invite: CallState.incoming,
+    EventType.call_proceeding: CallState.proceeding,
+    EventType.call_ringing: CallState.ringing,
+    EventType.call_answered: CallState.established,
+    EventType.call_ack: CallState.established,
+    EventType.call_noanswer: CallState.terminated,
+    EventType.call_redirected: CallState.terminated,
+    EventType.call_requestfailure: CallState.terminated,
+    EventType.call_serverfailure: CallState.terminated,
+    EventType.call_globalfailure: CallState.terminated,
+    EventType.call_cancelled: CallState.terminated,
+    EventType.call_closed: CallState.terminated,
+}
+
+# states reached by the retried INVITE of a call, after its challenge or redirection
+_RETRY_STATES = frozenset([CallState.proceeding, CallState.ringing, CallState.established])
+
+_AUTH_CHALLENGES = (401, 407)
+
+_CALL_EVENTS = frozenset(t for t in EventType if t.name.startswith('call_'))
+
+
+class CallRecord(object):
+    """Record of a call in :class:`CallRegistry`
+
+    .. attention:: Records are updated by the registry, treat them as read-only.
+    """
+
+    __slots__ = ('cid', 'did', 'call_id', 'state', 'created', 'updated', 'last_tid', '_challenged', '_redirected')
+
+    def __init__(self, cid, did=0, call_id=None, state=CallState.calling, created=None, last_tid=0):
+        #: Call id
+        self.cid = cid
+        #: Id of the dialog last reported for the call, `0` if none yet
+        self.did = did
+        #: Call-ID header value
+        self.call_id = call_id
+        #: :class:`CallState` of the call
+        self.state = state
+        #: Creation time of the record (seconds since the epoch)
+        self.created = time.time() if created is None else created
+        #: Time of the last update
+        self.updated = self.created
+        #: Id of the last transaction reported for the call
+        self.last_tid = last_tid
+        self._challenged = False
+        self._redirected = False
+
+    def __repr__(self):
+        return '<CallRecord cid:{} did:{} call_id:{!r} state:{}>'.format(
+            self.cid, self.did, self.call_id, self.state.name)
+
+
+class CallRegistry(object):
+    """Registry of the calls in an eXosip context
+
+    Once bound to a context, the registry follows call events in the event loop thread:
+    a :class:`CallRecord` is created on the first event of a call,
+    its state, dialog and last transaction are updated on the next ones,
+    and it is removed on :attr:`event.EventType.call_released`.
+    The first `401`/`407` challenge and the first redirection of a call do not terminate it:
+    eXosip retries the INVITE with the same call id.
+
+    Records are indexed by call id, dialog id and Call-ID, all lookups are `O(1)`.
+
+    Should a `call_released` event be missed, records expire:
+    terminated calls after `linger` seconds, others after `ttl` seconds without any event.
+    Expiration is checked on every event, from the oldest records only,
+    so it costs `O(1)` per event (amortized).
+
+    eg::
+
+        calls = CallRegistry()
+        calls.bind(ctx)
+        # elsewhere
+        record = calls.get_by_call_id(call_id)
+        if record:
+            with ctx.lock:
+                ctx.call_terminate(record.cid, record.did)
+    """
+
+    def __init__(self, ttl=7200, linger=32, maxsize=None):
+        """
+        :param float ttl: Seconds a call without any event is kept
+        :param float linger: Seconds a terminated call is kept, waiting for its `call_released` event
+        :param int maxsize: Max count of records, the least recently updated ones are evicted beyond. `None` is unlimited.
+        """
+        self._ttl = float(ttl)
+        self._linger = float(linger)
+        self._maxsize = maxsize
+        # both ordered by update time, so that expiring only looks at their heads
+        self._active = OrderedDict()
+        self._terminated = OrderedDict()
+        self._by_did = {}
+        self._by_call_id = {}
+        self._lock = threading.Lock()
+        self._expirations = 0
+
+    def __len__(self):
+        return len(self._active) + len(self._terminated)
+
+    def __contains__(self, cid):
+        return cid in self._active or cid in self._terminated
+
+    def __iter__(self):
+        with self._lock:
+            records = list(self._active.values()) + list(self._terminated.values())
+        return iter(records)
+
+    @property
+    def expirations(self):
+        """Count of records removed by expiration or eviction, instead of `call_released`
+
+        :rtype: int
+        """
+        return self._expirations
+
+    def bind(self, context):
+        """Follow the call events of a context
+
+        :param context.Context context: eXosip context
+        """
+        context.add_event_hook(self._on_event)
+
+    def unbind(self, context):
+        """Stop following the call events of a context
+
+        :param context.Context context: eXosip context
+        """
+        context.remove_event_hook(self._on_event)
+
+    def _on_event(self, context, evt):
+        if evt.type in _CALL_EVENTS and evt.cid > 0:
+            self.update(evt)
+
+    def get(self, cid):
+        """Record of a call
+
+        :param int cid: Call id
+        :rtype: CallRecord or None
+        """
+        record = self._active.get(cid)
+        if record is None:
+            record = self._terminated.get(cid)
+        return record
+
+    def get_by_did(self, did):
+        """Record of the call of a dialog
+
+        :param int did: Dialog id
+        :rtype: CallRecord or None
+        """
+        return self._by_did.get(did)
+
+    def get_by_call_id(self, call_id):
+        """Record of a call by its Call-ID
+
+        :param str call_id: Call-ID header value
+        :rtype: CallRecord or None
+        """
+        return self._by_call_id.get(call_id)
+
+    def add(self, cid, call_id=None, did=0):
+        """Add a call, if not added yet
+
+        Calls are added from their events, but an application can add outgoing calls as soon as the INVITE is sent.
+
+        :param int cid: Call id, as returned by :meth:`context.Context.call_send_init_invite`
+        :param str call_id: Call-ID header value
+        :param int did: Dialog id
+        :return: The call's record
+        :rtype: CallRecord
+        """
+        with self._lock:
+            record = self.get(cid)
+            if record is None:
+                record = CallRecord(cid, did, call_id)
+                self._insert(record)
+            return record
+
+    def update(self, evt):
+        """Update the registry from a call event
+
+        It is called in the event loop thread once the registry is bound to a context.
+
+        :param event.Event evt: Call event
+        :return: The call's record, `None` if the call was released
+        :rtype: CallRecord or None
+        """
+        cid = evt.cid
+        if evt.type == EventType.call_released:
+            self.remove(cid)
+            return None
+        now = time.time()
+        with self._lock:
+            record = self.get(cid)
+            if record is None:
+                record = CallRecord(cid, created=now)
+                record.call_id = _call_id_of(evt)
+                self._insert(record)
+            else:
+                record.updated = now
+                self._touch(record)
+                if record.call_id is None:
+                    record.call_id = _call_id_of(evt)
+                    if record.call_id:
+                        self._by_call_id[record.call_id] = record
+            if evt.did > 0 and evt.did != record.did:
+                if self._by_did.get(record.did) is record:
+                    del self._by_did[record.did]
+                record.did = evt.did
+                self._by_did[evt.did] = record
+            if evt.tid > 0:
+                record.last_tid = evt.tid
+            state = _EVENT_STATES.get(evt.type)
+            if state == CallState.terminated and _retried(record, evt):
+                state = None
+            if state is not None and state != record.state:
+                if record.state != CallState.terminated:
+                    record.state = state
+                    if state == CallState.terminated:
+                        self._active.pop(cid, None)
+                        self._terminated[cid] = record
+                elif state in _RETRY_STATES:
+                    # the call went on after a failure taken as final
+                    record.state = state
+                    self._terminated.pop(cid, None)
+                    self._active[cid] = record
+            self._expire(now)
+        return record
+
+    def remove(self, cid):
+        """Remove a call
+
+        :param int cid: Call id
+        :return: The removed record
+        :rtype: CallRecord or None
+        """
+        with self._lock:
+            return self._remove(cid)
+
+    def expire(self, now=None):
+        """Remove expired records
+
+        :param float now: Current time, default is :func:`time.time`
+        :return: Count of removed records
+        :rtype: int
+        """
+        with self._lock:
+            n = self._expirations
+            self._expire(time.time() if now is None else now)
+            return self._expirations - n
+
+    def clear(self):
+        """Remove all records
+        """
+        with self._lock:
+            self._active.clear()
+            self._terminated.clear()
+            self._by_did.clear()
+            self._by_call_id.clear()
+
+    def _insert(self, record):
+        if record.state == CallState.terminated:
+            self._terminated[record.cid] = record
+        else:
+            self._active[record.cid] = record
+        if record.did > 0:
+            self._by_did[record.did] = record
+        if record.call_id:
+            self._by_call_id[record.call_id] = record
+        if self._maxsize is not None:
+            while len(self) > self._maxsize:
+                table = self._terminated or self._active
+                self._remove(next(iter(table)))
+                self._expirations += 1
+
+    def _touch(self, record):
+        table = self._terminated if record.state == CallState.terminated else self._active
+        del table[record.cid]
+        table[record.cid] = record
+
+    def _remove(self, cid):
+        record = self._active.pop(cid, None)
+        if record is None:
+            record = self._terminated.pop(cid, None)
+            if record is None:
+                return None
+        if self._by_did.get(record.did) is record:
+            del self._by_did[record.did]
+        if record.call_id and self._by_call_id.get(record.call_id) is record:
+            del self._by_call_id[record.call_id]
+        return record
+
+    def _expire(self, now):
+        for table, timeout in ((self._terminated, self._linger), (self._active, self._ttl)):
+            deadline = now - timeout
+            while table:
+                record = next(iter(table.values()))
+                if record.updated > deadline:
+                    break
+                self._remove(record.cid)
+                self._expirations += 1
+
+
+def _retried(record, evt):
+    # eXosip's automatic action retries the INVITE of a call after its first authentication challenge,
+    # and after its first redirection, with the same call id, so that failure is not final.
+    status_code = evt.response.status_code if evt.response is not None else None
+    if evt.type == EventType.call_requestfailure and status_code in _AUTH_CHALLENGES:
+        if record._challenged:
+            return False
+        record._challenged = True
+        return True
+    if evt.type == EventType.call_redirected:
+        if record._redirected:
+            return False
+        record._redirected = True
+        return True
+    return False
+
+
+def _call_id_of(evt):
+    msg = evt.request or evt.response
+    if msg is None:
+        return None
+    return msg.call_id
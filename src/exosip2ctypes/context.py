@@ -10,15 +10,24 @@ import sys
 import platform
 import socket
 import threading
-from ctypes import c_char_p, c_int, create_string_buffer
+import time
+from itertools import islice
+from ctypes import c_char_p, c_int, c_void_p, create_string_buffer
 from multiprocessing import cpu_count
 from concurrent.futures import ThreadPoolExecutor
 
-from ._c import conf, event, authentication, call
+from ._c import conf, event, authentication, call, sdp
 from ._c.lib import DLL_NAME
-from .error import MallocError, raise_if_osip_error
-from .event import Event
-from .utils import to_str, to_bytes, LoggerMixin
+from .call import CallState
+from .credential import Credential
+from .error import MallocError, OsipError, raise_if_osip_error
+from .event import Event, EventType
+from .guard import FloodGuard
+from .option import Option, to_option, validate_option, is_action, to_c_arg
+from .responder import AutoResponder, AutoResponse
+from .sdp import SdpMessage
+from .transaction import TransactionTracker
+from .utils import to_str, to_bytes, LoggerMixin, HandleTable
 from .version import get_library_version
 
 __all__ = ['Context', 'ContextLock']
@@ -32,7 +41,7 @@ class BaseContext(object):
 
 class Context(BaseContext, LoggerMixin):
 
-    def __init__(self, event_callback=None):
+    def __init__(self, event_callback=None, profile=None):
         """Allocate and Initiate an eXosip context.
 
         :param callable event_callback: Event callback.
@@ -49,6 +58,8 @@ class Context(BaseContext, LoggerMixin):
             It has two parameters:
                 * :class:`Context` : eXosip context on which the event happened.
                 * :class:`Event` : The event happened.
+
+        :param option.Profile profile: Options set on the context once initiated, see :meth:`set_option`
         """
         self.logger.info('<0x%x>__init__', id(self))
         self._ptr = conf.FuncMalloc.c_func()
@@ -60,6 +71,13 @@ class Context(BaseContext, LoggerMixin):
         raise_if_osip_error(error_code)
         self._event_callback = None
         self.set_event_callback(event_callback)
+        self._event_hooks = ()
+        self._call_references = HandleTable()
+        self._transactions = TransactionTracker()
+        self._auto_responder = AutoResponder()
+        self._flood_guard = None
+        self._drain_rule = None
+        self._options = {}
         self._event_executor = None
         self._locked = False
         self._lock = ContextLock(self)
@@ -71,6 +89,8 @@ class Context(BaseContext, LoggerMixin):
         self._event_loop_thread = None
         self._start_cond = threading.Condition()
         self._stop_cond = threading.Condition()
+        if profile is not None:
+            profile.apply(self)
 
     def __del__(self):
         self.logger.info('<0x%x>__del__', id(self))
@@ -91,20 +111,35 @@ class Context(BaseContext, LoggerMixin):
         self._start_cond.release()
         try:
             while not self._stop_sentinel:
+                evt_ptr = event.FuncEventWait.c_func(self._ptr, c_int(s), c_int(ms))
                 self.lock_acquire()
                 try:
+                    if evt_ptr and self._flood_guard is not None and self._flood_guard.screen(self, evt_ptr):
+                        event.FuncEventFree.c_func(evt_ptr)
+                        evt_ptr = None
+                    elif evt_ptr and self._auto_responder and self._auto_responder.respond(self, evt_ptr):
+                        event.FuncEventFree.c_func(evt_ptr)
+                        evt_ptr = None
                     self.automatic_action()
                 finally:
                     self.lock_release()
-                evt = self.event_wait(s, ms)
+                evt = Event(evt_ptr, self) if evt_ptr else None
                 if evt:
                     self.logger.debug(
                         '<0x%x>_event_loop: event_wait() -> %s', id(self), evt)
+                    if self._transactions:
+                        self._transactions.update(evt)
+                    for hook in self._event_hooks:
+                        try:
+                            hook(self, evt)
+                        except Exception:
+                            self.logger.exception('<0x%x>_event_loop: event hook %r', id(self), hook)
                     if callable(self._event_callback):
                         def execute_event(_evt):
                             def done(f):
                                 self.logger.debug(
                                     '<0x%x>_event_loop: event<0x%x> callback <<<', id(self), id(_evt))
+                                self._release_call_reference(_evt)
                                 exc = f.exception()
                                 if exc:
                                     try:
@@ -119,6 +154,8 @@ class Context(BaseContext, LoggerMixin):
                         self.logger.debug(
                             '<0x%x>_event_loop: event<0x%x> callback >>>', id(self), id(evt))
                         execute_event(evt)
+                    else:
+                        self._release_call_reference(evt)
         finally:
             self._stop_cond.acquire()
             self._is_running = False
@@ -162,6 +199,37 @@ class Context(BaseContext, LoggerMixin):
 
     event_callback = property(get_event_callback, set_event_callback)
 
+    def add_event_hook(self, hook):
+        """Add an event hook
+
+        :param callable hook: Hook function, called like :attr:`event_callback` as ``hook(context, event)``
+
+        Unlike :attr:`event_callback`, hooks are invoked directly in the event loop thread,
+        in the order they were added, before the event is passed to the event executor.
+        They are meant for light bookkeeping (call/registration tables, resource release...),
+        so they must return quickly and should not acquire the context lock.
+        """
+        if not callable(hook):
+            raise TypeError('"hook" is not callable')
+        self._event_hooks += (hook,)
+
+    def remove_event_hook(self, hook):
+        """Remove an event hook added by :meth:`add_event_hook`
+
+        :param callable hook: Hook function
+        """
+        hooks = list(self._event_hooks)
+        hooks.remove(hook)
+        self._event_hooks = tuple(hooks)
+
+    @property
+    def event_hooks(self):
+        """Event hooks, in calling order
+
+        :rtype: tuple
+        """
+        return self._event_hooks
+
     @property
     def lock(self):
         """eXosip Context lock.
@@ -202,6 +270,71 @@ class Context(BaseContext, LoggerMixin):
         self._set_user_agent(val)
         self._user_agent = val
 
+    def set_option(self, option, value):
+        """Set an eXosip option
+
+        :param option: :class:`option.Option`, its name or its value
+        :param value: Value of the option, whose type depends on the option, see :class:`option.Option`
+        :raises ValueError: if the option is unknown, or the value out of range
+        :raises TypeError: if the value has a wrong type
+        :raises OsipError: if eXosip refused the option
+
+        eg::
+
+            ctx.set_option(Option.udp_keep_alive, 25)
+            ctx.set_option('add_dns_cache', ('proxy.example.com', '192.0.2.10'))
+
+        .. note:: Most options have to be set before :meth:`listen_on_address`
+        """
+        option, value = validate_option(option, value)
+        self.logger.debug('<0x%x>set_option: %s=%r', id(self), option.name, value)
+        raise_if_osip_error(conf.FuncSetOption.c_func(self._ptr, c_int(option), to_c_arg(option, value)))
+        if option == Option.set_header_user_agent:
+            self._user_agent = value
+        elif not is_action(option):
+            self._options[option] = value
+
+    def get_option(self, option, default=None):
+        """Value of an option, as set by :meth:`set_option`
+
+        eXosip has no getter of options, so an option never set returns `default`, not eXosip's default value.
+
+        :param option: :class:`option.Option`, its name or its value
+        :param default: Value returned if the option was not set
+        :raises ValueError: if the option is unknown, or is an action (eg: `add_dns_cache`) without value
+        """
+        option = to_option(option)
+        if is_action(option):
+            raise ValueError('Option {} is an action, without value'.format(option.name))
+        if option == Option.set_header_user_agent:
+            return self.user_agent
+        return self._options.get(option, default)
+
+    def add_dns_cache(self, host, ip):
+        """Add, or update, an entry of eXosip's DNS cache, so that sending to `host` needs no lookup
+
+        :param str host: Host name
+        :param str ip: Address of the host
+
+        see :class:`dnscache.DnsCacheManager`
+        """
+        self.set_option(Option.add_dns_cache, (host, ip))
+
+    def delete_dns_cache(self, host):
+        """Delete an entry of eXosip's DNS cache
+
+        :param str host: Host name
+        """
+        self.set_option(Option.delete_dns_cache, (host, None))
+
+    @property
+    def options(self):
+        """Options set by :meth:`set_option`, except actions
+
+        :rtype: dict
+        """
+        return dict(self._options)
+
     def lock_acquire(self):
         """Lock the eXtented oSIP library.
         """
@@ -225,6 +358,7 @@ class Context(BaseContext, LoggerMixin):
                               id(self), self._ptr)
             conf.FuncQuit.c_func(self._ptr)
             self._ptr = None
+        self._transactions.clear()
         self.logger.info('<0x%x>quit: <<<', id(self))
 
     def masquerade_contact(self, public_address=None, port=0):
@@ -257,6 +391,8 @@ class Context(BaseContext, LoggerMixin):
         :param int port: the listening port. (0 for random port)
         :param int family: the IP family (:data:`socket.AF_INET` or :data:`socket.AF_INET6`).
         :param bool secure: `False` for UDP or TCP, `True` for TLS (with TCP).
+
+        .. note:: A context listens on one endpoint only, see :class:`listener.ListenerSet` for several ones.
         """
         self.logger.info(
             '<0x%x>listen_on_address: '
@@ -279,6 +415,14 @@ class Context(BaseContext, LoggerMixin):
         )
         raise_if_osip_error(error_code)
 
+    def reset_transports(self):
+        """Close all TCP/TLS connections of the context, they are opened again when needed.
+
+        see :class:`activity.ActivityMonitor`
+        """
+        self.logger.info('<0x%x>reset_transports', id(self))
+        raise_if_osip_error(conf.FuncResetTransports.c_func(self._ptr))
+
     def event_wait(self, s, ms):
         """Wait for an eXosip event.
 
@@ -402,17 +546,202 @@ class Context(BaseContext, LoggerMixin):
             self._ptr, c_int(cid), c_int(did))
         raise_if_osip_error(error_code)
 
-    def call_send_init_invite(self, invite):
+    @property
+    def auto_responder(self):
+        """Automatic response rules, applied in the event loop before events are dispatched
+
+        :rtype: responder.AutoResponder
+        """
+        return self._auto_responder
+
+    @property
+    def flood_guard(self):
+        """Inbound flood guard, applied in the event loop before :attr:`auto_responder`. `None` to disable it
+
+        :rtype: guard.FloodGuard
+        """
+        return self._flood_guard
+
+    @flood_guard.setter
+    def flood_guard(self, val):
+        if val is not None and not isinstance(val, FloodGuard):
+            raise TypeError('"flood_guard" is not a FloodGuard')
+        self._flood_guard = val
+
+    @property
+    def transactions(self):
+        """Pending transaction futures, see :mod:`transaction`
+
+        :rtype: TransactionTracker
+        """
+        return self._transactions
+
+    @property
+    def call_references(self):
+        """Application objects of calls, set by :meth:`call_set_reference`
+
+        :rtype: HandleTable
+        """
+        return self._call_references
+
+    def call_set_reference(self, cid, reference):
+        """Set an application object to a call
+
+        :param int cid: call id of call.
+        :param reference: Application object, `None` to clear
+
+        The object is kept in :attr:`call_references`, eXosip only stores its handle,
+        so that events of the call resolve it by :attr:`Event.reference`.
+        It is released once the `call_released` event of the call has been processed.
+        """
+        handle = call.FuncCallGetReference.c_func(self._ptr, c_int(cid)) or 0
+        if handle and reference is not None:
+            self._call_references.replace(handle, reference)
+            return
+        new_handle = self._call_references.add(reference) if reference is not None else 0
+        error_code = call.FuncCallSetReference.c_func(self._ptr, c_int(cid), c_void_p(new_handle or None))
+        if error_code:
+            self._call_references.remove(new_handle)
+        raise_if_osip_error(error_code)
+        self._call_references.remove(handle)
+
+    def call_get_reference(self, cid):
+        """Get the application object of a call
+
+        :param int cid: call id of call.
+        :return: Application object set by :meth:`call_set_reference`, `None` if none
+        """
+        handle = call.FuncCallGetReference.c_func(self._ptr, c_int(cid))
+        return self._call_references.get(handle or 0)
+
+    def _release_call_reference(self, evt):
+        if evt.type == EventType.call_released and evt.external_reference:
+            self._call_references.remove(evt.external_reference)
+
+    def terminate_calls(self, calls, batch_size=100, interval=0.01):
+        """Terminate many calls, in batches
+
+        The context is locked once per batch, and released for `interval` seconds between batches,
+        so that the event loop and other threads are not starved.
+
+        :param calls: Call ids, `(cid, did)` pairs, or :class:`call.CallRecord` objects
+        :param int batch_size: Count of calls terminated per lock acquisition
+        :param float interval: Seconds to pause between batches
+        :return: Calls failed to terminate, as `(cid, did, error)` tuples
+        :rtype: list
+
+        .. attention:: Do **NOT** call it with the context locked.
+        """
+        failures = []
+        calls = iter(calls)
+        batch = list(islice(calls, batch_size))
+        while batch:
+            with self._lock:
+                for item in batch:
+                    if isinstance(item, tuple):
+                        cid, did = item
+                    elif hasattr(item, 'cid'):
+                        cid, did = item.cid, item.did
+                    else:
+                        cid, did = item, 0
+                    try:
+                        raise_if_osip_error(call.FuncCallTerminate.c_func(self._ptr, c_int(cid), c_int(did)))
+                    except OsipError as err:
+                        failures.append((cid, did, err))
+            batch = list(islice(calls, batch_size))
+            if batch and interval > 0:
+                time.sleep(interval)
+        return failures
+
+    @property
+    def draining(self):
+        """Whether new calls are rejected, since :meth:`drain` was called
+
+        :rtype: bool
+        """
+        return self._drain_rule is not None
+
+    def drain(self, calls, timeout=60, status=503, poll=1, progress=None, batch_size=100, interval=0.01):
+        """Reject new calls, wait for the existing ones to finish, then terminate those left at the deadline
+
+        New INVITEs are answered with `status` in the event loop, by an :class:`responder.AutoResponse` rule,
+        until :meth:`resume` is called.
+
+        :param call.CallRegistry calls: Registry bound to the context, tracking its calls
+        :param float timeout: Seconds to wait for the calls to finish by themselves
+        :param int status: Status code answered to new INVITEs
+        :param float poll: Seconds between two checks of the remaining calls
+        :param callable progress: Called as ``progress(remaining, elapsed)`` on each check
+        :param int batch_size: see :meth:`terminate_calls`
+        :param float interval: see :meth:`terminate_calls`
+        :return: Count of calls terminated at the deadline, `0` if all finished in time
+        :rtype: int
+
+        eg, on deploy::
+
+            ctx.drain(calls, 300, progress=lambda n, t: logging.info('%d calls left after %ds', n, t))
+            ctx.stop()
+        """
+        self.logger.info('<0x%x>drain: >>> timeout=%s', id(self), timeout)
+        if self._drain_rule is None:
+            self._drain_rule = AutoResponse(EventType.call_invite, status)
+            self._auto_responder.add(self._drain_rule)
+        started = time.time()
+        deadline = started + timeout
+        while True:
+            now = time.time()
+            remaining = sum(1 for record in calls if record.state != CallState.terminated)
+            if progress:
+                progress(remaining, now - started)
+            if not remaining or now >= deadline:
+                break
+            time.sleep(min(poll, deadline - now))
+        records = [record for record in calls if record.state != CallState.terminated]
+        if records:
+            self.logger.warning('<0x%x>drain: terminate %d calls at deadline', id(self), len(records))
+            for cid, did, err in self.terminate_calls(records, batch_size, interval):
+                self.logger.error('<0x%x>drain: terminate cid=%s did=%s: %s', id(self), cid, did, err)
+        self.logger.info('<0x%x>drain: <<<', id(self))
+        return len(records)
+
+    def resume(self):
+        """Accept new calls again, after :meth:`drain`
+        """
+        if self._drain_rule is not None:
+            self._auto_responder.remove(self._drain_rule)
+            self._drain_rule = None
+
+    def call_send_init_invite(self, invite, future=False):
         """Initiate a call.
 
         :param call.InitInvite invite: SIP INVITE message to send.
-        :return: CID - unique id for SIP calls (but multiple dialogs!)
+        :param bool future: Return a future of the final response instead of the call id
+        :return: CID - unique id for SIP calls (but multiple dialogs!),
+            or a :class:`transaction.TransactionFuture` whose :attr:`transaction.TransactionFuture.id` is the CID
         :rtype: int
 
         .. attention:: returned `call id` is an integer, which different from SIP message's `Call-Id` header
         """
         result = call.FuncCallSendInitialInvite.c_func(self._ptr, invite.ptr)
         raise_if_osip_error(result)
+        if future:
+            return self._transactions.watch_call(int(result))
+        return int(result)
+
+    def call_send_request(self, did, request, future=False):
+        """Send a request within call.
+
+        :param int did: dialog id of call.
+        :param ExosipMessage request: SIP request to send.
+        :param bool future: Return a future of the final response instead of the transaction id
+        :return: id of the new transaction,
+            or a :class:`transaction.TransactionFuture` whose :attr:`transaction.TransactionFuture.id` is that id
+        :rtype: int
+        """
+        result = call.FuncCallSendRequest.c_func(self._ptr, c_int(did), request.ptr)
+        raise_if_osip_error(result)
+        if future:
+            return self._transactions.watch_request(int(result))
         return int(result)
 
     def call_send_ack(self, did=None, ack=None):
@@ -448,13 +777,44 @@ class Context(BaseContext, LoggerMixin):
         )
         raise_if_osip_error(error_code)
 
-    def add_authentication_info(self, user_name, user_id, password, realm):
+    def get_remote_sdp(self, did):
+        """Get remote SDP body for the latest INVITE of call.
+
+        :param int did: dialog id of call.
+        :return: SDP, or `None` if not found
+        :rtype: SdpMessage
+        """
+        ptr = sdp.FuncGetRemoteSdp.c_func(self._ptr, c_int(did))
+        return SdpMessage(ptr) if ptr else None
+
+    def get_local_sdp(self, did):
+        """Get local SDP body for the latest INVITE of call.
+
+        :param int did: dialog id of call.
+        :return: SDP, or `None` if not found
+        :rtype: SdpMessage
+        """
+        ptr = sdp.FuncGetLocalSdp.c_func(self._ptr, c_int(did))
+        return SdpMessage(ptr) if ptr else None
+
+    def get_remote_sdp_from_tid(self, tid):
+        """Get remote SDP body for the INVITE of a transaction.
+
+        :param int tid: transaction id.
+        :return: SDP, or `None` if not found
+        :rtype: SdpMessage
+        """
+        ptr = sdp.FuncGetRemoteSdpFromTid.c_func(self._ptr, c_int(tid))
+        return SdpMessage(ptr) if ptr else None
+
+    def add_authentication_info(self, user_name, user_id, password, realm, ha1=None):
         """Add authentication credentials.
 
         :param str user_name: username
         :param str user_id: login (usually equals the username)
-        :param str password: password
+        :param str password: password, may be `None` if `ha1` is given
         :param str realm: realm within which credentials apply, or `None` to apply credentials to unrecognized realms
+        :param str ha1: precomputed `HA1` (see :func:`credential.compute_ha1`), so that the password is not needed
 
         These are used when an outgoing request comes back with an authorization required response.
         """
@@ -463,7 +823,7 @@ class Context(BaseContext, LoggerMixin):
             create_string_buffer(to_bytes(user_name)) if user_name else None,
             create_string_buffer(to_bytes(user_id)) if user_id else None,
             create_string_buffer(to_bytes(password)) if password else None,
-            None,
+            create_string_buffer(to_bytes(ha1)) if ha1 else None,
             create_string_buffer(to_bytes(realm)) if realm else None
         )
         raise_if_osip_error(error_code)
@@ -481,6 +841,61 @@ class Context(BaseContext, LoggerMixin):
         )
         raise_if_osip_error(error_code)
 
+    def clear_authentication_info(self):
+        """Clear all authentication credentials.
+        """
+        error_code = authentication.FuncClearAuthenticationInfo.c_func(self._ptr)
+        raise_if_osip_error(error_code)
+
+    def load_credentials(self, credentials):
+        """Add many authentication credentials, under a single lock acquisition.
+
+        :param credentials: :class:`credential.Credential` records,
+            or `(user_name, user_id, password, realm[, ha1])` tuples
+        :return: Entries failed to add, as `(entry, error)` tuples
+        :rtype: list
+
+        Entries are encoded before locking the context; eXosip copies the strings, so no buffer is allocated.
+        """
+        entries = [(c, _encode_credential(c)) for c in credentials]
+        with self._lock:
+            return self._add_credentials(entries)
+
+    def replace_all_credentials(self, credentials):
+        """Replace all authentication credentials, atomically.
+
+        Credentials are cleared then added under a single lock acquisition,
+        so no challenge is ever answered while they are missing.
+
+        :param credentials: see :meth:`load_credentials`
+        :return: Entries failed to add, as `(entry, error)` tuples
+        :rtype: list
+        """
+        entries = [(c, _encode_credential(c)) for c in credentials]
+        with self._lock:
+            self.clear_authentication_info()
+            return self._add_credentials(entries)
+
+    def _add_credentials(self, entries):
+        failures = []
+        func = authentication.FuncAddAuthenticationInfo.c_func
+        for entry, args in entries:
+            try:
+                raise_if_osip_error(func(self._ptr, *args))
+            except OsipError as err:
+                failures.append((entry, err))
+        return failures
+
+
+def _encode_credential(entry):
+    # argument tuple of eXosip_add_authentication_info, without the context
+    if isinstance(entry, Credential):
+        user_name, user_id, password, realm, ha1 = entry.user_name, entry.user_id, None, entry.realm, entry.ha1
+    else:
+        user_name, user_id, password, realm = entry[:4]
+        ha1 = entry[4] if len(entry) > 4 else None
+    return tuple(to_bytes(x) if x else None for x in (user_name, user_id, password, ha1, realm))
+
 
 class ContextLock:
     """A helper class for eXosip Context lock
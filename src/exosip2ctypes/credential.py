@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+Digest credentials with precomputed HA1
+
+eXosip answers `401`/`407` challenges with the credentials added by :meth:`context.Context.add_authentication_info`.
+Given a precomputed `HA1 = MD5(username:realm:password)`, it does not need the plaintext password,
+nor hash it on every challenge.
+
+:class:`CredentialStore` holds many credentials, indexed by realm and user name,
+and pushes only the ones a context needs.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import csv
+import hashlib
+import io
+import threading
+from collections import namedtuple
+
+from .utils import to_bytes, to_str
+
+__all__ = ['Credential', 'CredentialStore', 'compute_ha1']
+
+
+def compute_ha1(user_name, realm, password):
+    """Compute the digest `HA1` of a credential (RFC 2617, `MD5` algorithm)
+
+    :param str user_name: user name
+    :param str realm: realm
+    :param str password: password
+    :return: `HA1`, as lower case hexadecimal digits
+    :rtype: str
+    """
+    return to_str(hashlib.md5(b':'.join(to_bytes(x) for x in (user_name, realm, password))).hexdigest())
+
+
+class Credential(namedtuple('Credential', ['user_name', 'user_id', 'realm', 'ha1'])):
+    """Credential with a precomputed `HA1`, no plaintext password
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_password(cls, user_name, password, realm, user_id=None):
+        """Build a credential, hashing its password
+
+        :param str user_name: user name
+        :param str password: password
+        :param str realm: realm, required to compute `HA1`
+        :param str user_id: login, default is `user_name`
+        :rtype: Credential
+        """
+        if not realm:
+            raise ValueError('A realm is required to compute HA1')
+        return cls(user_name, user_id or user_name, realm, compute_ha1(user_name, realm, password))
+
+
+class CredentialStore(object):
+    """Thread-safe store of :class:`Credential` records, indexed by realm and user name
+
+    eg::
+
+        store = CredentialStore.from_csv('credentials.csv')
+        # only the tenant's realm
+        store.push(ctx, realm='tenant1.example.com')
+    """
+
+    def __init__(self, credentials=()):
+        """
+        :param credentials: :class:`Credential` records to add
+        """
+        self._realms = {}
+        self._lock = threading.Lock()
+        self.update(credentials)
+
+    @classmethod
+    def from_csv(cls, file, **kwargs):
+        """Load a store from a CSV file
+
+        The file has a header row with `user_name` and `realm` columns, and either `ha1` or `password`.
+        `user_id` is optional. Passwords are hashed once, at load time, and not kept.
+
+        :param file: Path, or text file object
+        :param kwargs: Passed to :func:`csv.DictReader`
+        :rtype: CredentialStore
+        """
+        if not hasattr(file, 'read'):
+            with io.open(file, newline='') as fp:
+                return cls(list(_iter_csv(fp, **kwargs)))
+        return cls(_iter_csv(file, **kwargs))
+
+    def __len__(self):
+        return sum(len(users) for users in self._realms.values())
+
+    def __iter__(self):
+        with self._lock:
+            return iter([c for users in self._realms.values() for c in users.values()])
+
+    def __contains__(self, key):
+        return self.get(*key) is not None
+
+    @property
+    def realms(self):
+        """Realms of the stored credentials
+
+        :rtype: list
+        """
+        return list(self._realms)
+
+    def add(self, credential):
+        """Add, or replace, a credential
+
+        :param Credential credential: Credential
+        """
+        with self._lock:
+            self._realms.setdefault(credential.realm, {})[credential.user_name] = credential
+
+    def update(self, credentials):
+        """Add, or replace, credentials
+
+        :param credentials: :class:`Credential` records,
+            or a `{(user_name, realm): ha1}` mapping
+        """
+        if hasattr(credentials, 'items'):
+            credentials = [Credential(user_name, user_name, realm, ha1)
+                           for (user_name, realm), ha1 in credentials.items()]
+        with self._lock:
+            for credential in credentials:
+                self._realms.setdefault(credential.realm, {})[credential.user_name] = credential
+
+    def remove(self, user_name, realm):
+        """Remove a credential
+
+        :param str user_name: user name
+        :param str realm: realm
+        :return: The removed credential, `None` if not found
+        :rtype: Credential or None
+        """
+        with self._lock:
+            users = self._realms.get(realm)
+            if not users:
+                return None
+            credential = users.pop(user_name, None)
+            if not users:
+                del self._realms[realm]
+            return credential
+
+    def get(self, user_name, realm):
+        """Credential of a user in a realm
+
+        :param str user_name: user name
+        :param str realm: realm
+        :rtype: Credential or None
+        """
+        return self._realms.get(realm, {}).get(user_name)
+
+    def select(self, realm=None, user_names=None):
+        """Credentials of a realm and/or of some users
+
+        :param str realm: realm, `None` for all realms
+        :param user_names: user names, `None` for all users
+        :rtype: list(Credential)
+        """
+        with self._lock:
+            realms = [self._realms.get(realm, {})] if realm is not None else list(self._realms.values())
+            if user_names is None:
+                return [c for users in realms for c in users.values()]
+            user_names = list(user_names)
+            return [users[name] for users in realms for name in user_names if name in users]
+
+    def push(self, context, realm=None, user_names=None, replace=False):
+        """Add the selected credentials to a context, with their `HA1` only
+
+        :param context.Context context: eXosip context
+        :param str realm: see :meth:`select`
+        :param user_names: see :meth:`select`
+        :param bool replace: Replace all credentials of the context atomically,
+            see :meth:`context.Context.replace_all_credentials`
+        :return: Credentials failed to add, as `(credential, error)` tuples
+        :rtype: list
+        """
+        credentials = self.select(realm, user_names)
+        if replace:
+            return context.replace_all_credentials(credentials)
+        return context.load_credentials(credentials)
+
+
+def _iter_csv(fp, **kwargs):
+    for row in csv.DictReader(fp, **kwargs):
+        user_name = row['user_name']
+        realm = row['realm']
+        user_id = row.get('user_id') or user_name
+        if row.get('ha1'):
+            yield Credential(user_name, user_id, realm, row['ha1'].lower())
+        else:
+            yield Credential.from_password(user_name, row['password'], realm, user_id)
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+"""
+Seeding of eXosip's DNS cache
+
+eXosip resolves the host names of request targets when sending, while the context is locked,
+so a slow DNS server stalls the whole event loop.
+When eXosip's DNS cache holds a host, no lookup happens on the send path.
+
+:class:`DnsCacheManager` resolves a list of hosts out of the context lock, seeds the results into the context,
+and resolves them again in a thread before they expire::
+
+    manager = DnsCacheManager(ctx, ['trunk1.example.com', 'trunk2.example.com'], ttl=300)
+    manager.load_hosts('/etc/exosip/hosts')
+    manager.start()
+
+Lookups of eXosip itself, on its send path, can not be seen from here: whether they hit its cache is not counted.
+An application which knows the targets of its requests may call :meth:`DnsCacheManager.resolve` before sending,
+to seed the hosts it did not list, and to count them in `resolve_hits` and `resolve_misses` of
+:attr:`DnsCacheManager.stats`.
+
+.. note:: eXosip's DNS cache only holds a few entries (10 by default), seed the hosts you send the most to.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import io
+import socket
+import threading
+
+from .error import OsipError
+from .option import Option
+from .utils import to_str, LoggerMixin, _monotonic
+
+__all__ = ['DnsEntry', 'DnsCacheManager', 'resolve_host']
+
+
+class DnsEntry(object):
+    """Host seeded into a context's DNS cache
+    """
+
+    __slots__ = ('host', 'ip', 'static', 'expiry', 'refresh')
+
+    def __init__(self, host, ip=None, static=False):
+        #: Host name
+        self.host = host
+        #: Resolved address, `None` if not resolved yet
+        self.ip = ip
+        #: Address given explicitly, never resolved
+        self.static = static
+        #: Monotonic time when the address expires
+        self.expiry = None
+        #: Monotonic time when the host shall be resolved again
+        self.refresh = None
+
+    def __repr__(self):
+        return '<DnsEntry {} {}>'.format(self.host, self.ip)
+
+
+def resolve_host(host, family=socket.AF_INET):
+    """Default resolver: first address of a host
+
+    :param str host: Host name
+    :param int family: Address family
+    :return: Address, with no TTL
+    :rtype: tuple
+    """
+    infos = socket.getaddrinfo(host, None, family, socket.SOCK_DGRAM)
+    return infos[0][4][0], None
+
+
+class DnsCacheManager(LoggerMixin):
+    """Resolves hosts, seeds them into a context's DNS cache, and keeps them fresh
+
+    Hosts are resolved again when `refresh` of their TTL has elapsed, so that they never expire in eXosip's cache
+    while the DNS server is reachable. When a lookup fails, the previous address is kept and the lookup is retried.
+    """
+
+    def __init__(self, context, hosts=(), ttl=300, refresh=0.8, retry=10, resolver=None, family=socket.AF_INET):
+        """
+        :param context.Context context: eXosip context
+        :param hosts: Host names to resolve
+        :param float ttl: Time to live of addresses, in seconds, when the resolver does not give one
+        :param float refresh: Fraction of the TTL after which a host is resolved again
+        :param float retry: Seconds before retrying a failed lookup
+        :param callable resolver: Called as ``resolver(host)``, returns an address,
+            or an `(address, ttl)` tuple. Default uses :func:`socket.getaddrinfo`
+        :param int family: Address family of the default resolver
+        """
+        if not 0 < refresh < 1:
+            raise ValueError('"refresh" must be in (0, 1)')
+        self._context = context
+        self._ttl = float(ttl)
+        self._refresh = float(refresh)
+        self._retry = float(retry)
+        self._resolver = resolver or (lambda host: resolve_host(host, family))
+        self._entries = {}
+        self._resolve_hits = self._resolve_misses = self._refreshes = self._failures = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.add(hosts)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, host):
+        return to_str(host).lower() in self._entries
+
+    @property
+    def context(self):
+        """eXosip context
+
+        :rtype: context.Context
+        """
+        return self._context
+
+    @property
+    def entries(self):
+        """Resolved hosts and their addresses
+
+        :rtype: dict
+        """
+        with self._cond:
+            return dict((e.host, e.ip) for e in self._entries.values() if e.ip)
+
+    @property
+    def stats(self):
+        """Counters: `resolve_hits` and `resolve_misses` of the application's calls to :meth:`resolve`,
+        `refreshes` (successful lookups) and `failures` (failed lookups or seeding)
+
+        The package's own send paths do not call :meth:`resolve`,
+        `resolve_hits` and `resolve_misses` stay at `0` unless the application does.
+
+        :rtype: dict
+        """
+        return {'resolve_hits': self._resolve_hits, 'resolve_misses': self._resolve_misses,
+                'refreshes': self._refreshes, 'failures': self._failures}
+
+    def add(self, hosts):
+        """Add host names, resolved by the next :meth:`refresh`
+
+        :param hosts: Host names, hosts already added are skipped
+        :return: Count of hosts added
+        :rtype: int
+        """
+        count = 0
+        with self._cond:
+            for host in hosts:
+                host = to_str(host).lower()
+                if host not in self._entries:
+                    self._entries[host] = DnsEntry(host)
+                    count += 1
+            if count:
+                self._cond.notify()
+        return count
+
+    def add_static(self, host, ip):
+        """Seed a host with a fixed address, never resolved
+
+        :param str host: Host name
+        :param str ip: Address
+        """
+        entry = DnsEntry(to_str(host).lower(), to_str(ip), True)
+        with self._cond:
+            self._entries[entry.host] = entry
+        self._seed(entry.host, entry.ip)
+
+    def load_hosts(self, file):
+        """Load a hosts-style file
+
+        Each line is either an address followed by host names (static entries, like `/etc/hosts`),
+        or a single host name to resolve. `#` starts a comment.
+
+        :param file: Path, or text file object
+        :return: Count of host names read
+        :rtype: int
+        """
+        if not hasattr(file, 'read'):
+            with io.open(file) as fp:
+                return self.load_hosts(fp)
+        count = 0
+        for line in file:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) == 1:
+                self.add(fields)
+                count += 1
+            elif fields:
+                for host in fields[1:]:
+                    self.add_static(host, fields[0])
+                    count += 1
+        return count
+
+    def remove(self, host):
+        """Remove a host, from the manager and from the context's DNS cache
+
+        :param str host: Host name
+        """
+        with self._cond:
+            entry = self._entries.pop(to_str(host).lower(), None)
+        if entry is not None and entry.ip:
+            try:
+                with self._context.lock:
+                    self._context.delete_dns_cache(entry.host)
+            except OsipError as err:
+                self.logger.error('<0x%x>remove: %s: %s', id(self), entry.host, err)
+
+    def get(self, host):
+        """Address of a host, without lookup and without counting
+
+        :param str host: Host name
+        :rtype: str or None
+        """
+        entry = self._entries.get(to_str(host).lower())
+        return entry.ip if entry is not None else None
+
+    def resolve(self, host):
+        """Address of a host, for a sender about to target it
+
+        A host already resolved is a hit. Otherwise it is a miss: the host is resolved now, seeded,
+        and kept fresh from then on, so that the next calls for it are hits.
+
+        :param str host: Host name
+        :return: Address, `None` if the lookup failed
+        :rtype: str or None
+        """
+        host = to_str(host).lower()
+        entry = self._entries.get(host)
+        if entry is not None and entry.ip:
+            self._resolve_hits += 1
+            return entry.ip
+        self._resolve_misses += 1
+        with self._cond:
+            entry = self._entries.setdefault(host, DnsEntry(host))
+        self._update(entry, _monotonic())
+        return entry.ip
+
+    def refresh(self, now=None):
+        """Resolve the hosts which are due, and seed the changed addresses
+
+        It is called by the manager's thread, it may be called directly when no thread is started.
+
+        :param float now: Monotonic time, default is now
+        :return: Count of hosts resolved
+        :rtype: int
+        """
+        if now is None:
+            now = _monotonic()
+        with self._cond:
+            due = [e for e in self._entries.values() if not e.static and (e.refresh is None or e.refresh <= now)]
+        for entry in due:
+            self._update(entry, now)
+        return len(due)
+
+    def next_refresh(self):
+        """Monotonic time of the next due lookup
+
+        :return: `None` if no host has to be resolved
+        :rtype: float or None
+        """
+        with self._cond:
+            times = [e.refresh or 0 for e in self._entries.values() if not e.static]
+        return min(times) if times else None
+
+    def start(self):
+        """Resolve and seed the hosts, and keep them fresh, in a thread
+        """
+        if self._thread:
+            raise RuntimeError('DNS cache manager already started.')
+        with self._context.lock:
+            self._context.set_option(Option.enable_dns_cache, True)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='DnsCacheManager-0x{:x}'.format(id(self)))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop refreshing. Seeded addresses stay in the context's DNS cache.
+        """
+        if not self._thread:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        self.logger.debug('<0x%x>_run: >>>', id(self))
+        while True:
+            with self._cond:
+                if self._stopping:
+                    break
+                next_time = self.next_refresh()
+                timeout = None if next_time is None else next_time - _monotonic()
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    break
+            self.refresh()
+        self.logger.debug('<0x%x>_run: <<<', id(self))
+
+    def _update(self, entry, now):
+        try:
+            result = self._resolver(entry.host)
+        except Exception as err:
+            self.logger.warning('<0x%x>_update: %s: %s', id(self), entry.host, err)
+            self._failures += 1
+            entry.refresh = now + self._retry
+            return
+        ip, ttl = result if isinstance(result, tuple) else (result, None)
+        ttl = self._ttl if ttl is None else float(ttl)
+        self._refreshes += 1
+        entry.expiry = now + ttl
+        entry.refresh = now + ttl * self._refresh
+        ip = to_str(ip)
+        if ip != entry.ip:
+            if self._seed(entry.host, ip):
+                entry.ip = ip
+            else:
+                entry.refresh = now + self._retry
+
+    def _seed(self, host, ip):
+        try:
+            with self._context.lock:
+                self._context.add_dns_cache(host, ip)
+        except OsipError as err:
+            self.logger.error('<0x%x>_seed: %s %s: %s', id(self), host, ip, err)
+            self._failures += 1
+            return False
+        return True
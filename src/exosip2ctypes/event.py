@@ -43,6 +43,7 @@ class Event(object):
         self._did = ptr.contents.did
         self._rid = ptr.contents.rid
         self._cid = ptr.contents.cid
+        self._external_reference = ptr.contents.external_reference or 0
         self._sid = ptr.contents.sid
         self._nid = ptr.contents.nid
         self._ss_status = ptr.contents.ss_status
@@ -161,6 +162,23 @@ class Event(object):
         """
         return self._rid
 
+    @property
+    def external_reference(self):
+        """
+        :return: external reference of the call, a handle of :attr:`Context.call_references`, `0` if none
+        :rtype: int
+        """
+        return self._external_reference
+
+    @property
+    def reference(self):
+        """
+        :return: application object of the call, set by :meth:`Context.call_set_reference`, `None` if none
+        """
+        if not self._external_reference:
+            return None
+        return self._context.call_references.get(self._external_reference)
+
     @property
     def cid(self):
         """
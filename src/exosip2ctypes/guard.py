@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""
+Inbound flood guard
+
+During a scanner flood, every bogus INVITE or REGISTER would become an :class:`event.Event`,
+an executor task and a handler call before the application could reject it.
+A :class:`FloodGuard` set as :attr:`context.Context.flood_guard` screens raw events in the event loop thread,
+before :attr:`context.Context.auto_responder`, hooks and the event callback:
+
+* new requests are counted per source address and per From user, in :class:`CountMinSketch` tables
+  whose size does not depend on the count of distinct sources;
+* a source or user above its threshold is banned for a while;
+* requests of banned sources and users are rejected with a status code, or ignored (not answered at all).
+
+eg::
+
+    ctx.flood_guard = FloodGuard(max_per_source=30, max_per_user=10, window=1, ban_time=300, action='ignore')
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import struct
+from array import array
+from collections import OrderedDict
+
+from .event import EventType
+from .message import ExosipMessage
+from .responder import AutoResponse
+from .utils import to_bytes, to_str, LoggerMixin, _monotonic
+
+__all__ = ['CountMinSketch', 'FloodGuard']
+
+_SCREENED_EVENTS = frozenset([EventType.call_invite, EventType.message_new])
+
+_ACTIONS = ('reject', 'ignore')
+
+
+class CountMinSketch(object):
+    """Approximate counters of any count of keys, in fixed memory
+
+    An estimate is never below the true count, and exceeds it by at most `2 / width` of the total count,
+    with a probability of `1 - 0.5 ** depth`.
+
+    Each row's index is taken from its own 8 bytes of a SHA-512 digest of the key,
+    so that keys colliding in one row are not more likely to collide in the others.
+    """
+
+    def __init__(self, width=4096, depth=4):
+        """
+        :param int width: Counters per row
+        :param int depth: Rows, each one with its own hash function
+        """
+        if width < 1 or depth < 1:
+            raise ValueError('"width" and "depth" must be positive')
+        self._width = int(width)
+        self._depth = int(depth)
+        # one digest gives 8 rows, more rows take the digests of salted keys
+        self._salts = [struct.pack(str('>I'), i) if i else b'' for i in range((self._depth + 7) // 8)]
+        self._table = array(str('I'), [0]) * (self._width * self._depth)
+
+    @property
+    def width(self):
+        """
+        :rtype: int
+        """
+        return self._width
+
+    @property
+    def depth(self):
+        """
+        :rtype: int
+        """
+        return self._depth
+
+    def _indexes(self, key):
+        data = to_bytes(key)
+        digest = b''.join(hashlib.sha512(salt + data).digest() for salt in self._salts)
+        width = self._width
+        return [i * width + struct.unpack_from(str('>Q'), digest, i * 8)[0] % width for i in range(self._depth)]
+
+    def add(self, key, n=1):
+        """Count a key
+
+        :param key: `str` or `bytes` key
+        :param int n: Count to add
+        :return: Estimated count of the key, after the addition
+        :rtype: int
+        """
+        table = self._table
+        result = None
+        for i in self._indexes(key):
+            table[i] = value = min(table[i] + n, 0xffffffff)
+            result = value if result is None else min(result, value)
+        return result
+
+    def estimate(self, key):
+        """Estimated count of a key
+
+        :param key: `str` or `bytes` key
+        :rtype: int
+        """
+        table = self._table
+        return min(table[i] for i in self._indexes(key))
+
+    def clear(self):
+        """Reset all counters
+        """
+        self._table = array(str('I'), [0]) * (self._width * self._depth)
+
+
+class _WindowCounter(object):
+    """Sliding window counts: the current window's sketch, plus a share of the previous one
+    """
+
+    __slots__ = ('_window', '_start', '_current', '_previous')
+
+    def __init__(self, window, width, depth):
+        self._window = window
+        self._start = None
+        self._current = CountMinSketch(width, depth)
+        self._previous = CountMinSketch(width, depth)
+
+    def add(self, key, now):
+        if self._start is None:
+            self._start = now
+        elapsed = now - self._start
+        if elapsed >= self._window:
+            self._previous, self._current = self._current, self._previous
+            self._current.clear()
+            if elapsed >= 2 * self._window:
+                self._previous.clear()
+            self._start = now - elapsed % self._window
+            elapsed = now - self._start
+        count = self._current.add(key)
+        return count + self._previous.estimate(key) * max(0.0, 1 - elapsed / self._window)
+
+
+class FloodGuard(LoggerMixin):
+    """Rate limits of new inbound requests, per source address and per From user, with a ban list
+
+    Screened events are `call_invite` and `message_new` (REGISTER, MESSAGE, OPTIONS...).
+    """
+
+    def __init__(self, max_per_source=50, max_per_user=20, window=1.0, ban_time=60.0, action='reject', status=403,
+                 whitelist=(), max_bans=10000, width=4096, depth=4):
+        """
+        :param int max_per_source: Max requests of a source address per window, `None` for no limit
+        :param int max_per_user: Max requests of a From user per window, `None` for no limit
+        :param float window: Length of the sliding window, in seconds
+        :param float ban_time: Seconds an offender stays banned
+        :param str action: `'reject'` to answer the requests of offenders with `status`,
+            `'ignore'` to leave them without answer: the sender retransmits, then gives up,
+            and eXosip's server transaction times out
+        :param int status: Status code of rejections
+        :param whitelist: Source addresses never screened
+        :param int max_bans: Max size of the ban list, the oldest bans are dropped first
+        :param int width: see :class:`CountMinSketch`
+        :param int depth: see :class:`CountMinSketch`
+        """
+        if action not in _ACTIONS:
+            raise ValueError('"action" must be one of {}'.format(_ACTIONS))
+        self._max_per_source = max_per_source
+        self._max_per_user = max_per_user
+        self._ban_time = float(ban_time)
+        self._action = action
+        self._status = int(status)
+        self._whitelist = frozenset(to_str(x) for x in whitelist)
+        self._max_bans = int(max_bans)
+        self._sources = _WindowCounter(float(window), width, depth)
+        self._users = _WindowCounter(float(window), width, depth)
+        self._bans = OrderedDict()
+        self._responses = {}
+        self._counts = {'allowed': 0, 'rejected': 0, 'ignored': 0, 'banned': 0}
+
+    @property
+    def action(self):
+        """`'reject'` or `'ignore'`
+
+        :rtype: str
+        """
+        return self._action
+
+    @property
+    def stats(self):
+        """Counters: `allowed`, `rejected` and `ignored` requests, `banned` offenders
+
+        :rtype: dict
+        """
+        return dict(self._counts)
+
+    @property
+    def bans(self):
+        """Banned keys (`'source:<address>'` or `'user:<user>'`), and their remaining ban time in seconds
+
+        :rtype: dict
+        """
+        now = _monotonic()
+        return dict((k, v - now) for k, v in list(self._bans.items()) if v > now)
+
+    def is_banned(self, source=None, user=None, now=None):
+        """Is a source address or a From user banned
+
+        :param str source: Source address
+        :param str user: From user
+        :param float now: Monotonic time, default is now
+        :rtype: bool
+        """
+        if now is None:
+            now = _monotonic()
+        for key in _keys(source, user):
+            expiry = self._bans.get(key)
+            if expiry is not None:
+                if expiry > now:
+                    return True
+                del self._bans[key]
+        return False
+
+    def ban(self, source=None, user=None, now=None):
+        """Ban a source address or a From user for the guard's ban time
+
+        :param str source: Source address
+        :param str user: From user
+        :param float now: Monotonic time, default is now
+        """
+        if now is None:
+            now = _monotonic()
+        for key in _keys(source, user):
+            self._bans.pop(key, None)
+            self._bans[key] = now + self._ban_time
+            self._counts['banned'] += 1
+            self.logger.warning('<0x%x>ban: %s for %ss', id(self), key, self._ban_time)
+        while len(self._bans) > self._max_bans:
+            self._bans.popitem(last=False)
+
+    def unban(self, source=None, user=None):
+        """Lift the ban of a source address or a From user
+
+        :param str source: Source address
+        :param str user: From user
+        """
+        for key in _keys(source, user):
+            self._bans.pop(key, None)
+
+    def check(self, source, user=None, now=None):
+        """Count a new request, and tell whether it is allowed
+
+        :param str source: Source address
+        :param str user: From user, if any
+        :param float now: Monotonic time, default is now
+        :return: `True` if allowed, `False` if the source or user is, or just got, banned
+        :rtype: bool
+        """
+        if source in self._whitelist:
+            return True
+        if now is None:
+            now = _monotonic()
+        if self.is_banned(source, user, now):
+            return False
+        allowed = True
+        if source and self._max_per_source is not None:
+            if self._sources.add(source, now) > self._max_per_source:
+                self.ban(source=source, now=now)
+                allowed = False
+        if user and self._max_per_user is not None:
+            if self._users.add(user, now) > self._max_per_user:
+                self.ban(user=user, now=now)
+                allowed = False
+        return allowed
+
+    def screen(self, context, evt_ptr):
+        """Screen a raw event, rejecting or ignoring it if its sender is an offender
+
+        It is called in the event loop thread, with the context locked.
+
+        :param context.Context context: eXosip context
+        :param evt_ptr: `struct eXosip_event_t *`
+        :return: Whether the event was rejected or ignored, and so consumed
+        :rtype: bool
+        """
+        evt = evt_ptr.contents
+        if evt.type not in _SCREENED_EVENTS or not evt.request:
+            return False
+        request = ExosipMessage(evt.request, context)
+        via = request.via
+        source = (via.received or via.host) if via else None
+        from_ = request.from_addr
+        user = from_.user if from_ else None
+        if self.check(source, user):
+            self._counts['allowed'] += 1
+            return False
+        if self._action == 'ignore':
+            self._counts['ignored'] += 1
+            return True
+        response = self._responses.get(evt.type)
+        if response is None:
+            response = self._responses[evt.type] = AutoResponse(evt.type, self._status)
+        try:
+            response.send(context, evt.tid, request)
+        except Exception:
+            self.logger.exception('<0x%x>screen: reject %s', id(self), source)
+        self._counts['rejected'] += 1
+        return True
+
+
+def _keys(source, user):
+    keys = []
+    if source:
+        keys.append('source:' + to_str(source))
+    if user:
+        keys.append('user:' + to_str(user))
+    return keys
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+
+"""
+Structured SIP header records
+
+Records are built directly from oSIP's parsed C structures,
+so no header is formatted to a string and parsed again in Python.
+
+Parsed :class:`NameAddr` records are immutable, and shared across messages through :data:`name_addr_cache`.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import namedtuple, OrderedDict
+from ctypes import POINTER, cast
+
+from ._c import osip_uri, osip_from, osip_list, osip_via, osip_cseq, osip_authentication
+from .utils import to_bytes, to_str
+
+__all__ = ['Uri', 'NameAddr', 'Via', 'CSeq', 'Authenticate', 'Authorization',
+           'NameAddrCache', 'name_addr_cache', 'parse_uri', 'parse_name_addr']
+
+
+def _get_param(params, name, default=None):
+    name = name.lower()
+    for k, v in params:
+        if k.lower() == name:
+            return v
+    return default
+
+
+def _format_params(params):
+    return ''.join(';{}={}'.format(k, v) if v is not None else ';{}'.format(k) for k, v in params)
+
+
+class _Immutable(object):
+    __slots__ = ()
+
+    def __setattr__(self, key, value):
+        raise AttributeError('{} object is immutable'.format(type(self).__name__))
+
+    def __delattr__(self, item):
+        raise AttributeError('{} object is immutable'.format(type(self).__name__))
+
+    def _values(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __repr__(self):
+        return '{}({})'.format(
+            type(self).__name__, ', '.join('{}={!r}'.format(k, getattr(self, k)) for k in self.__slots__))
+
+
+class Uri(_Immutable):
+    """Parts of a SIP url
+
+    Instances are immutable.
+    `params` and `headers` are `tuple` of `(name, value)` pairs, `value` is `None` for a flag parameter.
+    """
+    __slots__ = ('scheme', 'user', 'password', 'host', 'port', 'params', 'headers', 'string')
+
+    def __init__(self, scheme=None, user=None, password=None, host=None, port=None, params=(), headers=(),
+                 string=None):
+        """
+        :param str scheme: Uri Scheme (sip or sips)
+        :param str user: Username
+        :param str password: Password
+        :param str host: Domain
+        :param int port: Port number
+        :param tuple params: Uri parameters
+        :param tuple headers: Uri headers
+        :param str string: Content of other url schemes (http, mailto...)
+        """
+        for k, v in zip(self.__slots__, (scheme, user, password, host, port, tuple(params), tuple(headers), string)):
+            object.__setattr__(self, k, v)
+
+    def __str__(self):
+        scheme = self.scheme or 'sip'
+        if self.string is not None:
+            return '{}:{}'.format(scheme, self.string)
+        result = scheme + ':'
+        if self.user is not None:
+            result += self.user
+            if self.password is not None:
+                result += ':' + self.password
+            result += '@'
+        result += self.host or ''
+        if self.port is not None:
+            result += ':{}'.format(self.port)
+        result += _format_params(self.params)
+        if self.headers:
+            result += '?' + '&'.join('{}={}'.format(k, v) for k, v in self.headers)
+        return result
+
+    def get_param(self, name, default=None):
+        """Get value of a uri parameter
+
+        :param str name: parameter name (case-insensitive)
+        :param default: Returned when parameter not found
+        :rtype: str
+        """
+        return _get_param(self.params, name, default)
+
+
+class NameAddr(_Immutable):
+    """Parts of a `From`, `To`, `Contact`, `Route` or `Record-Route` header
+
+    Instances are immutable.
+    `params` is a `tuple` of `(name, value)` pairs, `value` is `None` for a flag parameter.
+    """
+    __slots__ = ('display_name', 'uri', 'params')
+
+    def __init__(self, display_name=None, uri=None, params=()):
+        """
+        :param str display_name: Display Name, quotes are kept as they are in the message
+        :param Uri uri: url
+        :param tuple params: header parameters
+        """
+        object.__setattr__(self, 'display_name', display_name)
+        object.__setattr__(self, 'uri', uri)
+        object.__setattr__(self, 'params', tuple(params))
+
+    def __str__(self):
+        if self.uri is None:
+            return '*'
+        result = '<{}>'.format(self.uri) + _format_params(self.params)
+        if self.display_name:
+            result = '{} {}'.format(self.display_name, result)
+        return result
+
+    def get_param(self, name, default=None):
+        """Get value of a header parameter
+
+        :param str name: parameter name (case-insensitive)
+        :param default: Returned when parameter not found
+        :rtype: str
+        """
+        return _get_param(self.params, name, default)
+
+    @property
+    def tag(self):
+        """`tag` parameter
+
+        :rtype: str
+        """
+        return _get_param(self.params, 'tag')
+
+    @property
+    def user(self):
+        """User part of the url
+
+        :rtype: str
+        """
+        return self.uri.user if self.uri else None
+
+    @property
+    def host(self):
+        """Host part of the url
+
+        :rtype: str
+        """
+        return self.uri.host if self.uri else None
+
+
+class Via(namedtuple('Via', ['version', 'protocol', 'host', 'port', 'comment', 'params'])):
+    """Record of a `Via` header
+
+    `params` is a `tuple` of `(name, value)` pairs, `value` is `None` for a flag parameter.
+    """
+    __slots__ = ()
+
+    def get_param(self, name, default=None):
+        """Get value of a parameter
+
+        :param str name: parameter name (case-insensitive)
+        :param default: Returned when parameter not found
+        :rtype: str
+        """
+        return _get_param(self.params, name, default)
+
+    @property
+    def branch(self):
+        """`branch` parameter
+
+        :rtype: str
+        """
+        return self.get_param('branch')
+
+    @property
+    def received(self):
+        """`received` parameter
+
+        :rtype: str
+        """
+        return self.get_param('received')
+
+    @property
+    def rport(self):
+        """`rport` parameter, `None` if absent or has no value
+
+        :rtype: int
+        """
+        val = self.get_param('rport')
+        return int(val) if val else None
+
+
+class CSeq(namedtuple('CSeq', ['number', 'method'])):
+    """Record of a `CSeq` header
+    """
+    __slots__ = ()
+
+
+class Authenticate(namedtuple('Authenticate', [
+    'auth_type', 'realm', 'domain', 'nonce', 'opaque', 'stale', 'algorithm', 'qop_options'
+])):
+    """Record of a `WWW-Authenticate` or `Proxy-Authenticate` header
+
+    Quoted values are kept as they are in the message.
+    """
+    __slots__ = ()
+
+
+class Authorization(namedtuple('Authorization', [
+    'auth_type', 'username', 'realm', 'nonce', 'uri', 'response', 'digest', 'algorithm',
+    'cnonce', 'opaque', 'message_qop', 'nonce_count'
+])):
+    """Record of a `Authorization` or `Proxy-Authorization` header
+
+    Quoted values are kept as they are in the message.
+    """
+    __slots__ = ()
+
+
+def _split_param(s):
+    name, sep, value = s.partition('=')
+    return name.strip(), (value.strip() if sep else None)
+
+
+def _split_params(s):
+    return tuple(_split_param(p) for p in s.split(';') if p.strip())
+
+
+def parse_uri(s):
+    """Parse a SIP url string in Python
+
+    :param str s: url string, eg: ``sip:alice@example.com:5060;transport=tcp``
+    :rtype: Uri
+
+    Urls of other schemes (http, mailto...) are kept in :attr:`Uri.string`.
+    """
+    s = to_str(s).strip()
+    scheme, sep, rest = s.partition(':')
+    if not sep:
+        raise ValueError('Invalid url {!r}'.format(s))
+    if scheme.lower() not in ('sip', 'sips'):
+        return Uri(scheme, string=rest)
+    rest, sep, headers = rest.partition('?')
+    headers = tuple(_split_param(h) for h in headers.split('&') if h) if sep else ()
+    user_info, sep, host_params = rest.rpartition('@')
+    user = password = None
+    if sep:
+        user, sep, password = user_info.partition(':')
+        if not sep:
+            password = None
+    host_port, _, params = host_params.partition(';')
+    if host_port.startswith('['):  # IPv6 reference
+        end = host_port.find(']')
+        host, port = host_port[:end + 1], host_port[end + 1:].lstrip(':')
+    else:
+        host, _, port = host_port.partition(':')
+    return Uri(scheme, user, password, host, int(port) if port else None, _split_params(params), headers)
+
+
+def parse_name_addr(s):
+    """Parse a `From`, `To`, `Contact`, `Route` alike header value in Python
+
+    :param str s: header value, eg: ``"Alice" <sip:alice@example.com>;tag=1928301774``
+    :rtype: NameAddr
+
+    Use :meth:`NameAddrCache.parse` of :data:`name_addr_cache` to re-use records of repeated values.
+    """
+    s = to_str(s).strip()
+    if s == '*':
+        return NameAddr()
+    display_name = None
+    rest = s
+    if s.startswith('"'):
+        pos = 1
+        while True:
+            pos = s.find('"', pos)
+            if pos < 0:
+                raise ValueError('Unterminated display name in {!r}'.format(s))
+            if s[pos - 1] != '\\':
+                break
+            pos += 1
+        display_name = s[:pos + 1]
+        rest = s[pos + 1:]
+    start = rest.find('<')
+    if start < 0:
+        # addr-spec without angle brackets: parameters belong to the header.
+        uri, _, params = rest.strip().partition(';')
+    else:
+        end = rest.find('>', start)
+        if end < 0:
+            raise ValueError('Unterminated url in {!r}'.format(s))
+        if display_name is None:
+            display_name = rest[:start].strip() or None
+        uri, params = rest[start + 1:end], rest[end + 1:]
+    return NameAddr(display_name, parse_uri(uri), _split_params(params))
+
+
+class NameAddrCache(object):
+    """Bounded, thread-safe LRU cache of :class:`NameAddr` records
+
+    Records are keyed by the raw header bytes, or by the raw field bytes of oSIP's parsed C structures.
+    Since the records are immutable, a cached one can be shared by any number of messages.
+    """
+
+    def __init__(self, maxsize=4096):
+        """
+        :param int maxsize: Max count of cached records. `0` disables the cache.
+        """
+        self._maxsize = max(0, int(maxsize))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def maxsize(self):
+        """Max count of cached records
+
+        :rtype: int
+        """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, val):
+        val = max(0, int(val))
+        with self._lock:
+            self._maxsize = val
+            self._evict()
+
+    @property
+    def stats(self):
+        """Cache statistics: `hits`, `misses`, `evictions`, `size` and `maxsize`
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                'size': len(self._data), 'maxsize': self._maxsize,
+            }
+
+    def clear(self):
+        """Remove all records and reset the counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def _evict(self):
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def lookup(self, key, factory):
+        """Get the record of a key, create and cache it by `factory` if missed.
+
+        :param key: hashable key, usually raw bytes
+        :param callable factory: called with `key` to create the record when missed
+        :rtype: NameAddr
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._data[key] = value
+                return value
+        value = factory(key)
+        if self._maxsize:
+            with self._lock:
+                self._data[key] = value
+                self._evict()
+        return value
+
+    def parse(self, s):
+        """Parse a header value with :func:`parse_name_addr`, through the cache.
+
+        :param s: header value
+        :type s: str or bytes
+        :rtype: NameAddr
+        """
+        return self.lookup(to_bytes(s).strip(), parse_name_addr)
+
+
+#: Default :class:`NameAddrCache`, it serves :class:`message.OsipMessage`'s header accessors.
+name_addr_cache = NameAddrCache()
+
+
+def _to_str_or_none(val):
+    return None if val is None else to_str(val)
+
+
+def _raw_params(lst):
+    result = []
+    for elem in osip_list.iter_elements(lst):
+        param = cast(elem, POINTER(osip_uri.GenericParam)).contents
+        result.append((param.gname, param.gvalue))
+    return tuple(result)
+
+
+def _params(lst):
+    return _str_params(_raw_params(lst))
+
+
+def _str_params(raw):
+    return tuple((to_str(k), _to_str_or_none(v)) for k, v in raw)
+
+
+def _raw_uri(ptr):
+    u = cast(ptr, POINTER(osip_uri.Uri)).contents
+    return (u.scheme, u.username, u.password, u.host, u.port,
+            _raw_params(u.url_params), _raw_params(u.url_headers), u.string)
+
+
+def _uri_from_raw(raw):
+    scheme, user, password, host, port, url_params, url_headers, string = raw
+    return Uri(
+        _to_str_or_none(scheme), _to_str_or_none(user), _to_str_or_none(password), _to_str_or_none(host),
+        int(port) if port else None, _str_params(url_params), _str_params(url_headers), _to_str_or_none(string)
+    )
+
+
+def _uri(ptr):
+    if not ptr:
+        return None
+    return _uri_from_raw(_raw_uri(ptr))
+
+
+def _raw_name_addr(ptr):
+    st = cast(ptr, POINTER(osip_from.From)).contents
+    return st.displayname, _raw_uri(st.url) if st.url else None, _raw_params(st.gen_params)
+
+
+def _name_addr_from_raw(raw):
+    display_name, raw_uri, params = raw
+    uri = _uri_from_raw(raw_uri) if raw_uri else None
+    return NameAddr(_to_str_or_none(display_name), uri, _str_params(params))
+
+
+def _name_addr(ptr):
+    if not ptr:
+        return None
+    return name_addr_cache.lookup(_raw_name_addr(ptr), _name_addr_from_raw)
+
+
+def _via(ptr):
+    st = cast(ptr, POINTER(osip_via.Via)).contents
+    return Via(
+        _to_str_or_none(st.version), _to_str_or_none(st.protocol), _to_str_or_none(st.host),
+        int(st.port) if st.port else None, _to_str_or_none(st.comment), _params(st.via_params)
+    )
+
+
+def _cseq(ptr):
+    st = cast(ptr, POINTER(osip_cseq.CSeq)).contents
+    return CSeq(int(st.number) if st.number else None, _to_str_or_none(st.method))
+
+
+def _authenticate(ptr):
+    st = cast(ptr, POINTER(osip_authentication.WwwAuthenticate)).contents
+    return Authenticate(*(_to_str_or_none(getattr(st, f)) for f in Authenticate._fields))
+
+
+def _authorization(ptr):
+    st = cast(ptr, POINTER(osip_authentication.Authorization)).contents
+    return Authorization(*(_to_str_or_none(getattr(st, f)) for f in Authorization._fields))
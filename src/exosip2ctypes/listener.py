@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""
+Listening on several transports and address families
+
+An eXosip context has exactly one transport: :meth:`context.Context.listen_on_address` may only be called once.
+A :class:`ListenerSet` creates one context per endpoint (UDP, TCP or TLS, IPv4 or IPv6),
+sharing the same event callback and :class:`option.Profile`,
+and chooses the context through which an outbound request is sent::
+
+    listeners = ListenerSet(event_callback=on_event)
+    listeners.listen('udp', port=5060)
+    listeners.listen('tcp', port=5060)
+    listeners.listen('udp', port=0, family=socket.AF_INET6)
+    listeners.start()
+
+    listener = listeners.route('sip:1001@gw.example.com', size=len(invite_bytes))
+    with listener.context.lock:
+        listener.context.call_send_init_invite(InitInvite(listener.context, ...))
+
+Requests larger than :attr:`ListenerSet.max_udp_size` are routed to a congestion controlled transport
+(TCP or TLS), as RFC 3261 section 18.1.1 requires.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+import socket
+import threading
+
+from enum import IntEnum
+
+from .context import Context
+from .option import Option
+from .utils import to_str, LoggerMixin
+
+__all__ = ['Transport', 'Listener', 'ListenerSet', 'parse_destination', 'find_free_port']
+
+
+class Transport(IntEnum):
+    """SIP transports
+    """
+    udp = 1
+    tcp = 2
+    tls = 3
+
+
+_DESTINATION_PATTERN = re.compile(
+    r'^(?:sips?:)?(?:[^@;]*@)?(?P<host>\[[^\]]+\]|[^:;?>]+)(?::(?P<port>\d+))?(?P<params>;[^?>]*)?', re.I)
+_TRANSPORT_PARAM_PATTERN = re.compile(r';transport=(\w+)', re.I)
+
+
+def _to_transport(value):
+    if isinstance(value, Transport):
+        return value
+    try:
+        return Transport[to_str(value).lower()]
+    except (KeyError, AttributeError):
+        return Transport(value)
+
+
+def parse_destination(destination):
+    """Host, port and `transport` parameter of a destination
+
+    :param str destination: SIP URI, or `host[:port]`
+    :return: `(host, port, transport)`, `port` and `transport` are `None` if absent
+    :rtype: tuple
+    """
+    destination = to_str(destination).strip().lstrip('<')
+    m = _DESTINATION_PATTERN.match(destination)
+    if not m:
+        raise ValueError('Invalid destination {!r}'.format(destination))
+    port = int(m.group('port')) if m.group('port') else None
+    transport = None
+    if m.group('params'):
+        t = _TRANSPORT_PARAM_PATTERN.search(m.group('params'))
+        if t:
+            transport = _to_transport(t.group(1))
+    if transport is None and destination[:5].lower() == 'sips:':
+        transport = Transport.tls
+    return m.group('host').lower(), port, transport
+
+
+class Listener(object):
+    """Endpoint of a :class:`ListenerSet`, with its own context
+    """
+
+    __slots__ = ('_context', '_transport', '_family', '_address', '_port', 'received', 'routed')
+
+    def __init__(self, context, transport, family, address, port):
+        self._context = context
+        self._transport = transport
+        self._family = family
+        self._address = address
+        self._port = port
+        #: Count of events carrying a SIP message
+        self.received = 0
+        #: Count of outbound requests routed to the listener
+        self.routed = 0
+
+    def __repr__(self):
+        return '<Listener {} {}:{}>'.format(self._transport.name, self._address or '*', self._port)
+
+    @property
+    def context(self):
+        """Context listening on the endpoint
+
+        :rtype: context.Context
+        """
+        return self._context
+
+    @property
+    def transport(self):
+        """
+        :rtype: Transport
+        """
+        return self._transport
+
+    @property
+    def family(self):
+        """:data:`socket.AF_INET` or :data:`socket.AF_INET6`
+
+        :rtype: int
+        """
+        return self._family
+
+    @property
+    def address(self):
+        """Bound address, `None` for all interfaces
+
+        :rtype: str
+        """
+        return self._address
+
+    @property
+    def port(self):
+        """Bound port, never `0`
+
+        :rtype: int
+        """
+        return self._port
+
+    def _on_event(self, context, evt):
+        if evt.request is not None or evt.response is not None:
+            self.received += 1
+
+
+def find_free_port(transport=Transport.udp, address=None, family=socket.AF_INET):
+    """Port the system gives to a socket bound to port `0`
+
+    :param Transport transport: transport
+    :param str address: address to bind, `None` for all interfaces
+    :param int family: :data:`socket.AF_INET` or :data:`socket.AF_INET6`
+    :rtype: int
+
+    .. note:: The port is free when returned, another process may take it before it is bound again.
+    """
+    sock = socket.socket(family, socket.SOCK_DGRAM if transport == Transport.udp else socket.SOCK_STREAM)
+    try:
+        sock.bind((address or ('::' if family == socket.AF_INET6 else ''), 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+class ListenerSet(LoggerMixin):
+    """Several listening endpoints, one context each, and the routing of outbound requests between them
+    """
+
+    def __init__(self, event_callback=None, profile=None, max_udp_size=1300):
+        """
+        :param callable event_callback: Event callback of all contexts, see :class:`context.Context`
+        :param option.Profile profile: Options of all contexts
+        :param int max_udp_size: Requests larger than it, in bytes, are not routed to UDP
+        """
+        self._event_callback = event_callback
+        self._profile = profile
+        self._max_udp_size = int(max_udp_size)
+        self._listeners = []
+        self._preferences = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._listeners)
+
+    def __iter__(self):
+        return iter(list(self._listeners))
+
+    @property
+    def listeners(self):
+        """
+        :rtype: list(Listener)
+        """
+        return list(self._listeners)
+
+    @property
+    def max_udp_size(self):
+        """Requests larger than it, in bytes, are not routed to UDP
+
+        :rtype: int
+        """
+        return self._max_udp_size
+
+    @property
+    def stats(self):
+        """Port and message counts of each listener, keyed by `(transport name, family)`
+
+        :rtype: dict
+        """
+        return dict(
+            ((x.transport.name, x.family), {'port': x.port, 'received': x.received, 'routed': x.routed})
+            for x in self._listeners
+        )
+
+    def listen(self, transport=Transport.udp, address=None, port=5060, family=socket.AF_INET):
+        """Create a context listening on an endpoint
+
+        :param transport: :class:`Transport`, or its name
+        :param str address: address to bind, `None` for all interfaces
+        :param int port: port to bind, `0` for an ephemeral one
+        :param int family: :data:`socket.AF_INET` or :data:`socket.AF_INET6`
+        :return: The new listener, whose :attr:`Listener.port` is the bound port
+        :rtype: Listener
+        """
+        transport = _to_transport(transport)
+        if self.get(transport, family):
+            raise ValueError('Already listening on {} with family {}'.format(transport.name, family))
+        if not port:
+            port = find_free_port(transport, address, family)
+        ctx = Context(self._event_callback, self._profile)
+        try:
+            if family == socket.AF_INET6:
+                ctx.set_option(Option.enable_ipv6, True)
+            ctx.listen_on_address(
+                address,
+                socket.IPPROTO_UDP if transport == Transport.udp else socket.IPPROTO_TCP,
+                port, family, transport == Transport.tls
+            )
+        except Exception:
+            ctx.quit()
+            raise
+        listener = Listener(ctx, transport, family, address, port)
+        ctx.add_event_hook(listener._on_event)
+        with self._lock:
+            self._listeners.append(listener)
+        self.logger.info('<0x%x>listen: %r', id(self), listener)
+        return listener
+
+    def get(self, transport, family=socket.AF_INET):
+        """Listener of a transport and family
+
+        :param transport: :class:`Transport`, or its name
+        :param int family: :data:`socket.AF_INET` or :data:`socket.AF_INET6`
+        :rtype: Listener or None
+        """
+        transport = _to_transport(transport)
+        for listener in self._listeners:
+            if listener.transport == transport and listener.family == family:
+                return listener
+        return None
+
+    def set_preferred(self, destination, transport):
+        """Set the transport of the requests sent to a destination
+
+        :param str destination: SIP URI, or `host[:port]`
+        :param transport: :class:`Transport`, or its name. `None` to remove the preference
+        """
+        host, port, _ = parse_destination(destination)
+        with self._lock:
+            if transport is None:
+                self._preferences.pop((host, port), None)
+            else:
+                self._preferences[(host, port)] = _to_transport(transport)
+
+    def get_preferred(self, destination):
+        """Transport set for a destination by :meth:`set_preferred`, or its URI's `transport` parameter
+
+        :param str destination: SIP URI, or `host[:port]`
+        :rtype: Transport or None
+        """
+        host, port, transport = parse_destination(destination)
+        if transport is not None:
+            return transport
+        return self._preferences.get((host, port)) or self._preferences.get((host, None))
+
+    def route(self, destination, size=0, family=None):
+        """Listener whose context sends a request to a destination
+
+        In order: the transport preferred for the destination (see :meth:`get_preferred`), unless it is UDP
+        and the request is too large;
+        TCP, then TLS, for requests larger than :attr:`max_udp_size`; UDP; any listener.
+
+        :param str destination: SIP URI, or `host[:port]`
+        :param int size: Size of the request, in bytes, if known
+        :param int family: Address family, default is IPv6 for IPv6 literal hosts, else IPv4
+        :rtype: Listener
+        :raises LookupError: If there is no listener of the family
+        """
+        host = parse_destination(destination)[0]
+        if family is None:
+            family = socket.AF_INET6 if host.startswith('[') else socket.AF_INET
+        candidates = [x for x in self._listeners if x.family == family]
+        if not candidates:
+            raise LookupError('No listener of family {}'.format(family))
+        order = []
+        preferred = self.get_preferred(destination)
+        if preferred is not None and not (preferred == Transport.udp and size > self._max_udp_size):
+            order.append(preferred)
+        if size > self._max_udp_size:
+            order.extend([Transport.tcp, Transport.tls])
+        order.append(Transport.udp)
+        for transport in order:
+            for listener in candidates:
+                if listener.transport == transport:
+                    listener.routed += 1
+                    return listener
+        listener = candidates[0]
+        listener.routed += 1
+        return listener
+
+    def start(self, *args, **kwargs):
+        """Start the event loops of all contexts, see :meth:`context.Context.start`
+        """
+        for listener in self._listeners:
+            listener.context.start(*args, **kwargs)
+
+    def stop(self):
+        """Stop the event loops of all contexts
+        """
+        for listener in self._listeners:
+            if listener.context.is_running:
+                listener.context.stop()
+
+    def quit(self):
+        """Stop and release all contexts
+        """
+        with self._lock:
+            listeners, self._listeners = self._listeners, []
+        for listener in listeners:
+            listener.context.quit()
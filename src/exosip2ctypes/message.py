@@ -2,13 +2,39 @@
 
 from __future__ import absolute_import, unicode_literals
 
-from ctypes import POINTER, byref, string_at, create_string_buffer, c_void_p, c_char_p, c_int, c_size_t
+import mmap
+import os
+from collections import namedtuple
+from ctypes import POINTER, byref, cast, string_at, create_string_buffer, c_char, c_void_p, c_char_p, c_int, c_size_t
 
 from ._c import lib, osip_parser, osip_content_type, osip_from, osip_header, osip_content_length, osip_body
+from ._c import globs, osip_list, osip_message
+from . import header
 from .error import raise_if_osip_error
 from .utils import to_str, to_bytes
 
-__all__ = ['OsipMessage', 'ExosipMessage']
+__all__ = ['OsipMessage', 'ParsedMessage', 'ExosipMessage', 'BodyPart']
+
+
+class BodyPart(namedtuple('BodyPart', ['content_type', 'data'])):
+    """A body (or a MIME part) of a message, yielded by :meth:`OsipMessage.iter_bodies`
+
+    `data` is `bytes`, or a `memoryview` on the message's own memory when not copied.
+    """
+    __slots__ = ()
+
+
+def _content_type_str(ptr):
+    if not ptr:
+        return None
+    dest = c_char_p()
+    err_code = osip_content_type.FuncContentTypeToStr.c_func(ptr, byref(dest))
+    raise_if_osip_error(err_code)
+    if not dest:
+        return None
+    result = to_str(dest.value)
+    lib.free(dest)
+    return result.strip()
 
 
 class OsipMessage(object):
@@ -47,6 +73,52 @@ class OsipMessage(object):
         """
         return self._ptr
 
+    @property
+    def _struct(self):
+        return cast(self._ptr, POINTER(osip_message.Message)).contents
+
+    @property
+    def is_request(self):
+        """`True` for a SIP request, `False` for a SIP response
+
+        :rtype: bool
+        """
+        return self._struct.sip_method is not None
+
+    @property
+    def method(self):
+        """Method of a SIP request, `None` for a response
+
+        :rtype: str
+        """
+        val = self._struct.sip_method
+        return to_str(val) if val is not None else None
+
+    @property
+    def request_uri(self):
+        """Request-Uri of a SIP request, `None` for a response
+
+        :rtype: header.Uri
+        """
+        return header._uri(self._struct.req_uri)
+
+    @property
+    def status_code(self):
+        """Status Code of a SIP response, `0` for a request
+
+        :rtype: int
+        """
+        return self._struct.status_code
+
+    @property
+    def reason_phrase(self):
+        """Reason Phrase of a SIP response, `None` for a request
+
+        :rtype: str
+        """
+        val = self._struct.reason_phrase
+        return to_str(val) if val is not None else None
+
     @property
     def call_id(self):
         """Call-id header.
@@ -69,18 +141,7 @@ class OsipMessage(object):
 
         :rtype: str
         """
-        head_ptr = osip_parser.FuncMessageGetContentType.c_func(self._ptr)
-        if not head_ptr:
-            return None
-        dest = c_char_p()
-        err_code = osip_content_type.FuncContentTypeToStr.c_func(
-            head_ptr, byref(dest))
-        raise_if_osip_error(err_code)
-        if not dest:
-            return None
-        result = to_str(dest.value)
-        lib.free(dest)
-        return result.strip()
+        return _content_type_str(osip_parser.FuncMessageGetContentType.c_func(self._ptr))
 
     @content_type.setter
     def content_type(self, val):
@@ -115,16 +176,10 @@ class OsipMessage(object):
         """From header
 
         :rtype: str
+
+        see :attr:`from_addr` for its parsed form
         """
-        ptr = osip_parser.FuncMessageGetFrom.c_func(self._ptr)
-        dest = c_char_p()
-        error_code = osip_from.FuncFromToStr.c_func(ptr, byref(dest))
-        raise_if_osip_error(error_code)
-        if not dest:
-            return None
-        result = to_str(dest.value)
-        lib.free(dest)
-        return result.strip()
+        return _from_to_str(osip_parser.FuncMessageGetFrom.c_func(self._ptr))
 
     @from_.setter
     def from_(self, val):
@@ -132,21 +187,25 @@ class OsipMessage(object):
         error_code = osip_parser.FuncMessageSetFrom.c_func(self._ptr, buf)
         raise_if_osip_error(error_code)
 
+    @property
+    def from_addr(self):
+        """Parsed From header
+
+        :rtype: header.NameAddr
+
+        Built from the parsed C structure, ``str()`` of it gives the header value.
+        """
+        return header._name_addr(osip_parser.FuncMessageGetFrom.c_func(self._ptr))
+
     @property
     def to(self):
         """To header.
 
         :rtype: str
+
+        see :attr:`to_addr` for its parsed form
         """
-        ptr = osip_parser.FuncMessageGetTo.c_func(self._ptr)
-        dest = c_char_p()
-        error_code = osip_from.FuncFromToStr.c_func(ptr, byref(dest))
-        raise_if_osip_error(error_code)
-        if not dest:
-            return None
-        result = to_str(dest.value)
-        lib.free(dest)
-        return result.strip()
+        return _from_to_str(osip_parser.FuncMessageGetTo.c_func(self._ptr))
 
     @to.setter
     def to(self, val):
@@ -154,29 +213,33 @@ class OsipMessage(object):
         error_code = osip_parser.FuncMessageSetTo.c_func(self._ptr, buf)
         raise_if_osip_error(error_code)
 
+    @property
+    def to_addr(self):
+        """Parsed To header
+
+        :rtype: header.NameAddr
+
+        Built from the parsed C structure, ``str()`` of it gives the header value.
+        """
+        return header._name_addr(osip_parser.FuncMessageGetTo.c_func(self._ptr))
+
     @property
     def contacts(self):
         """Get Contact header list.
 
         :rtype: list
+
+        see :attr:`contact_addrs` for their parsed form
         """
-        result = []
-        pos = 0
-        while True:
-            dest = c_void_p()
-            found_pos = osip_parser.FuncMessageGetContact.c_func(
-                self._ptr, c_int(pos), byref(dest))
-            if int(found_pos) < 0:
-                break
-            pos = int(found_pos) + 1
-            pch_contact = c_char_p()
-            error_code = osip_from.FuncFromToStr.c_func(
-                dest, byref(pch_contact))
-            raise_if_osip_error(error_code)
-            contact = to_str(pch_contact.value)
-            lib.free(pch_contact)
-            result.append(contact.strip())
-        return result
+        return self._get_elements(osip_parser.FuncMessageGetContact.c_func, _from_to_str)
+
+    @property
+    def contact_addrs(self):
+        """Parsed Contact header list
+
+        :rtype: list(header.NameAddr)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetContact.c_func, header._name_addr)
 
     def add_contact(self, val):
         """Set the Contact header.
@@ -207,6 +270,93 @@ class OsipMessage(object):
             result.append(to_str(dest.contents.value))
         return result
 
+    def _get_elements(self, func, convert, pos=0, count=None):
+        result = []
+        while count is None or len(result) < count:
+            dest = c_void_p()
+            found_pos = func(self._ptr, c_int(pos), byref(dest))
+            if int(found_pos) < 0:
+                break
+            pos = int(found_pos) + 1
+            result.append(convert(dest.value))
+        return result
+
+    @property
+    def via(self):
+        """The top-most Via header, only this one is converted.
+
+        :rtype: header.Via
+        """
+        result = self._get_elements(osip_parser.FuncMessageGetVia.c_func, header._via, count=1)
+        return result[0] if result else None
+
+    @property
+    def vias(self):
+        """Get Via header list.
+
+        :rtype: list(header.Via)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetVia.c_func, header._via)
+
+    @property
+    def cseq(self):
+        """CSeq header.
+
+        :rtype: header.CSeq
+        """
+        p_cseq = osip_parser.FuncMessageGetCSeq.c_func(self._ptr)
+        if not p_cseq:
+            return None
+        return header._cseq(p_cseq)
+
+    @property
+    def routes(self):
+        """Get Route header list.
+
+        :rtype: list(header.NameAddr)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetRoute.c_func, header._name_addr)
+
+    @property
+    def record_routes(self):
+        """Get Record-Route header list.
+
+        :rtype: list(header.NameAddr)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetRecordRoute.c_func, header._name_addr)
+
+    @property
+    def www_authenticates(self):
+        """Get WWW-Authenticate header list.
+
+        :rtype: list(header.Authenticate)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetWwwAuthenticate.c_func, header._authenticate)
+
+    @property
+    def proxy_authenticates(self):
+        """Get Proxy-Authenticate header list.
+
+        :rtype: list(header.Authenticate)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetProxyAuthenticate.c_func, header._authenticate)
+
+    @property
+    def authorizations(self):
+        """Get Authorization header list.
+
+        :rtype: list(header.Authorization)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetAuthorization.c_func, header._authorization)
+
+    @property
+    def proxy_authorizations(self):
+        """Get Proxy-Authorization header list.
+
+        :rtype: list(header.Authorization)
+        """
+        return self._get_elements(osip_parser.FuncMessageGetProxyAuthorization.c_func, header._authorization)
+
     def add_allow(self, val):
         """Set the Allow header.
 
@@ -243,6 +393,15 @@ class OsipMessage(object):
             result.append(to_str(val))
         return result
 
+    def get_name_addrs(self, name):
+        """Find "unknown" name-addr headers (not defined in oSIP), like `P-Asserted-Identity` or `Diversion`.
+
+        :param str name: The name of the header to find.
+        :return: Parsed header list, records of repeated values are shared through :data:`header.name_addr_cache`
+        :rtype: list(header.NameAddr)
+        """
+        return [header.name_addr_cache.parse(val) for val in self.get_headers(name)]
+
     def add_header(self, name, value):
         """Allocate and Add an "unknown" header (not defined in oSIP).
 
@@ -260,11 +419,75 @@ class OsipMessage(object):
         )
         raise_if_osip_error(error_code)
 
+    def add_headers(self, headers):
+        """Allocate and Add several "unknown" headers (not defined in oSIP) in one pass.
+
+        :param headers: `(name, value)` pairs, or a `dict` of names and values.
+        :type headers: collections.Iterable or dict
+
+        Header names are encoded only once for the whole batch,
+        so adding many headers with the same name costs a single name conversion.
+
+        .. attention:: This method will **ADD** create headers
+        """
+        if hasattr(headers, 'items'):
+            headers = headers.items()
+        func = osip_parser.FuncMessageSetHeader.c_func
+        names = {}
+        for name, value in headers:
+            try:
+                pc_name = names[name]
+            except KeyError:
+                pc_name = names[name] = to_bytes(name)
+            error_code = func(self._ptr, pc_name, to_bytes(value))
+            raise_if_osip_error(error_code)
+
+    def remove_headers(self, name):
+        """Remove all "unknown" headers (not defined in oSIP) of a name.
+
+        :param str name: The name of the headers to remove. (case-insensitive)
+        :return: Count of removed headers
+        :rtype: int
+
+        The header list is traversed only once, matched headers are then unlinked and freed.
+        """
+        struct = self._struct
+        name = to_bytes(name).lower()
+        found = []
+        for pos, elem in enumerate(osip_list.iter_elements(struct.headers)):
+            hname = cast(elem, POINTER(osip_header.Header)).contents.hname
+            if hname and hname.lower() == name:
+                found.append((pos, elem))
+        if not found:
+            return 0
+        for pos, elem in reversed(found):
+            osip_list.FuncListRemove.c_func(byref(struct.headers), c_int(pos))
+            osip_header.FuncHeaderFree.c_func(elem)
+        struct.message_property = osip_message.MESSAGE_PROPERTY_MODIFIED
+        return len(found)
+
+    def replace_header(self, name, value):
+        """Replace all "unknown" headers (not defined in oSIP) of a name with a single create one.
+
+        :param str name: The token name.
+        :param str value: The token value. If `None`, the headers are only removed.
+        :return: Count of replaced headers
+        :rtype: int
+
+        .. attention:: The create header is appended after the other headers
+        """
+        count = self.remove_headers(name)
+        if value is not None:
+            self.add_header(name, value)
+        return count
+
     @property
     def bodies(self):
         """Get body header list.
 
         :rtype: list
+
+        Every body is serialized and decoded as text, use :meth:`iter_bodies` for binary or large bodies.
         """
         result = []
         pos = 0
@@ -286,18 +509,174 @@ class OsipMessage(object):
             result.append(val)
         return result
 
+    def iter_bodies(self, copy=True):
+        """Iterate over bodies of the message, lazily.
+
+        :param bool copy: `True` yields `bytes` copies,
+            `False` yields `memoryview` objects on the message's own memory, without any copy.
+        :return: Generator of :class:`BodyPart`
+        :rtype: collections.Iterator
+
+        Each part's `content_type` is its MIME part Content-Type,
+        or the message's Content-Type if the part has none (a single body).
+        Binary data is kept as it is.
+
+        .. attention:: A `memoryview` is **only** valid while the message's C structure is alive,
+            eg: before the :class:`event.Event` which carries the message is disposed.
+        """
+        message_content_type = None
+        for elem in osip_list.iter_elements(self._struct.bodies):
+            st = cast(elem, POINTER(osip_body.Body)).contents
+            if st.content_type:
+                content_type = _content_type_str(st.content_type)
+            else:
+                if message_content_type is None:
+                    message_content_type = self.content_type
+                content_type = message_content_type
+            if not st.body:
+                data = b''
+            elif copy:
+                data = string_at(st.body, st.length)
+            else:
+                data = memoryview((c_char * st.length).from_address(st.body))
+                if hasattr(data, 'cast'):  # Python 3
+                    data = data.cast('B')
+            yield BodyPart(content_type, data)
+
     def add_body(self, val):
         """Fill the body of message.
 
-        :param str val: Body string.
+        :param val: Body data. `str` is encoded in UTF-8, `bytes` is used as it is.
+        :type val: str or bytes
 
         .. attention:: This method will **ADD** a create body
         """
-        buf = create_string_buffer(to_bytes(val))
+        data = to_bytes(val)
         err_code = osip_parser.FuncMessageSetBody.c_func(
-            self._ptr, buf, len(buf))
+            self._ptr, data, len(data))
         raise_if_osip_error(err_code)
 
+    def add_body_from_buffer(self, buf):
+        """Fill the body of message from an object supporting the buffer protocol.
+
+        :param buf: `bytes`, `bytearray`, `mmap.mmap`, `array.array`, writable `memoryview`...
+
+        oSIP copies data directly out of the buffer, no Python side copy is made.
+        (a read-only buffer other than `bytes` is copied once)
+
+        .. attention:: This method will **ADD** a create body
+        """
+        if isinstance(buf, bytes):
+            data = buf
+            length = len(buf)
+        else:
+            view = memoryview(buf)
+            length = view.nbytes if hasattr(view, 'nbytes') else len(view.tobytes())
+            try:
+                data = (c_char * length).from_buffer(buf)
+            except TypeError:  # read-only buffer
+                data = view.tobytes()
+        err_code = osip_parser.FuncMessageSetBody.c_func(
+            self._ptr, data, length)
+        raise_if_osip_error(err_code)
+
+    def add_body_from_file(self, file):
+        """Fill the body of message with whole content of a file.
+
+        :param file: File path, or a file object opened in binary mode.
+        :type file: str or file
+
+        The file is memory mapped, oSIP copies data directly out of the mapping.
+
+        .. attention:: This method will **ADD** a create body
+        """
+        if isinstance(file, (bytes, type(''))):
+            with open(file, 'rb') as fp:
+                return self.add_body_from_file(fp)
+        size = os.fstat(file.fileno()).st_size
+        if not size:
+            return self.add_body(b'')
+        mapped = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_COPY)
+        try:
+            self.add_body_from_buffer(mapped)
+        finally:
+            mapped.close()
+
+
+def _from_to_str(ptr):
+    if not ptr:
+        return None
+    dest = c_char_p()
+    error_code = osip_from.FuncFromToStr.c_func(ptr, byref(dest))
+    raise_if_osip_error(error_code)
+    if not dest:
+        return None
+    result = to_str(dest.value)
+    lib.free(dest)
+    return result.strip()
+
+
+class ParsedMessage(OsipMessage):
+
+    def __init__(self, data):
+        """A standalone message parsed from raw SIP data, not related to any eXosip context.
+
+        :param data: Raw SIP message, eg: a UDP payload or a message in a trace file.
+        :type data: bytes or str
+        :raises OsipError: When failed to parse
+
+        The `osip_message_t` structure belongs to the object, and is freed in :meth:`dispose`.
+        ``with`` statement is supported.
+        """
+        _ensure_parser()
+        ptr = c_void_p()
+        error_code = osip_parser.FuncMessageInit.c_func(byref(ptr))
+        raise_if_osip_error(error_code)
+        data = to_bytes(data)
+        error_code = osip_parser.FuncMessageParse.c_func(ptr, data, len(data))
+        if error_code < 0:
+            osip_parser.FuncMessageFree.c_func(ptr)
+        raise_if_osip_error(error_code)
+        super(ParsedMessage, self).__init__(ptr)
+
+    def __del__(self):
+        self.dispose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.dispose()
+
+    def dispose(self):
+        """Free the `osip_message_t` structure.
+
+        Don't use the object after disposed.
+        """
+        if getattr(self, '_ptr', None):
+            osip_parser.FuncMessageFree.c_func(self._ptr)
+            self._ptr = None
+
+    @property
+    def disposed(self):
+        """Is the `osip_message_t` structure freed
+
+        :rtype: bool
+        """
+        return self._ptr is None
+
+
+_parser_lib = None
+
+
+def _ensure_parser():
+    # oSIP's parser needs initializing once per loaded library,
+    # eXosip does it in eXosip_init, but a standalone parse may happen without any context.
+    global _parser_lib
+    if _parser_lib is not globs.libexosip2:
+        raise_if_osip_error(osip_parser.FuncParserInit.c_func())
+        _parser_lib = globs.libexosip2
+
 
 class ExosipMessage(OsipMessage):
 
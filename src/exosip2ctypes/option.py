@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+Typed eXosip2 options
+
+`eXosip_set_option` takes a `void *` whose target type depends on the option:
+an `int`, a `char *` string, or a structure.
+:class:`Option` enumerates the options, and :func:`validate_option` checks and normalizes their Python values,
+before :meth:`context.Context.set_option` converts them to C.
+
+A :class:`Profile` is a declarative set of options, applied as a whole when a context is created::
+
+    tuning = Profile(
+        udp_keep_alive=25,
+        use_rport=True,
+        dns_capabilities=2,
+        enable_reuse_tcp_port=True,
+        add_dns_cache=[('proxy.example.com', '192.0.2.10')],
+    )
+    ctx = Context(profile=tuning)
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from collections import OrderedDict
+from ctypes import byref, c_int, create_string_buffer
+
+from enum import IntEnum
+
+from ._c import conf
+from .utils import to_bytes, to_str
+
+__all__ = ['Option', 'Profile', 'to_option', 'validate_option', 'is_action', 'to_c_arg']
+
+
+class Option(IntEnum):
+    """Options of `eXosip_set_option`
+    """
+    #: `int`: Interval of UDP keep-alive packets, in seconds. `0` disables them
+    udp_keep_alive = conf.EXOSIP_OPT_UDP_KEEP_ALIVE
+    #: `bool`: Learn the public port from the `received`/`rport` parameters of responses
+    udp_learn_port = conf.EXOSIP_OPT_UDP_LEARN_PORT
+    #: `bool`: Add a `rport` parameter to the Via header of requests
+    use_rport = conf.EXOSIP_OPT_USE_RPORT
+    #: `str`: IPv4 address of the gateway, to guess the local address
+    set_ipv4_for_gateway = conf.EXOSIP_OPT_SET_IPV4_FOR_GATEWAY
+    #: `(host, ip)`: Add an entry to eXosip's DNS cache
+    add_dns_cache = conf.EXOSIP_OPT_ADD_DNS_CACHE
+    #: `(host, ip)`: Delete an entry of eXosip's DNS cache, `ip` is ignored
+    delete_dns_cache = conf.EXOSIP_OPT_DELETE_DNS_CACHE
+    #: `str`: IPv6 address of the gateway, to guess the local address
+    set_ipv6_for_gateway = conf.EXOSIP_OPT_SET_IPV6_FOR_GATEWAY
+    #: `(proxy, nat_ip, nat_port)`: Public address to use in requests sent to a proxy
+    add_account_info = conf.EXOSIP_OPT_ADD_ACCOUNT_INFO
+    #: `int`: DNS lookups: `0` for A records only, `1` for SRV, `2` for NAPTR and SRV
+    dns_capabilities = conf.EXOSIP_OPT_DNS_CAPABILITIES
+    #: `int`: DSCP value of sent packets, `0` to `63`
+    set_dscp = conf.EXOSIP_OPT_SET_DSCP
+    #: `bool`: Add a Date header to REGISTER requests
+    register_with_date = conf.EXOSIP_OPT_REGISTER_WITH_DATE
+    #: `str`: User-Agent header of requests, see :attr:`context.Context.user_agent`
+    set_header_user_agent = conf.EXOSIP_OPT_SET_HEADER_USER_AGENT
+    #: `bool`: Use eXosip's DNS cache
+    enable_dns_cache = conf.EXOSIP_OPT_ENABLE_DNS_CACHE
+    #: `bool`: Answer BYE requests automatically
+    enable_autoanswerbye = conf.EXOSIP_OPT_ENABLE_AUTOANSWERBYE
+    #: `bool`: Enable IPv6
+    enable_ipv6 = conf.EXOSIP_OPT_ENABLE_IPV6
+    #: `bool`: Reuse the listening port for outgoing TCP connections
+    enable_reuse_tcp_port = conf.EXOSIP_OPT_ENABLE_REUSE_TCP_PORT
+    #: `bool`: Use an ephemeral port in the Contact header of TCP/TLS requests
+    enable_use_ephemeral_port = conf.EXOSIP_OPT_ENABLE_USE_EPHEMERAL_PORT
+    #: `bool`: Verify the certificate of TLS peers
+    set_tls_verify_certificate = conf.EXOSIP_OPT_SET_TLS_VERIFY_CERTIFICATE
+    #: `str`: Name of the local client certificate, in the system's store
+    set_tls_client_certificate_name = conf.EXOSIP_OPT_SET_TLS_CLIENT_CERTIFICATE_NAME
+    #: `str`: Name of the local server certificate, in the system's store
+    set_tls_server_certificate_name = conf.EXOSIP_OPT_SET_TLS_SERVER_CERTIFICATE_NAME
+
+
+def _int(minimum=None, maximum=None):
+    def validate(value):
+        if isinstance(value, bool) or not isinstance(value, int) and not hasattr(value, '__index__'):
+            raise TypeError('An integer is required, not {!r}'.format(value))
+        value = int(value)
+        if minimum is not None and value < minimum or maximum is not None and value > maximum:
+            raise ValueError('{} is out of range [{}, {}]'.format(value, minimum, maximum))
+        return value
+
+    return validate
+
+
+def _bool(value):
+    if value not in (True, False):
+        raise TypeError('A boolean is required, not {!r}'.format(value))
+    return bool(value)
+
+
+def _str(value, size=None):
+    if not isinstance(value, (bytes, type(''))):
+        raise TypeError('A string is required, not {!r}'.format(value))
+    value = to_str(value)
+    if size is not None and len(to_bytes(value)) >= size:
+        raise ValueError('{!r} is longer than {} bytes'.format(value, size - 1))
+    return value
+
+
+def _dns_cache(value):
+    host, ip = value
+    return _str(host, 1024), _str(ip or '', 256)
+
+
+def _account_info(value):
+    proxy, nat_ip, nat_port = value
+    return _str(proxy, 1024), _str(nat_ip, 256), _int(0, 65535)(nat_port)
+
+
+#: Validator of every option
+_VALIDATORS = {
+    Option.udp_keep_alive: _int(0),
+    Option.udp_learn_port: _bool,
+    Option.use_rport: _bool,
+    Option.set_ipv4_for_gateway: _str,
+    Option.add_dns_cache: _dns_cache,
+    Option.delete_dns_cache: _dns_cache,
+    Option.set_ipv6_for_gateway: _str,
+    Option.add_account_info: _account_info,
+    Option.dns_capabilities: _int(0, 2),
+    Option.set_dscp: _int(0, 63),
+    Option.register_with_date: _bool,
+    Option.set_header_user_agent: _str,
+    Option.enable_dns_cache: _bool,
+    Option.enable_autoanswerbye: _bool,
+    Option.enable_ipv6: _bool,
+    Option.enable_reuse_tcp_port: _bool,
+    Option.enable_use_ephemeral_port: _bool,
+    Option.set_tls_verify_certificate: _bool,
+    Option.set_tls_client_certificate_name: _str,
+    Option.set_tls_server_certificate_name: _str,
+}
+
+#: Options which are actions, and have no current value
+_ACTIONS = frozenset([Option.add_dns_cache, Option.delete_dns_cache, Option.add_account_info])
+
+
+def to_option(key):
+    """Option of a key
+
+    :param key: :class:`Option`, its name or its value
+    :rtype: Option
+    :raises ValueError: if `key` is not an option
+    """
+    if isinstance(key, Option):
+        return key
+    try:
+        return Option(key)
+    except ValueError:
+        try:
+            return Option[to_str(key)]
+        except KeyError:
+            raise ValueError('Unknown option {!r}'.format(key))
+
+
+def validate_option(key, value):
+    """Check and normalize the value of an option
+
+    :param key: :class:`Option`, its name or its value
+    :param value: Python value, see :class:`Option`
+    :return: `(option, value)`, where value is normalized
+    :rtype: tuple
+    :raises ValueError: if the option is unknown, or the value out of range
+    :raises TypeError: if the value has a wrong type
+    """
+    option = to_option(key)
+    try:
+        return option, _VALIDATORS[option](value)
+    except (TypeError, ValueError) as err:
+        raise type(err)('Option {}: {}'.format(option.name, err))
+
+
+def is_action(option):
+    """Is the option an action (eg: adding a DNS cache entry), rather than a setting
+
+    :param Option option: option
+    :rtype: bool
+    """
+    return option in _ACTIONS
+
+
+def to_c_arg(option, value):
+    """Convert a validated value to the `void *` argument of `eXosip_set_option`
+
+    :param Option option: option
+    :param value: value returned by :func:`validate_option`
+    :return: `ctypes` object, to keep alive during the call
+    """
+    if option in (Option.add_dns_cache, Option.delete_dns_cache):
+        return byref(conf.DnsCache(to_bytes(value[0]), to_bytes(value[1])))
+    if option == Option.add_account_info:
+        return byref(conf.AccountInfo(to_bytes(value[0]), to_bytes(value[1]), value[2]))
+    if isinstance(value, bool) or isinstance(value, int):
+        return byref(c_int(value))
+    return create_string_buffer(to_bytes(value))
+
+
+class Profile(object):
+    """Declarative set of options, validated when the profile is created
+
+    Settings are applied in the order they were given: `options` first, then keyword arguments.
+    Python keeps the order of keyword arguments since version 3.6 only:
+    on older versions, give `options` as a sequence of `(option, value)` pairs when the order matters.
+
+    Action options (:attr:`Option.add_dns_cache`, :attr:`Option.delete_dns_cache`, :attr:`Option.add_account_info`)
+    take a list of values, applied one by one.
+    """
+
+    def __init__(self, options=None, **kwargs):
+        """
+        :param options: `{option: value}` mapping, or sequence of `(option, value)` pairs.
+            Options are :class:`Option` members, their names or their values
+        :param kwargs: More options, by name
+        """
+        self._options = OrderedDict()
+        self._update(options, kwargs)
+
+    def _update(self, options, kwargs):
+        if options is not None:
+            if hasattr(options, 'items'):
+                options = options.items()
+            for key, value in options:
+                self._set(key, value)
+        for key, value in kwargs.items():
+            self._set(key, value)
+
+    def _set(self, key, value):
+        option = to_option(key)
+        if is_action(option):
+            self._options[option] = [validate_option(option, x)[1] for x in value]
+        else:
+            self._options[option] = validate_option(option, value)[1]
+
+    def __repr__(self):
+        return '<Profile {}>'.format(', '.join('{}={!r}'.format(k.name, v) for k, v in self._options.items()))
+
+    def __len__(self):
+        return len(self._options)
+
+    def __iter__(self):
+        return iter(self._options)
+
+    def __contains__(self, key):
+        return to_option(key) in self._options
+
+    def __getitem__(self, key):
+        return self._options[to_option(key)]
+
+    def items(self):
+        """`(option, value)` pairs of the profile, in applying order
+
+        :rtype: list
+        """
+        return list(self._options.items())
+
+    def derive(self, options=None, **kwargs):
+        """A new profile, with the options of this one overridden by the given ones
+
+        :param options: see :class:`Profile`
+        :param kwargs: see :class:`Profile`
+        :rtype: Profile
+        """
+        profile = Profile(self._options)
+        profile._update(options, kwargs)
+        return profile
+
+    def apply(self, context):
+        """Set all options of the profile on a context
+
+        :param context.Context context: eXosip context
+        """
+        for option, value in self._options.items():
+            if is_action(option):
+                for x in value:
+                    context.set_option(option, x)
+            else:
+                context.set_option(option, value)
@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pacing and admission control of outbound INVITEs and REGISTERs
+
+Carriers limit the calls per second (CPS) and the concurrent calls they accept from a trunk,
+and answer bursts above these limits with `503`, or blacklist the sender.
+A :class:`Pacer` queues the requests and sends them no faster than:
+
+* a global token bucket,
+* a token bucket per destination (trunk),
+* a cap of concurrent calls per destination, released by `call_closed`/`call_released` events.
+
+The queue is bounded, and each request has a deadline::
+
+    pacer = Pacer(ctx, rate=200, max_queue=5000, timeout=10)
+    pacer.set_limits('carrier1.example.com', rate=30, max_calls=500)
+    pacer.start()
+
+    fut = pacer.send_invite(InitInvite(ctx, 'sip:1001@carrier1.example.com', 'sip:ivr@example.com'))
+    cid = fut.result()  # OsipTimeout if it could not be sent in 10 seconds
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from .error import OsipTimeout, OsipTooMuchCall
+from .event import EventType
+from .listener import parse_destination
+from .utils import LoggerMixin, TokenBucket, _monotonic
+
+__all__ = ['Trunk', 'Pacer']
+
+_CALL_END_EVENTS = frozenset([EventType.call_closed, EventType.call_released])
+
+
+class _RateMeter(object):
+    __slots__ = ('_window', '_start', '_count', '_rate')
+
+    def __init__(self, window=1.0):
+        self._window = window
+        self._start = _monotonic()
+        self._count = 0
+        self._rate = 0.0
+
+    def _roll(self, now):
+        elapsed = now - self._start
+        if elapsed >= self._window:
+            # a window without operations after the last one gives a zero rate
+            self._rate = self._count / elapsed if elapsed < 2 * self._window else 0.0
+            self._start = now
+            self._count = 0
+
+    def add(self, n=1):
+        self._roll(_monotonic())
+        self._count += n
+
+    @property
+    def rate(self):
+        self._roll(_monotonic())
+        return self._rate
+
+
+class Trunk(object):
+    """Limits and counters of a destination
+    """
+
+    __slots__ = ('_name', '_bucket', 'max_calls', 'active', 'queued', 'sent', 'expired', 'rejected', '_meter')
+
+    def __init__(self, name, rate=None, burst=None, max_calls=None):
+        self._name = name
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        #: Max concurrent calls, `None` for no limit
+        self.max_calls = max_calls
+        #: Count of calls in progress
+        self.active = 0
+        #: Count of queued requests
+        self.queued = 0
+        #: Count of sent requests
+        self.sent = 0
+        #: Count of requests whose deadline passed in the queue
+        self.expired = 0
+        #: Count of requests refused because the queue was full
+        self.rejected = 0
+        self._meter = _RateMeter()
+
+    def __repr__(self):
+        return '<Trunk {} active={} queued={}>'.format(self._name, self.active, self.queued)
+
+    @property
+    def name(self):
+        """Destination host
+
+        :rtype: str
+        """
+        return self._name
+
+    @property
+    def rate_limit(self):
+        """Requests per second allowed, `None` for no limit
+
+        :rtype: float
+        """
+        return self._bucket.rate if self._bucket else None
+
+    @property
+    def rate(self):
+        """Requests sent per second, measured over the last second
+
+        :rtype: float
+        """
+        return self._meter.rate
+
+    def _delay(self):
+        return self._bucket.delay() if self._bucket else 0
+
+    def _full(self):
+        return self.max_calls is not None and self.active >= self.max_calls
+
+
+class _Item(object):
+    __slots__ = ('trunk', 'send', 'is_call', 'deadline', 'future')
+
+    def __init__(self, trunk, send, is_call, deadline):
+        self.trunk = trunk
+        self.send = send
+        self.is_call = is_call
+        self.deadline = deadline
+        self.future = Future()
+
+
+class Pacer(LoggerMixin):
+    """Paced queue of outbound requests of a context
+    """
+
+    def __init__(self, context, rate=None, burst=None, max_queue=1000, timeout=5.0, batch_size=100):
+        """
+        :param context.Context context: eXosip context
+        :param float rate: Max requests sent per second, for all destinations. `None` for no limit
+        :param int burst: Max requests sent at once, default is `rate`
+        :param int max_queue: Max queued requests, for all destinations
+        :param float timeout: Default deadline of queued requests, in seconds. `None` for no deadline
+        :param int batch_size: Max requests sent under one context lock acquisition
+        """
+        self._context = context
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._max_queue = int(max_queue)
+        self._timeout = timeout
+        self._batch_size = int(batch_size)
+        self._trunks = {}
+        self._queue = deque()
+        self._calls = {}
+        self._meter = _RateMeter()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def context(self):
+        """eXosip context
+
+        :rtype: context.Context
+        """
+        return self._context
+
+    @property
+    def queue_depth(self):
+        """Count of queued requests
+
+        :rtype: int
+        """
+        return len(self._queue)
+
+    @property
+    def rate(self):
+        """Requests sent per second, for all destinations, measured over the last second
+
+        :rtype: float
+        """
+        return self._meter.rate
+
+    @property
+    def trunks(self):
+        """Destinations seen or configured
+
+        :rtype: list(Trunk)
+        """
+        return list(self._trunks.values())
+
+    @property
+    def stats(self):
+        """Live counters, per destination
+
+        :rtype: dict
+        """
+        return dict((t.name, {
+            'rate': t.rate, 'queued': t.queued, 'active': t.active,
+            'sent': t.sent, 'expired': t.expired, 'rejected': t.rejected,
+        }) for t in list(self._trunks.values()))
+
+    def get_trunk(self, destination):
+        """Trunk of a destination, created without limits if unknown
+
+        :param str destination: SIP URI, or host
+        :rtype: Trunk
+        """
+        name = parse_destination(destination)[0]
+        trunk = self._trunks.get(name)
+        if trunk is None:
+            with self._cond:
+                trunk = self._trunks.setdefault(name, Trunk(name))
+        return trunk
+
+    def set_limits(self, destination, rate=None, burst=None, max_calls=None):
+        """Set the limits of a destination
+
+        :param str destination: SIP URI, or host
+        :param float rate: Max requests sent per second, `None` for no limit
+        :param int burst: Max requests sent at once, default is `rate`
+        :param int max_calls: Max concurrent calls, `None` for no limit
+        :rtype: Trunk
+        """
+        trunk = self.get_trunk(destination)
+        with self._cond:
+            trunk._bucket = TokenBucket(rate, burst) if rate else None
+            trunk.max_calls = max_calls
+            self._cond.notify()
+        return trunk
+
+    def submit(self, destination, send, is_call=False, timeout=-1):
+        """Queue a sending
+
+        :param str destination: SIP URI, or host, of the request
+        :param callable send: Called with the context locked, when the limits allow it.
+            It sends the request, and returns its result. A call must return its call id.
+        :param bool is_call: Is it an initial INVITE, taking a concurrent call of the destination
+        :param float timeout: Seconds the request may wait in the queue, default is the pacer's timeout
+        :return: Future of the result of `send`, whose exception is :class:`error.OsipTimeout` if the deadline passed.
+            Cancelling it while it is queued drops the request.
+        :rtype: concurrent.futures.Future
+        :raises OsipTooMuchCall: if the queue is full
+        """
+        trunk = self.get_trunk(destination)
+        if timeout == -1:
+            timeout = self._timeout
+        item = _Item(trunk, send, is_call, None if timeout is None else _monotonic() + timeout)
+        with self._cond:
+            if len(self._queue) >= self._max_queue:
+                trunk.rejected += 1
+                raise OsipTooMuchCall('Pacing queue is full ({} requests)'.format(len(self._queue)))
+            self._queue.append(item)
+            trunk.queued += 1
+            self._cond.notify()
+        return item.future
+
+    def send_invite(self, invite, future=False, timeout=-1):
+        """Queue an initial INVITE, to its route, or else to its callee
+
+        :param call.InitInvite invite: INVITE
+        :param bool future: The future's result is a :class:`transaction.TransactionFuture` instead of the call id
+        :param float timeout: see :meth:`submit`
+        :rtype: concurrent.futures.Future
+        """
+        context = self._context
+
+        def send():
+            return context.call_send_init_invite(invite, future)
+
+        return self.submit(invite.route or invite.to_url, send, True, timeout)
+
+    def send_register(self, register, destination=None, future=False, timeout=-1):
+        """Queue a REGISTER
+
+        :param register: :class:`register.InitialRegister` or :class:`register.Register`
+        :param str destination: Registrar, default is the proxy of an :class:`register.InitialRegister`
+        :param bool future: see :meth:`register.InitialRegister.send`
+        :param float timeout: see :meth:`submit`
+        :rtype: concurrent.futures.Future
+        """
+        destination = destination or getattr(register, 'proxy', None)
+        if not destination:
+            raise ValueError('"destination" is required')
+        return self.submit(destination, lambda: register.send(future), False, timeout)
+
+    def bind(self):
+        """Follow the context's events, to release the concurrent calls
+        """
+        self._context.add_event_hook(self._hook)
+
+    def unbind(self):
+        """Stop following the context's events
+        """
+        self._context.remove_event_hook(self._hook)
+
+    def start(self):
+        """Follow the context's events, and start sending the queued requests, in a thread
+        """
+        if self._thread:
+            raise RuntimeError('Pacer already started.')
+        self.bind()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='Pacer-0x{:x}'.format(id(self)))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sending, and cancel the queued requests
+        """
+        if not self._thread:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        self.unbind()
+        with self._cond:
+            while self._queue:
+                item = self._queue.popleft()
+                item.trunk.queued -= 1
+                item.future.cancel()
+
+    def release(self, cid):
+        """Release the concurrent call of a call id. It is done by :meth:`bind` on `call_closed`/`call_released`.
+
+        :param int cid: call id
+        :return: Whether the call was counted
+        :rtype: bool
+        """
+        with self._cond:
+            trunk = self._calls.pop(cid, None)
+            if trunk is None:
+                return False
+            trunk.active -= 1
+            self._cond.notify()
+        return True
+
+    def _hook(self, context, evt):
+        if evt.type in _CALL_END_EVENTS and evt.cid in self._calls:
+            self.release(evt.cid)
+
+    def poll(self, now=None):
+        """Expire the queued requests past their deadline, and take the ones the limits allow
+
+        It is called by the pacer's thread. Taken requests count as sent, and reserve their concurrent call.
+
+        :param float now: Monotonic time, default is now
+        :return: `(items, delay)`: requests to send, and seconds before the next one may be sent (`None` if unknown)
+        :rtype: tuple
+        """
+        if now is None:
+            now = _monotonic()
+        ready = []
+        delay = None
+        with self._cond:
+            kept = deque()
+            blocked = set()
+            for item in self._queue:
+                trunk = item.trunk
+                if item.future.cancelled():
+                    trunk.queued -= 1
+                    continue
+                if item.deadline is not None and item.deadline <= now:
+                    trunk.queued -= 1
+                    if item.future.set_running_or_notify_cancel():
+                        trunk.expired += 1
+                        item.future.set_exception(OsipTimeout('Not sent within its deadline to {}'.format(trunk.name)))
+                    continue
+                if item.deadline is not None:
+                    delay = _min(delay, item.deadline - now)
+                if len(ready) >= self._batch_size or trunk in blocked or (item.is_call and trunk._full()):
+                    kept.append(item)
+                    continue
+                wait = max(self._bucket.delay() if self._bucket else 0, trunk._delay())
+                if wait > 0:
+                    # requests to this trunk wait, keeping their order
+                    blocked.add(trunk)
+                    delay = _min(delay, wait)
+                    kept.append(item)
+                    continue
+                trunk.queued -= 1
+                if not item.future.set_running_or_notify_cancel():
+                    # cancelled since checked above
+                    continue
+                if self._bucket:
+                    self._bucket.take(block=False)
+                if trunk._bucket:
+                    trunk._bucket.take(block=False)
+                if item.is_call:
+                    trunk.active += 1
+                ready.append(item)
+            self._queue = kept
+        if len(ready) >= self._batch_size:
+            delay = 0
+        return ready, delay
+
+    def _run(self):
+        self.logger.debug('<0x%x>_run: >>>', id(self))
+        while True:
+            with self._cond:
+                if self._stopping:
+                    break
+            ready, delay = self.poll()
+            if ready:
+                self._send(ready)
+                continue
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(delay)
+        self.logger.debug('<0x%x>_run: <<<', id(self))
+
+    def _send(self, items):
+        results = []
+        with self._context.lock:
+            for item in items:
+                try:
+                    result = item.send()
+                except Exception as err:
+                    results.append((item, None, err))
+                    continue
+                if item.is_call:
+                    # before the lock is released, and so before any event of the call
+                    with self._cond:
+                        self._calls[getattr(result, 'id', result)] = item.trunk
+                results.append((item, result, None))
+        for item, result, err in results:
+            trunk = item.trunk
+            if err is not None:
+                self.logger.error('<0x%x>_send: %s: %s', id(self), trunk.name, err)
+                if item.is_call:
+                    with self._cond:
+                        trunk.active -= 1
+                item.future.set_exception(err)
+                continue
+            trunk.sent += 1
+            trunk._meter.add()
+            self._meter.add()
+            item.future.set_result(result)
+
+
+def _min(a, b):
+    return b if a is None else min(a, b)
@@ -1,18 +1,34 @@
 # -*- coding: utf-8 -*-
 
 """eXosip2 REGISTER and Registration Management
+
+:class:`RegistrationManager` registers many AORs from one context, with paced initial REGISTERs
+and spread refreshes.
 """
 
 from __future__ import absolute_import, unicode_literals
 
+import heapq
+import random
+import threading
+import time
+from collections import deque
+from itertools import islice
+from operator import attrgetter
 from ctypes import byref, create_string_buffer, c_void_p, c_int
 
+from enum import IntEnum
+
 from ._c import register
-from .error import raise_if_osip_error
+from .error import raise_if_osip_error, OsipError
+from .event import EventType
 from .message import ExosipMessage
-from .utils import to_bytes
+from .utils import to_bytes, LoggerMixin, TokenBucket
 
-__all__ = ['InitialRegister', 'Register']
+__all__ = ['InitialRegister', 'Register', 'RegistrationState', 'Registration', 'RegistrationIndex',
+           'RegistrationManager']
+
+_AUTH_CHALLENGES = (401, 407)
 
 
 class InitialRegister(ExosipMessage):
@@ -89,11 +105,13 @@ class InitialRegister(ExosipMessage):
         """
         return self._expires
 
-    def send(self):
+    def send(self, future=False):
         """Send this REGISTER request
+
+        :param bool future: Return a future of the final response
+        :return: `None`, or a :class:`transaction.TransactionFuture` if `future` is `True`
         """
-        error_code = register.FuncRegisterSendSegister.c_func(self.context.ptr, c_int(self._rid), self.ptr)
-        raise_if_osip_error(error_code)
+        return _send(self, future)
 
     def remove(self):
         """Remove existing registration without sending REGISTER.
@@ -152,11 +170,13 @@ class Register(ExosipMessage):
         """
         return self._expires
 
-    def send(self):
+    def send(self, future=False):
         """Send this REGISTER request
+
+        :param bool future: Return a future of the final response
+        :return: `None`, or a :class:`transaction.TransactionFuture` if `future` is `True`
         """
-        error_code = register.FuncRegisterSendSegister.c_func(self.context.ptr, c_int(self._rid), self.ptr)
-        raise_if_osip_error(error_code)
+        return _send(self, future)
 
     def remove(self):
         """Remove existing registration without sending REGISTER.
@@ -166,3 +186,517 @@ class Register(ExosipMessage):
         """
         error_code = register.FuncRegisterRemove.c_func(self.context.ptr, c_int(self._rid))
         raise_if_osip_error(error_code)
+
+
+def _send(msg, future):
+    error_code = register.FuncRegisterSendSegister.c_func(msg.context.ptr, c_int(msg.rid), msg.ptr)
+    raise_if_osip_error(error_code)
+    if future:
+        return msg.context.transactions.watch_registration(msg.rid)
+
+
+class RegistrationState(IntEnum):
+    """Enumeration of registration states tracked by :class:`RegistrationIndex`
+    """
+
+    #: Waiting to be sent, or sent without final answer yet
+    pending = 0
+    #: Registered
+    registered = 1
+    #: Registration failed
+    failed = 2
+    #: REGISTER with expires `0` sent
+    unregistering = 3
+
+
+class Registration(object):
+    """Registration of an AOR in :class:`RegistrationIndex`
+
+    .. attention:: Records are updated by the index, treat them as read-only.
+    """
+
+    __slots__ = ('aor', 'proxy', 'contact', 'expires', 'rid', 'state', 'expiry', 'status_code')
+
+    def __init__(self, aor, proxy, contact=None, expires=3600):
+        #: Address of record, the `From` url of the REGISTER
+        self.aor = aor
+        #: Proxy (registrar) url
+        self.proxy = proxy
+        #: Contact address, `None` to let eXosip manage it
+        self.contact = contact
+        #: Expires value of the REGISTER, in seconds
+        self.expires = expires
+        #: Registration id, `0` until sent
+        self.rid = 0
+        #: :class:`RegistrationState` of the registration
+        self.state = RegistrationState.pending
+        #: Time the registration ends at, if not refreshed (seconds since the epoch), `None` if not registered
+        self.expiry = None
+        #: Status code of the last final answer, `0` if none
+        self.status_code = 0
+
+    def __repr__(self):
+        return '<Registration aor:{!r} rid:{} state:{}>'.format(self.aor, self.rid, self.state.name)
+
+
+class RegistrationIndex(LoggerMixin):
+    """Index of the registrations of a context: AOR, rid, state and expiry
+
+    Lookups by AOR or rid and counts by state are `O(1)`.
+    Once bound, the index follows `registration_success` and `registration_failure` events through an event hook;
+    registrations unknown yet are added from the `To` header of the event's REGISTER,
+    so it also indexes registrations sent with :class:`InitialRegister` directly.
+
+    eg::
+
+        index = RegistrationIndex(ctx)
+        index.bind()
+        # elsewhere
+        record = index.get('sip:1001@example.com')
+        registered = record is not None and record.state == RegistrationState.registered
+        # unregister every failed AOR
+        index.unregister(index.iter_state(RegistrationState.failed))
+    """
+
+    def __init__(self, context):
+        """
+        :param context.Context context: eXosip context
+        """
+        self._context = context
+        self._by_aor = {}
+        self._by_rid = {}
+        self._by_state = dict((state, {}) for state in RegistrationState)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._by_aor)
+
+    def __contains__(self, aor):
+        return aor in self._by_aor
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._by_aor.values()))
+
+    @property
+    def context(self):
+        """eXosip context
+
+        :rtype: context.Context
+        """
+        return self._context
+
+    @property
+    def lock(self):
+        """Lock of the index, records are updated under it
+
+        :rtype: threading.RLock
+        """
+        return self._lock
+
+    @property
+    def counts(self):
+        """Count of registrations by state
+
+        :rtype: dict(RegistrationState, int)
+        """
+        with self._lock:
+            return dict((state, len(records)) for state, records in self._by_state.items())
+
+    def count(self, state):
+        """Count of registrations in a state
+
+        :param RegistrationState state: State
+        :rtype: int
+        """
+        return len(self._by_state[state])
+
+    def bind(self):
+        """Follow the registration events of the context
+        """
+        self._context.add_event_hook(self._on_event)
+
+    def unbind(self):
+        """Stop following the registration events of the context
+        """
+        self._context.remove_event_hook(self._on_event)
+
+    def get(self, aor):
+        """Registration of an AOR
+
+        :param str aor: Address of record
+        :rtype: Registration or None
+        """
+        return self._by_aor.get(aor)
+
+    def get_by_rid(self, rid):
+        """Registration of a registration id
+
+        :param int rid: Registration id
+        :rtype: Registration or None
+        """
+        return self._by_rid.get(rid)
+
+    def iter_state(self, state):
+        """Registrations in a state
+
+        :param RegistrationState state: State
+        :return: Snapshot of the registrations
+        :rtype: list(Registration)
+        """
+        with self._lock:
+            return list(self._by_state[state].values())
+
+    def by_expiry(self, limit=None):
+        """Registered AORs, the soonest expiring first
+
+        :param int limit: Max count of registrations, `None` for all
+        :rtype: list(Registration)
+        """
+        with self._lock:
+            records = list(self._by_state[RegistrationState.registered].values())
+        key = attrgetter('expiry')
+        if limit is None:
+            return sorted(records, key=key)
+        return heapq.nsmallest(limit, records, key=key)
+
+    def add(self, record):
+        """Add a registration
+
+        :param Registration record: Registration
+        :return: `False` if its AOR is already indexed
+        :rtype: bool
+        """
+        with self._lock:
+            if record.aor in self._by_aor:
+                return False
+            self._by_aor[record.aor] = record
+            self._by_state[record.state][record.aor] = record
+            if record.rid:
+                self._by_rid[record.rid] = record
+            return True
+
+    def discard(self, aor):
+        """Remove a registration from the index, without any SIP action
+
+        :param str aor: Address of record
+        :return: The removed registration
+        :rtype: Registration or None
+        """
+        with self._lock:
+            record = self._by_aor.pop(aor, None)
+            if record is not None:
+                del self._by_state[record.state][aor]
+                if self._by_rid.get(record.rid) is record:
+                    del self._by_rid[record.rid]
+            return record
+
+    def set_rid(self, record, rid):
+        """Set the registration id of an indexed registration
+
+        :param Registration record: Registration
+        :param int rid: Registration id
+        """
+        with self._lock:
+            if self._by_rid.get(record.rid) is record:
+                del self._by_rid[record.rid]
+            record.rid = rid
+            self._by_rid[rid] = record
+
+    def set_state(self, record, state, status_code=None):
+        """Set the state of an indexed registration
+
+        :param Registration record: Registration
+        :param RegistrationState state: New state
+        :param int status_code: Status code of the final answer, if any
+        """
+        with self._lock:
+            del self._by_state[record.state][record.aor]
+            self._by_state[state][record.aor] = record
+            record.state = state
+            if status_code is not None:
+                record.status_code = status_code
+            record.expiry = time.time() + record.expires if state == RegistrationState.registered else None
+
+    def update(self, evt):
+        """Update the index from a registration event
+
+        :param event.Event evt: `registration_success` or `registration_failure` event
+        :return: The registration, `None` if the event is not about a registration
+        :rtype: Registration or None
+        """
+        if evt.type == EventType.registration_success:
+            state = RegistrationState.registered
+        elif evt.type == EventType.registration_failure:
+            state = RegistrationState.failed
+        else:
+            return None
+        status_code = evt.response.status_code if evt.response else 0
+        with self._lock:
+            record = self._by_rid.get(evt.rid)
+            if record is None:
+                record = self._record_of(evt)
+                if record is None:
+                    return None
+            if state == RegistrationState.failed and status_code in _AUTH_CHALLENGES \
+                    and record.status_code not in _AUTH_CHALLENGES:
+                # eXosip's automatic action answers a first challenge, only a second one is a failure
+                record.status_code = status_code
+            elif record.state == RegistrationState.unregistering:
+                if state == RegistrationState.registered:
+                    self.discard(record.aor)
+                else:
+                    self.set_state(record, state, status_code)
+            else:
+                self.set_state(record, state, status_code)
+            return record
+
+    def _record_of(self, evt):
+        request = evt.request
+        if request is None:
+            return None
+        to = request.to_addr
+        aor = str(to.uri)
+        record = self._by_aor.get(aor)
+        if record is None:
+            record = Registration(aor, str(request.request_uri))
+            self.add(record)
+        self.set_rid(record, evt.rid)
+        return record
+
+    def _on_event(self, context, evt):
+        if evt.rid > 0:
+            self.update(evt)
+
+    def _in_batches(self, records, batch_size, func):
+        failures = []
+        records = iter(records)
+        batch = list(islice(records, batch_size))
+        while batch:
+            with self._context.lock:
+                for record in batch:
+                    if not isinstance(record, Registration):
+                        record = self._by_aor.get(record)
+                        if record is None:
+                            continue
+                    try:
+                        func(record)
+                    except OsipError as err:
+                        failures.append((record, err))
+            batch = list(islice(records, batch_size))
+        return failures
+
+    def unregister(self, records, batch_size=500):
+        """Unregister AORs, sending REGISTERs with expires `0`
+
+        The context is locked once per batch.
+        The registrations are removed from the index once the registrar accepts.
+
+        :param records: :class:`Registration` records, or AORs
+        :param int batch_size: Count of REGISTERs sent per lock acquisition
+        :return: Failures, as `(registration, error)` tuples
+        :rtype: list
+        """
+        def func(record):
+            if not record.rid:
+                self.discard(record.aor)
+                return
+            Register(self._context, record.rid, 0).send()
+            self.set_state(record, RegistrationState.unregistering)
+
+        return self._in_batches(records, batch_size, func)
+
+    def remove(self, records, batch_size=500):
+        """Remove registrations without sending REGISTER, and from the index
+
+        The context is locked once per batch.
+
+        :param records: :class:`Registration` records, or AORs
+        :param int batch_size: Count of registrations removed per lock acquisition
+        :return: Failures, as `(registration, error)` tuples
+        :rtype: list
+        """
+        def func(record):
+            if record.rid:
+                raise_if_osip_error(register.FuncRegisterRemove.c_func(self._context.ptr, c_int(record.rid)))
+            self.discard(record.aor)
+
+        return self._in_batches(records, batch_size, func)
+
+
+class RegistrationManager(LoggerMixin):
+    """Registers many AORs from one context
+
+    * Initial REGISTERs are paced by a token bucket, sent in batches under one context lock acquisition each.
+    * The expires value of each AOR is jittered, so that eXosip's automatic refreshes are spread over time,
+      instead of all firing in the same :meth:`context.Context.automatic_action`.
+    * The state of each registration is tracked in a :class:`RegistrationIndex`.
+
+    eg::
+
+        manager = RegistrationManager(ctx, 'sip:registrar.example.com', rate=200)
+        manager.add('sip:{}@example.com'.format(ext) for ext in range(10000, 30000))
+        manager.start()
+    """
+
+    def __init__(self, context, proxy, expires=3600, jitter=0.2, rate=100, burst=None, index=None):
+        """
+        :param context.Context context: eXosip context
+        :param str proxy: Default proxy (registrar) url
+        :param int expires: Max expires value, in seconds
+        :param float jitter: Expires values are drawn evenly in `[expires * (1 - jitter), expires]`
+        :param float rate: Initial REGISTERs sent per second
+        :param int burst: Max initial REGISTERs sent at once, default is `rate`
+        :param RegistrationIndex index: Index of the registrations, default is a new one
+        """
+        if not 0 <= jitter < 1:
+            raise ValueError('"jitter" must be in [0, 1)')
+        self._context = context
+        self._proxy = proxy
+        self._expires = int(expires)
+        self._jitter = float(jitter)
+        self._bucket = TokenBucket(rate, burst)
+        self._index = index if index is not None else RegistrationIndex(context)
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    @property
+    def context(self):
+        """eXosip context
+
+        :rtype: context.Context
+        """
+        return self._context
+
+    @property
+    def index(self):
+        """Index of the registrations
+
+        :rtype: RegistrationIndex
+        """
+        return self._index
+
+    @property
+    def counts(self):
+        """Count of registrations by state
+
+        :rtype: dict(RegistrationState, int)
+        """
+        return self._index.counts
+
+    @property
+    def registered(self):
+        """Count of registered AORs
+
+        :rtype: int
+        """
+        return self._index.count(RegistrationState.registered)
+
+    @property
+    def pending(self):
+        """Count of AORs waiting for registration
+
+        :rtype: int
+        """
+        return self._index.count(RegistrationState.pending)
+
+    @property
+    def failed(self):
+        """Count of AORs whose registration failed
+
+        :rtype: int
+        """
+        return self._index.count(RegistrationState.failed)
+
+    def get(self, aor):
+        """Registration of an AOR
+
+        :param str aor: Address of record
+        :rtype: Registration or None
+        """
+        return self._index.get(aor)
+
+    def get_by_rid(self, rid):
+        """Registration of a registration id
+
+        :param int rid: Registration id
+        :rtype: Registration or None
+        """
+        return self._index.get_by_rid(rid)
+
+    def add(self, aors, proxy=None, contact=None):
+        """Queue AORs for registration
+
+        :param aors: Addresses of record, AORs already added are skipped
+        :param str proxy: Proxy url for these AORs, default is the manager's one
+        :param str contact: Contact address for these AORs, `None` to let eXosip manage it
+        :return: Count of AORs added
+        :rtype: int
+        """
+        low = self._expires * (1 - self._jitter)
+        records = [
+            Registration(aor, proxy or self._proxy, contact, int(round(random.uniform(low, self._expires))))
+            for aor in aors
+        ]
+        records = [record for record in records if self._index.add(record)]
+        with self._cond:
+            self._queue.extend(records)
+            self._cond.notify()
+        return len(records)
+
+    def start(self):
+        """Follow the context's registration events and start sending the queued REGISTERs, in a thread
+        """
+        if self._thread:
+            raise RuntimeError('Registration manager already started.')
+        self._index.bind()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='RegistrationManager-0x{:x}'.format(id(self)))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sending queued REGISTERs and following events. Registrations already sent stay alive.
+        """
+        if not self._thread:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        self._index.unbind()
+
+    def _run(self):
+        self.logger.debug('<0x%x>_run: >>>', id(self))
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    break
+                count = len(self._queue)
+            count = self._bucket.take(count)
+            with self._cond:
+                batch = [self._queue.popleft() for _ in range(min(count, len(self._queue)))]
+            with self._context.lock:
+                for record in batch:
+                    self._send(record)
+        self.logger.debug('<0x%x>_run: <<<', id(self))
+
+    def _send(self, record):
+        try:
+            msg = InitialRegister(self._context, record.aor, record.proxy, record.contact, record.expires)
+            self._index.set_rid(record, msg.rid)
+            msg.send()
+        except OsipError as err:
+            self.logger.error('<0x%x>_send: %r: %s', id(self), record, err)
+            self._index.set_state(record, RegistrationState.failed)
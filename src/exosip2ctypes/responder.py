@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+"""
+Declarative automatic responses
+
+An :class:`AutoResponder` holds :class:`AutoResponse` rules.
+The context's event loop thread applies them to raw events, in the same lock section as
+:meth:`context.Context.automatic_action`, before any :class:`event.Event` object is created.
+An event answered by a rule is consumed: hooks and the event callback only see the other events.
+
+eg, a simple IVR front-end::
+
+    ctx.auto_responder.add(AutoResponse(
+        EventType.call_invite, 200, provisional=(180,),
+        body=lambda request: answerer.answer(SdpMessage.from_message(request), ports.allocate()),
+        content_type=sdp.CONTENT_TYPE,
+        request_uri=r'^sip:ivr@',
+    ))
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+from ctypes import byref, c_int, c_void_p
+
+from ._c import call, message, osip_parser
+from .error import raise_if_osip_error
+from .event import EventType
+from .message import ExosipMessage
+from .utils import to_str, LoggerMixin
+
+__all__ = ['AutoResponse', 'AutoResponder']
+
+_CALL_REQUEST_EVENTS = frozenset([EventType.call_invite, EventType.call_reinvite, EventType.call_message_new])
+_MESSAGE_REQUEST_EVENTS = frozenset([EventType.message_new])
+
+
+class AutoResponse(object):
+    """Rule answering a new request with a status, and optionally a body
+
+    A rule matches events of its type, whose request matches all of its optional conditions.
+    """
+
+    __slots__ = ('_event_type', '_status', '_provisional', '_body', '_content_type', '_method', '_request_uri',
+                 '_header', '_header_value', 'count')
+
+    def __init__(self, event_type, status, body=None, content_type=None, provisional=(), method=None,
+                 request_uri=None, header=None):
+        """
+        :param EventType event_type: Type of the events to answer:
+            :attr:`EventType.call_invite`, :attr:`EventType.call_reinvite`, :attr:`EventType.call_message_new`
+            or :attr:`EventType.message_new`
+        :param int status: Final status code of the answer
+        :param body: Body of the final answer:
+            `str` or `bytes` template sent as is,
+            or a callable called with the request (:class:`message.ExosipMessage`) returning it
+        :param str content_type: Content-Type of the body
+        :param provisional: Status codes of provisional answers sent before the final one, eg `(180,)`
+        :param str method: Match only requests of this method, eg `'OPTIONS'` for `message_new`
+        :param str request_uri: Match only requests whose Request-Uri matches this regular expression
+        :param tuple header: Match only requests with a `(name, regular expression)` header
+        """
+        event_type = EventType(event_type)
+        if event_type not in _CALL_REQUEST_EVENTS and event_type not in _MESSAGE_REQUEST_EVENTS:
+            raise ValueError('Can not answer events of type {}'.format(event_type.name))
+        if body is not None and not content_type:
+            raise ValueError('"content_type" is required with "body"')
+        self._event_type = event_type
+        self._status = int(status)
+        self._provisional = tuple(int(x) for x in provisional)
+        self._body = body
+        self._content_type = content_type
+        self._method = method.upper() if method else None
+        self._request_uri = re.compile(request_uri) if request_uri else None
+        if header:
+            self._header = header[0]
+            self._header_value = re.compile(header[1])
+        else:
+            self._header = self._header_value = None
+        #: Count of events answered by the rule
+        self.count = 0
+
+    @property
+    def event_type(self):
+        """Type of the events answered by the rule
+
+        :rtype: EventType
+        """
+        return self._event_type
+
+    @property
+    def status(self):
+        """Final status code of the answer
+
+        :rtype: int
+        """
+        return self._status
+
+    def match(self, request):
+        """Check the conditions of the rule on a request
+
+        :param message.OsipMessage request: Request of an event
+        :rtype: bool
+        """
+        if self._method and request.method != self._method:
+            return False
+        if self._request_uri and not self._request_uri.search(str(request.request_uri)):
+            return False
+        if self._header:
+            values = request.get_headers(self._header)
+            if not any(self._header_value.search(v) for v in values):
+                return False
+        return True
+
+    def send(self, context, tid, request):
+        """Send the answers of the rule
+
+        :param context.Context context: eXosip context, locked
+        :param int tid: id of the transaction to answer
+        :param message.ExosipMessage request: Request of the transaction
+        :raises Exception: the error of the first answer which failed, the next ones are not sent
+        """
+        _, err = self._answer(context, tid, request)
+        if err is not None:
+            raise err
+
+    def _answer(self, context, tid, request):
+        # returns the count of answers sent, and the error of the failed one
+        if self._event_type in _MESSAGE_REQUEST_EVENTS:
+            build_func, send_func = message.FuncMessageBuildAnswer, message.FuncMessageSendAnswer
+        else:
+            build_func, send_func = call.FuncCallBuildAnswer, call.FuncCallSendAnswer
+        sent = 0
+        try:
+            for status in self._provisional:
+                raise_if_osip_error(send_func.c_func(context.ptr, c_int(tid), c_int(status), None))
+                sent += 1
+            ptr = None
+            if self._body is not None or 200 <= self._status < 300:
+                ptr = c_void_p()
+                raise_if_osip_error(build_func.c_func(context.ptr, c_int(tid), c_int(self._status), byref(ptr)))
+                if self._body is not None:
+                    try:
+                        answer = ExosipMessage(ptr, context)
+                        answer.content_type = self._content_type
+                        answer.add_body(self._body(request) if callable(self._body) else self._body)
+                    except Exception:
+                        osip_parser.FuncMessageFree.c_func(ptr)
+                        raise
+            # eXosip owns the answer from here, sent or not
+            raise_if_osip_error(send_func.c_func(context.ptr, c_int(tid), c_int(self._status), ptr))
+            sent += 1
+        except Exception as err:
+            return sent, err
+        self.count += 1
+        return sent, None
+
+
+class AutoResponder(LoggerMixin):
+    """Set of :class:`AutoResponse` rules of a context
+
+    Rules are indexed by event type, then tried in the order they were added; the first matching one answers.
+    An event type without rule costs one dictionary lookup.
+
+    .. attention::
+        Events answered automatically never reach hooks or the event callback.
+        Later events of the same call (`call_ack`, `call_closed`...) are not consumed, though.
+
+        An event is consumed as soon as one answer was sent: if the final answer of a rule fails
+        after its provisional ones, the failure is logged, and the transaction is left to time out
+        rather than answered twice.
+    """
+
+    def __init__(self):
+        self._rules = {}
+
+    def __len__(self):
+        return sum(len(rules) for rules in self._rules.values())
+
+    def __bool__(self):
+        return bool(self._rules)
+
+    __nonzero__ = __bool__
+
+    @property
+    def rules(self):
+        """All rules
+
+        :rtype: list
+        """
+        return [rule for rules in self._rules.values() for rule in rules]
+
+    def add(self, rule):
+        """Add a rule, after the existing ones of the same event type
+
+        :param AutoResponse rule: Rule
+        """
+        self._rules[int(rule.event_type)] = self._rules.get(int(rule.event_type), ()) + (rule,)
+
+    def remove(self, rule):
+        """Remove a rule
+
+        :param AutoResponse rule: Rule
+        """
+        rules = list(self._rules.get(int(rule.event_type), ()))
+        rules.remove(rule)
+        if rules:
+            self._rules[int(rule.event_type)] = tuple(rules)
+        else:
+            del self._rules[int(rule.event_type)]
+
+    def clear(self):
+        """Remove all rules
+        """
+        self._rules = {}
+
+    def respond(self, context, evt_ptr):
+        """Answer a raw event if a rule matches
+
+        It is called in the event loop thread, with the context locked.
+
+        :param context.Context context: eXosip context
+        :param evt_ptr: `struct eXosip_event_t *`
+        :return: Whether the event was answered, at least in part, and so consumed
+        :rtype: bool
+        """
+        evt = evt_ptr.contents
+        rules = self._rules.get(evt.type)
+        if not rules or not evt.request:
+            return False
+        request = ExosipMessage(evt.request, context)
+        for rule in rules:
+            try:
+                if not rule.match(request):
+                    continue
+            except Exception:
+                self.logger.exception('<0x%x>respond: rule %r, event %r', id(self), rule, to_str(evt.textinfo))
+                return False
+            sent, err = rule._answer(context, evt.tid, request)
+            if err is not None:
+                self.logger.error('<0x%x>respond: rule %r, event %r, %d answer(s) sent: %r',
+                                  id(self), rule, to_str(evt.textinfo), sent, err)
+                return sent > 0
+            return True
+        return False
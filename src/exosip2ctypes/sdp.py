@@ -2,22 +2,788 @@
 
 """
 eXosip2 SDP helper API.
+
+:class:`SdpMessage` wraps oSIP's `sdp_message_t`.
+The C structure is traversed once, on first access to any of its fields,
+then media lines and codecs are served from Python lookup tables.
+
+:class:`SdpAnswerer` builds SDP answer bodies for offers, out of a capability set compiled once.
+
+:class:`RtpPortAllocator` hands out RTP ports for those bodies, and gets them back when calls are released.
 """
 
 from __future__ import absolute_import, unicode_literals
 
-__all__ = ['SdpMessage']
+import itertools
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+from ctypes import byref, c_char_p, c_int, c_void_p
+
+from ._c import lib, sdp, sdp_message
+from .error import raise_if_osip_error, OsipNoCommonCodec, OsipPortBusy
+from .event import EventType
+from .utils import to_bytes, to_str, _monotonic
+
+__all__ = ['SdpMessage', 'Media', 'Codec', 'Origin', 'Connection', 'SdpAnswerer', 'RtpPortAllocator',
+           'STATIC_PAYLOAD_TYPES', 'CONTENT_TYPE']
+
+#: Content-Type of SDP bodies
+CONTENT_TYPE = 'application/sdp'
+
+#: RTP/AVP static payload types (RFC 3551): `payload type -> (encoding name, clock rate, channels)`
+STATIC_PAYLOAD_TYPES = {
+    0: ('PCMU', 8000, 1),
+    3: ('GSM', 8000, 1),
+    4: ('G723', 8000, 1),
+    5: ('DVI4', 8000, 1),
+    6: ('DVI4', 16000, 1),
+    7: ('LPC', 8000, 1),
+    8: ('PCMA', 8000, 1),
+    9: ('G722', 8000, 1),
+    10: ('L16', 44100, 2),
+    11: ('L16', 44100, 1),
+    12: ('QCELP', 8000, 1),
+    13: ('CN', 8000, 1),
+    14: ('MPA', 90000, 1),
+    15: ('G728', 8000, 1),
+    16: ('DVI4', 11025, 1),
+    17: ('DVI4', 22050, 1),
+    18: ('G729', 8000, 1),
+    25: ('CelB', 90000, 1),
+    26: ('JPEG', 90000, 1),
+    28: ('nv', 90000, 1),
+    31: ('H261', 90000, 1),
+    32: ('MPV', 90000, 1),
+    33: ('MP2T', 90000, 1),
+    34: ('H263', 90000, 1),
+}
+
+_DIRECTIONS = ('sendrecv', 'sendonly', 'recvonly', 'inactive')
+
+
+class Origin(namedtuple('Origin', ['username', 'sess_id', 'sess_version', 'nettype', 'addrtype', 'addr'])):
+    """Record of the SDP `o=` line
+    """
+    __slots__ = ()
+
+
+class Connection(namedtuple('Connection', ['nettype', 'addrtype', 'addr'])):
+    """Record of a SDP `c=` line
+    """
+    __slots__ = ()
+
+
+class Codec(namedtuple('Codec', ['payload_type', 'name', 'clock_rate', 'channels', 'fmtp'])):
+    """A media format, described by `a=rtpmap` and `a=fmtp` attributes or by a static payload type
+
+    `name` is `None` for a dynamic payload type without `a=rtpmap`.
+    """
+    __slots__ = ()
+
+
+def _first(pairs, field, default=None):
+    for k, v in pairs:
+        if k == field:
+            return v
+    return default
+
+
+class Media(object):
+    """A SDP media description (`m=` line and the lines belong to it)
+    """
+    __slots__ = ('media', 'port', 'port_count', 'proto', 'formats', 'connection', 'attributes', 'codecs',
+                 '_by_pt', '_by_name')
+
+    def __init__(self, media, port, proto, formats, connection=None, attributes=(), port_count=None):
+        """
+        :param str media: media type, eg: ``audio``
+        :param int port: transport port
+        :param str proto: transport protocol, eg: ``RTP/AVP``
+        :param formats: media format descriptions (payload types for RTP)
+        :param Connection connection: media level connection, `None` if absent
+        :param attributes: `(field, value)` pairs of media level attributes, `value` is `None` for a flag
+        :param int port_count: number of ports, `None` if absent
+        """
+        self.media = media
+        self.port = port
+        self.port_count = port_count
+        self.proto = proto
+        self.formats = tuple(formats)
+        self.connection = connection
+        self.attributes = tuple(attributes)
+        rtpmaps = {}
+        fmtps = {}
+        for field, value in self.attributes:
+            if field in ('rtpmap', 'fmtp') and value:
+                pt, _, desc = value.partition(' ')
+                (rtpmaps if field == 'rtpmap' else fmtps)[pt] = desc.strip()
+        codecs = []
+        self._by_pt = {}
+        self._by_name = {}
+        for fmt in self.formats:
+            if not fmt.isdigit():
+                continue
+            pt = int(fmt)
+            desc = rtpmaps.get(fmt)
+            if desc:
+                parts = desc.split('/')
+                name = parts[0]
+                clock_rate = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+                channels = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 1
+            elif pt in STATIC_PAYLOAD_TYPES:
+                name, clock_rate, channels = STATIC_PAYLOAD_TYPES[pt]
+            else:
+                name = clock_rate = channels = None
+            codec = Codec(pt, name, clock_rate, channels, fmtps.get(fmt))
+            codecs.append(codec)
+            self._by_pt[pt] = codec
+            if name:
+                key = name.lower()
+                self._by_name.setdefault(key, codec)
+                self._by_name.setdefault((key, clock_rate), codec)
+        #: :class:`Codec` list, in the order of the `m=` line
+        self.codecs = tuple(codecs)
+
+    def __repr__(self):
+        return '<Media {} {} {} {}>'.format(self.media, self.port, self.proto, ' '.join(self.formats))
+
+    def codec(self, payload_type):
+        """Find codec by payload type
+
+        :param int payload_type: RTP payload type
+        :rtype: Codec
+        """
+        return self._by_pt.get(payload_type)
+
+    def find_codec(self, name, clock_rate=None):
+        """Find the first codec of an encoding name
+
+        :param str name: encoding name, case-insensitive, eg: ``PCMU``, ``telephone-event``
+        :param int clock_rate: clock rate, `None` for any
+        :rtype: Codec
+        """
+        key = name.lower()
+        return self._by_name.get(key if clock_rate is None else (key, clock_rate))
+
+    def get_attribute(self, field, default=None):
+        """Value of the first attribute of a field
+
+        :param str field: attribute field, eg: ``ptime``
+        :param default: Returned when not found
+        :rtype: str
+        """
+        return _first(self.attributes, field, default)
+
+    def get_attributes(self, field):
+        """Values of all attributes of a field
+
+        :param str field: attribute field
+        :rtype: list(str)
+        """
+        return [v for k, v in self.attributes if k == field]
+
+    @property
+    def ptime(self):
+        """Value of `a=ptime`, `None` if absent
+
+        :rtype: int
+        """
+        val = self.get_attribute('ptime')
+        return int(val) if val and val.isdigit() else None
+
+    @property
+    def direction(self):
+        """Media level direction attribute: ``sendrecv``, ``sendonly``, ``recvonly``, ``inactive``, or `None`
+
+        :rtype: str
+        """
+        for k, _ in self.attributes:
+            if k in _DIRECTIONS:
+                return k
+        return None
 
 
 class SdpMessage(object):
 
-    def __init__(self, ptr):
+    def __init__(self, ptr, owner=True):
         """SDP body
 
         :param ctypes.c_void_p ptr: `sdp_message_t*`
+        :param bool owner: `True` to free the C structure in :meth:`dispose`
+        """
+        if not ptr:
+            raise RuntimeError('Null pointer.')
+        self._ptr = ptr
+        self._owner = owner
+        self._materialized = False
+        self._version = None
+        self._origin = None
+        self._session_name = None
+        self._connection = None
+        self._attributes = ()
+        self._media = ()
+
+    def __del__(self):
+        self.dispose()
+
+    def __str__(self):
+        """Get a string representation of the SDP
+
+        :rtype: str
+        """
+        if not self._ptr:
+            raise RuntimeError('SDP structure has been disposed.')
+        dest = c_char_p()
+        error_code = sdp_message.FuncToStr.c_func(self._ptr, byref(dest))
+        raise_if_osip_error(error_code)
+        if not dest:
+            return str(None)
+        result = to_str(dest.value)
+        lib.free(dest)
+        return result
+
+    @classmethod
+    def parse(cls, data):
+        """Parse a SDP body
+
+        :param data: SDP text
+        :type data: str or bytes
+        :rtype: SdpMessage
+        """
+        ptr = c_void_p()
+        error_code = sdp_message.FuncInit.c_func(byref(ptr))
+        raise_if_osip_error(error_code)
+        error_code = sdp_message.FuncParse.c_func(ptr, to_bytes(data))
+        if error_code < 0:
+            sdp_message.FuncFree.c_func(ptr)
+        raise_if_osip_error(error_code)
+        return cls(ptr)
+
+    @classmethod
+    def from_message(cls, message):
+        """Get the SDP body of a SIP message
+
+        :param message.OsipMessage message: SIP message
+        :return: SDP, or `None` if the message has no SDP body
+        :rtype: SdpMessage
         """
-        self._prt = ptr
+        ptr = sdp.FuncGetSdpInfo.c_func(message.ptr)
+        return cls(ptr) if ptr else None
+
+    def dispose(self):
+        """Free the `sdp_message_t` C structure, if owned.
+
+        Already materialized fields remain readable.
+        """
+        if getattr(self, '_ptr', None):
+            if self._owner:
+                sdp_message.FuncFree.c_func(self._ptr)
+            self._ptr = None
 
     @property
     def ptr(self):
-        return self._prt
+        """`sdp_message_t*`
+
+        :rtype: ctypes.c_void_p
+        """
+        return self._ptr
+
+    def _materialize(self):
+        if self._materialized:
+            return
+        if not self._ptr:
+            raise RuntimeError('SDP structure has been disposed.')
+        ptr = self._ptr
+        get = _str_getter
+        self._version = get(sdp_message.FuncVVersionGet, ptr)
+        self._origin = Origin(
+            get(sdp_message.FuncOUsernameGet, ptr), get(sdp_message.FuncOSessIdGet, ptr),
+            get(sdp_message.FuncOSessVersionGet, ptr), get(sdp_message.FuncONettypeGet, ptr),
+            get(sdp_message.FuncOAddrtypeGet, ptr), get(sdp_message.FuncOAddrGet, ptr),
+        )
+        self._session_name = get(sdp_message.FuncSNameGet, ptr)
+        self._connection = _connection(ptr, -1)
+        self._attributes = _attributes(ptr, -1)
+        media = []
+        pos_media = 0
+        while sdp_message.FuncEndofMedia.c_func(ptr, c_int(pos_media)) == 0:
+            port = get(sdp_message.FuncMPortGet, ptr, c_int(pos_media))
+            port_count = get(sdp_message.FuncMNumberOfPortGet, ptr, c_int(pos_media))
+            formats = []
+            pos = 0
+            while True:
+                fmt = get(sdp_message.FuncMPayloadGet, ptr, c_int(pos_media), c_int(pos))
+                if fmt is None:
+                    break
+                formats.append(fmt)
+                pos += 1
+            media.append(Media(
+                get(sdp_message.FuncMMediaGet, ptr, c_int(pos_media)),
+                int(port) if port and port.isdigit() else None,
+                get(sdp_message.FuncMProtoGet, ptr, c_int(pos_media)),
+                formats, _connection(ptr, pos_media), _attributes(ptr, pos_media),
+                int(port_count) if port_count and port_count.isdigit() else None
+            ))
+            pos_media += 1
+        self._media = tuple(media)
+        self._materialized = True
+
+    @property
+    def version(self):
+        """`v=` value
+
+        :rtype: str
+        """
+        self._materialize()
+        return self._version
+
+    @property
+    def origin(self):
+        """`o=` line
+
+        :rtype: Origin
+        """
+        self._materialize()
+        return self._origin
+
+    @property
+    def session_name(self):
+        """`s=` value
+
+        :rtype: str
+        """
+        self._materialize()
+        return self._session_name
+
+    @property
+    def connection(self):
+        """Session level `c=` line, `None` if absent
+
+        :rtype: Connection
+        """
+        self._materialize()
+        return self._connection
+
+    @property
+    def attributes(self):
+        """Session level attributes, `(field, value)` pairs
+
+        :rtype: tuple
+        """
+        self._materialize()
+        return self._attributes
+
+    @property
+    def media(self):
+        """Media descriptions
+
+        :rtype: tuple(Media)
+        """
+        self._materialize()
+        return self._media
+
+    def find_media(self, media='audio'):
+        """The first media description of a type
+
+        :param str media: media type
+        :rtype: Media
+        """
+        for m in self.media:
+            if m.media == media:
+                return m
+        return None
+
+    def media_connection(self, media):
+        """Effective connection of a media description: media level, or else session level
+
+        :param Media media: media description
+        :rtype: Connection
+        """
+        return media.connection or self.connection
+
+    def media_direction(self, media):
+        """Effective direction of a media description: media level, or else session level, or else ``sendrecv``
+
+        :param Media media: media description
+        :rtype: str
+        """
+        if media.direction:
+            return media.direction
+        for k, _ in self.attributes:
+            if k in _DIRECTIONS:
+                return k
+        return 'sendrecv'
+
+
+def _str_getter(func, *args):
+    val = func.c_func(*args)
+    return to_str(val) if val is not None else None
+
+
+def _connection(ptr, pos_media):
+    addr = _str_getter(sdp_message.FuncCAddrGet, ptr, c_int(pos_media), c_int(0))
+    if addr is None:
+        return None
+    return Connection(
+        _str_getter(sdp_message.FuncCNettypeGet, ptr, c_int(pos_media), c_int(0)),
+        _str_getter(sdp_message.FuncCAddrtypeGet, ptr, c_int(pos_media), c_int(0)),
+        addr
+    )
+
+
+def _attributes(ptr, pos_media):
+    result = []
+    pos = 0
+    while True:
+        field = _str_getter(sdp_message.FuncAAttFieldGet, ptr, c_int(pos_media), c_int(pos))
+        if field is None:
+            break
+        result.append((field, _str_getter(sdp_message.FuncAAttValueGet, ptr, c_int(pos_media), c_int(pos))))
+        pos += 1
+    return tuple(result)
+
+
+_ANSWER_DIRECTIONS = {
+    'sendrecv': b'a=sendrecv\r\n',
+    'sendonly': b'a=recvonly\r\n',
+    'recvonly': b'a=sendonly\r\n',
+    'inactive': b'a=inactive\r\n',
+}
+
+
+class SdpAnswerer(object):
+    """SDP answer engine with a precompiled local capability set
+
+    The capability set is compiled once into lookup tables and pre-encoded line fragments.
+    Answering an offer only costs a lookup per offered format,
+    whatever how many codecs are configured.
+
+    eg::
+
+        answerer = SdpAnswerer([('PCMU', 8000), ('PCMA', 8000)], '192.168.56.101')
+        # in an event callback
+        offer = ctx.get_remote_sdp(evt.did)
+        with ctx.lock:
+            msg = call.Answer(ctx, evt.tid, 200)
+            msg.content_type = sdp.CONTENT_TYPE
+            msg.add_body(answerer.answer(offer, 54000))
+            msg.send()
+    """
+
+    def __init__(self, codecs, address, ptime=20, telephone_event='0-16', prefer_local=False, single_codec=True,
+                 username='-', session_name='-', family=socket.AF_INET):
+        """
+        :param codecs: Local codecs, in preference order.
+            Each item is a :class:`Codec`, or a `(name, clock_rate[, channels[, fmtp]])` tuple.
+            Payload types of static codecs are known, so a static codec is also matched when offered without rtpmap.
+        :param str address: Local media address, for `o=` and `c=` lines
+        :param int ptime: `a=ptime` value, `None` to omit
+        :param str telephone_event: `fmtp` of RFC 4733 telephone-event for DTMF, `None` to disable DTMF
+        :param bool prefer_local: Choose by local preference order, or else by the offer's order
+        :param bool single_codec: Answer only one codec (plus DTMF), or else all common codecs
+        :param str username: `o=` username
+        :param str session_name: `s=` value
+        :param int family: :data:`socket.AF_INET` or :data:`socket.AF_INET6`
+        """
+        self._prefer_local = bool(prefer_local)
+        self._single_codec = bool(single_codec)
+        self._table = {}
+        for preference, item in enumerate(codecs):
+            if isinstance(item, Codec):
+                name, clock_rate, channels, fmtp = item.name, item.clock_rate, item.channels, item.fmtp
+            else:
+                item = tuple(item) + (None,) * (4 - len(item))
+                name, clock_rate, channels, fmtp = item
+            channels = channels or 1
+            key = (name.lower(), int(clock_rate))
+            entry = self._compile_entry(preference, name, clock_rate, channels, fmtp)
+            self._table.setdefault(key, entry)
+        self._dtmf = None
+        if telephone_event is not None:
+            self._dtmf = self._compile_entry(-1, 'telephone-event', 8000, 1, telephone_event)
+        addrtype = b'IP6' if family == socket.AF_INET6 else b'IP4'
+        address = to_bytes(address)
+        self._origin_prefix = b'v=0\r\no=' + to_bytes(username) + b' '
+        self._origin_suffix = (
+            b' IN ' + addrtype + b' ' + address + b'\r\n'
+            b's=' + to_bytes(session_name) + b'\r\n'
+            b'c=IN ' + addrtype + b' ' + address + b'\r\n'
+            b't=0 0\r\n'
+        )
+        self._ptime = b'a=ptime:' + to_bytes(str(int(ptime))) + b'\r\n' if ptime else b''
+        self._sess_ids = itertools.count(int(time.time()))
+
+    @staticmethod
+    def _compile_entry(preference, name, clock_rate, channels, fmtp):
+        rtpmap = b' ' + to_bytes(name) + b'/' + to_bytes(str(int(clock_rate)))
+        if channels > 1:
+            rtpmap += b'/' + to_bytes(str(int(channels)))
+        return preference, rtpmap + b'\r\n', (b' ' + to_bytes(fmtp) + b'\r\n') if fmtp else None
+
+    def _lookup(self, codec):
+        # static payload types offered without rtpmap are already named by Media
+        if not codec.name:
+            return None
+        key = (codec.name.lower(), codec.clock_rate)
+        if key[0] == 'telephone-event':
+            return self._dtmf
+        return self._table.get(key)
+
+    def _answer_media(self, media, direction, port):
+        chosen = []
+        dtmf = None
+        for codec in media.codecs:
+            entry = self._lookup(codec)
+            if entry is None:
+                continue
+            if entry is self._dtmf:
+                if dtmf is None:
+                    dtmf = (codec.payload_type, entry)
+            elif not self._single_codec:
+                chosen.append((codec.payload_type, entry))
+            elif not chosen or (self._prefer_local and entry[0] < chosen[0][1][0]):
+                chosen = [(codec.payload_type, entry)]
+        if not chosen:
+            return None
+        if self._prefer_local and not self._single_codec:
+            chosen.sort(key=lambda x: x[1][0])
+        if dtmf:
+            chosen.append(dtmf)
+        pts = [to_bytes(str(pt)) for pt, _ in chosen]
+        lines = [b'm=', to_bytes(media.media), b' ', to_bytes(str(int(port))), b' ', to_bytes(media.proto), b' ',
+                 b' '.join(pts), b'\r\n']
+        for pt, (_, (_, rtpmap, fmtp)) in zip(pts, chosen):
+            lines.extend((b'a=rtpmap:', pt, rtpmap))
+            if fmtp:
+                lines.extend((b'a=fmtp:', pt, fmtp))
+        lines.append(self._ptime)
+        lines.append(_ANSWER_DIRECTIONS.get(direction, _ANSWER_DIRECTIONS['sendrecv']))
+        return b''.join(lines)
+
+    def answer(self, offer, port, sess_id=None):
+        """Build the answer body of an offer
+
+        :param offer: Offer, :class:`SdpMessage` or a sequence of :class:`Media`
+        :param int port: Local RTP port for the first audio stream accepted
+        :param int sess_id: `o=` session id and version, default is an increasing number
+        :return: SDP body, ready for :meth:`message.OsipMessage.add_body`
+        :rtype: bytes
+        :raises OsipNoCommonCodec: If no audio stream in the offer can be accepted
+
+        Every `m=` line of the offer gets one in the answer (RFC 3264),
+        streams other than the first acceptable audio are rejected with port `0`.
+        """
+        if isinstance(offer, SdpMessage):
+            media_list = offer.media
+            direction_of = offer.media_direction
+        else:
+            media_list = offer
+            direction_of = _media_direction
+        if sess_id is None:
+            sess_id = next(self._sess_ids)
+        sess_id = to_bytes(str(int(sess_id)))
+        lines = [self._origin_prefix, sess_id, b' ', sess_id, self._origin_suffix]
+        accepted = False
+        for media in media_list:
+            body = None
+            if not accepted and media.media == 'audio' and media.port:
+                body = self._answer_media(media, direction_of(media), port)
+            if body is None:
+                lines.extend((b'm=', to_bytes(media.media), b' 0 ', to_bytes(media.proto), b' ',
+                              to_bytes(' '.join(media.formats[:1]) or '0'), b'\r\n'))
+            else:
+                lines.append(body)
+                accepted = True
+        if not accepted:
+            raise OsipNoCommonCodec('No common audio codec in the offer')
+        return b''.join(lines)
+
+
+def _media_direction(media):
+    return media.direction or 'sendrecv'
+
+
+_PORT_FREE, _PORT_IN_USE, _PORT_QUARANTINED = 0, 1, 2
+
+
+class RtpPortAllocator(object):
+    """RTP port allocator over an even port range
+
+    Every port handed out is even, the next odd one being left for RTCP.
+    The state of each port is kept in a bitmap, free ports in a FIFO queue,
+    so both :meth:`allocate` and :meth:`release` are `O(1)` whatever how full the range is.
+
+    A released port is quarantined for a while before it can be allocated again,
+    so that late RTP packets of the previous call do not leak into the next one.
+
+    Ports may be allocated for a call id, then they are all released with :meth:`release_call`,
+    which is done automatically on :attr:`event.EventType.call_released` once the allocator is bound to a context:
+
+    eg::
+
+        ports = RtpPortAllocator(20000, 30000)
+        ports.bind(ctx)
+        # in an event callback
+        port = ports.allocate(evt.cid)
+        msg.add_body(answerer.answer(offer, port))
+    """
+
+    def __init__(self, start=16384, end=32768, quarantine=2.0):
+        """
+        :param int start: First port of the range, rounded up to an even port
+        :param int end: End of the range (excluded)
+        :param float quarantine: Seconds a released port stays unavailable, `0` to reuse it at once
+        """
+        start = int(start)
+        start += start % 2
+        end = int(end)
+        if not 0 < start < end <= 65536:
+            raise ValueError('Invalid port range [{}, {})'.format(start, end))
+        self._start = start
+        self._count = (end - start) // 2
+        if not self._count:
+            raise ValueError('Port range [{}, {}) holds no RTP/RTCP pair'.format(start, end))
+        self._quarantine = float(quarantine)
+        self._states = bytearray(self._count)
+        self._free = deque(range(self._count))
+        self._quarantined = deque()
+        self._owners = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def start(self):
+        """First port of the range
+
+        :rtype: int
+        """
+        return self._start
+
+    @property
+    def end(self):
+        """End of the range (excluded)
+
+        :rtype: int
+        """
+        return self._start + 2 * self._count
+
+    @property
+    def available(self):
+        """Number of ports that can be allocated now, quarantined ones not counted
+
+        :rtype: int
+        """
+        with self._lock:
+            self._expire(_monotonic())
+            return len(self._free)
+
+    @property
+    def in_use(self):
+        """Number of allocated ports
+
+        :rtype: int
+        """
+        with self._lock:
+            return self._count - len(self._free) - len(self._quarantined)
+
+    def _expire(self, now):
+        quarantined = self._quarantined
+        while quarantined and quarantined[0][0] <= now:
+            _, index = quarantined.popleft()
+            self._states[index] = _PORT_FREE
+            self._free.append(index)
+
+    def allocate(self, cid=None):
+        """Allocate a port
+
+        :param int cid: Call the port belongs to, `None` if it is not tied to a call
+        :return: An even port, the next odd one is for RTCP
+        :rtype: int
+        :raises OsipPortBusy: If every port of the range is in use or quarantined
+        """
+        with self._lock:
+            if not self._free:
+                self._expire(_monotonic())
+                if not self._free:
+                    raise OsipPortBusy('No RTP port available in [{}, {})'.format(self.start, self.end))
+            index = self._free.popleft()
+            self._states[index] = _PORT_IN_USE
+            if cid is not None:
+                self._owners[index] = cid
+                self._calls.setdefault(cid, []).append(index)
+        return self._start + 2 * index
+
+    def _release(self, index, now):
+        if self._quarantine > 0:
+            self._states[index] = _PORT_QUARANTINED
+            self._quarantined.append((now + self._quarantine, index))
+        else:
+            self._states[index] = _PORT_FREE
+            self._free.append(index)
+
+    def release(self, port):
+        """Release a port
+
+        :param int port: Port returned by :meth:`allocate`
+        :raises ValueError: If the port is not allocated
+        """
+        index, odd = divmod(int(port) - self._start, 2)
+        if odd or not 0 <= index < self._count:
+            raise ValueError('Port {} is not in [{}, {})'.format(port, self.start, self.end))
+        with self._lock:
+            if self._states[index] != _PORT_IN_USE:
+                raise ValueError('Port {} is not allocated'.format(port))
+            cid = self._owners.pop(index, None)
+            if cid is not None:
+                indexes = self._calls[cid]
+                indexes.remove(index)
+                if not indexes:
+                    del self._calls[cid]
+            self._release(index, _monotonic())
+
+    def release_call(self, cid):
+        """Release every port allocated for a call
+
+        :param int cid: Call id
+        :return: Number of released ports
+        :rtype: int
+        """
+        with self._lock:
+            indexes = self._calls.pop(cid, ())
+            now = _monotonic()
+            for index in indexes:
+                del self._owners[index]
+                self._release(index, now)
+        return len(indexes)
+
+    def get_call_ports(self, cid):
+        """Ports allocated for a call
+
+        :param int cid: Call id
+        :rtype: list
+        """
+        with self._lock:
+            return [self._start + 2 * index for index in self._calls.get(cid, ())]
+
+    def bind(self, context):
+        """Release the ports of calls automatically, when the context reports them released
+
+        :param context.Context context: eXosip context
+        """
+        context.add_event_hook(self._on_event)
+
+    def unbind(self, context):
+        """Stop releasing ports of calls released in the context
+
+        :param context.Context context: eXosip context
+        """
+        context.remove_event_hook(self._on_event)
+
+    def _on_event(self, context, evt):
+        if evt.type == EventType.call_released:
+            self.release_call(evt.cid)
@@ -0,0 +1,88 @@
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from exosip2ctypes.activity import ActivityMonitor
+from exosip2ctypes.event import EventType
+from exosip2ctypes.header import Uri, NameAddr, Via
+from exosip2ctypes.option import Option
+
+
+def _incoming(host, port, protocol='TCP', received=None, rport=None, type_=EventType.message_new, response=None):
+    params = []
+    if received:
+        params.append(('received', received))
+    if rport:
+        params.append(('rport', str(rport)))
+    request = MagicMock(via=Via('2.0', protocol, host, port, None, tuple(params)),
+                        request_uri=Uri('sip', '1001', None, '192.0.2.100', 5060), routes=[])
+    return MagicMock(type=type_, request=request, response=response)
+
+
+def _response(host, port=None, protocol='TCP', route=None):
+    request = MagicMock(via=Via('2.0', protocol, '192.0.2.100', 5060, None, ()),
+                        request_uri=Uri('sip', '1001', None, host, port),
+                        routes=[NameAddr(None, Uri('sip', None, None, route, None))] if route else [])
+    return MagicMock(type=EventType.call_answered, request=request, response=MagicMock())
+
+
+class ActivityMonitorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = MagicMock()
+        self.monitor = ActivityMonitor(self.ctx, idle_timeout=10, keep_alive=5, forget_after=100, max_remotes=3)
+
+    def test_bind(self):
+        self.monitor.bind()
+        self.ctx.set_option.assert_called_once_with(Option.udp_keep_alive, 5)
+        self.ctx.add_event_hook.assert_called_once_with(self.monitor._hook)
+
+    def test_remotes(self):
+        self.monitor.update(_incoming('pbx.example.com', 5060, received='198.51.100.1', rport=40000), now=0)
+        self.monitor.update(_response('gw.example.com', route='proxy.example.com'), now=0)
+        self.monitor.update(_incoming('udp.example.com', 5060, 'UDP'), now=0)
+        self.monitor.update(MagicMock(type=EventType.call_released, request=MagicMock(), response=None), now=0)
+        self.assertIsNotNone(self.monitor.get('TCP', '198.51.100.1', 40000))
+        self.assertIsNotNone(self.monitor.get('tcp', 'proxy.example.com', 5060))
+        self.assertEqual(len(self.monitor), 2)
+        self.assertEqual(self.monitor.active_by_remote, {('198.51.100.1', 40000): 1, ('proxy.example.com', 5060): 1})
+
+    def test_answered_incoming_request(self):
+        # eg a BYE answered by eXosip: the remote is still the sender, not the request URI
+        evt = _incoming('pbx.example.com', 5060, received='198.51.100.1', type_=EventType.call_closed,
+                        response=MagicMock())
+        self.monitor.update(evt, now=0)
+        self.assertEqual([x.remote for x in self.monitor], [('TCP', '198.51.100.1', 5060)])
+
+    def test_periods_and_rtt(self):
+        self.monitor.sent('sip:1001@gw.example.com', now=0)
+        self.monitor.update(_response('gw.example.com'), now=0.25)
+        self.monitor.update(_response('gw.example.com'), now=5)
+        self.monitor.sent('sip:1001@gw.example.com', now=6)
+        self.monitor.update(_response('gw.example.com'), now=30)
+        record = self.monitor.get('TCP', 'gw.example.com', 5060)
+        self.assertEqual((record.periods, record.resumptions, record.messages, record.continued), (2, 1, 3, 1))
+        self.assertEqual(record.first_response_rtt, 0.25)
+        stats = self.monitor.stats
+        self.assertEqual(stats.continued_ratio, 1 / 3.)
+        self.assertEqual(stats.idled, 1)
+
+    def test_reap_and_forget(self):
+        self.monitor.touch('TCP', 'a.example.com', 5060, now=0)
+        self.monitor.touch('TCP', 'b.example.com', 5060, now=8)
+        self.assertEqual([x.host for x in self.monitor.reap(now=12)], ['a.example.com'])
+        self.assertEqual(self.monitor.active_count, 1)
+        self.assertEqual(len(self.monitor.reap(now=115)), 1)
+        self.assertIsNone(self.monitor.get('TCP', 'a.example.com', 5060))
+        self.assertEqual(len(self.monitor), 1)
+        for host in ('c', 'd', 'e'):
+            self.monitor.touch('TCP', host + '.example.com', 5060, now=116)
+        self.assertIsNone(self.monitor.get('TCP', 'b.example.com', 5060))
+        self.assertEqual((len(self.monitor), self.monitor.stats.forgotten), (3, 2))
+        self.assertFalse(self.ctx.reset_transports.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,15 @@
 import sys
 import unittest
 try:
-    from unittest.mock import Mock
+    from unittest.mock import Mock, MagicMock
 except ImportError:
-    from mock import Mock
+    from mock import Mock, MagicMock
 from threading import Condition
 import logging
 import logging.config
 
 from exosip2ctypes import initialize, unload, call, Context, EventType
+from exosip2ctypes.error import OsipNotFound
 
 logging.basicConfig(
     level=logging.DEBUG, stream=sys.stdout,
@@ -69,5 +70,113 @@ class SingleCallTest(unittest.TestCase):
         self.assertEqual(self._recv_call_id, send_call_id)
 
 
+class _Event(object):
+
+    def __init__(self, type_, cid, did=0, tid=0, call_id=None, status_code=None):
+        self.type = type_
+        self.cid = cid
+        self.did = did
+        self.tid = tid
+        self.request = Mock(call_id=call_id) if call_id else None
+        self.response = Mock(status_code=status_code) if status_code else None
+
+
+class CallRegistryTest(unittest.TestCase):
+
+    def test_lifetime(self):
+        calls = call.CallRegistry()
+        record = calls.update(_Event(EventType.call_invite, 1, 2, 3, 'abc@host'))
+        self.assertEqual(record.state, call.CallState.incoming)
+        self.assertIs(calls.get(1), record)
+        self.assertIs(calls.get_by_did(2), record)
+        self.assertIs(calls.get_by_call_id('abc@host'), record)
+        calls.update(_Event(EventType.call_ack, 1, 2, 4))
+        self.assertEqual((record.state, record.last_tid), (call.CallState.established, 4))
+        calls.update(_Event(EventType.call_closed, 1, 2, 5))
+        self.assertEqual(record.state, call.CallState.terminated)
+        self.assertIsNone(calls.update(_Event(EventType.call_released, 1)))
+        self.assertEqual(len(calls), 0)
+        self.assertIsNone(calls.get_by_did(2))
+        self.assertIsNone(calls.get_by_call_id('abc@host'))
+
+    def test_outgoing(self):
+        calls = call.CallRegistry()
+        record = calls.add(7)
+        self.assertEqual(record.state, call.CallState.calling)
+        calls.update(_Event(EventType.call_ringing, 7, 8, 9, 'xyz@host'))
+        self.assertEqual(record.state, call.CallState.ringing)
+        self.assertIs(calls.get_by_call_id('xyz@host'), record)
+
+    def test_auth_challenge(self):
+        calls = call.CallRegistry()
+        record = calls.add(7)
+        calls.update(_Event(EventType.call_requestfailure, 7, tid=8, status_code=407))
+        self.assertEqual(record.state, call.CallState.calling)
+        calls.update(_Event(EventType.call_answered, 7, 9, 10, status_code=200))
+        self.assertEqual(record.state, call.CallState.established)
+        calls.update(_Event(EventType.call_ack, 7, 9, 11))
+        self.assertEqual(record.state, call.CallState.established)
+        self.assertIs(calls.get_by_did(9), record)
+        calls.update(_Event(EventType.call_requestfailure, 7, 9, 12, status_code=407))
+        self.assertEqual(record.state, call.CallState.terminated)
+
+    def test_redirected(self):
+        calls = call.CallRegistry()
+        record = calls.add(7)
+        calls.update(_Event(EventType.call_redirected, 7, tid=8, status_code=302))
+        self.assertEqual(record.state, call.CallState.calling)
+        calls.update(_Event(EventType.call_redirected, 7, tid=9, status_code=302))
+        self.assertEqual(record.state, call.CallState.terminated)
+        calls.update(_Event(EventType.call_ringing, 7, 10, 11, status_code=180))
+        self.assertEqual(record.state, call.CallState.ringing)
+        self.assertEqual(calls.expire(record.updated + 60), 0)
+
+    def test_expire(self):
+        calls = call.CallRegistry(ttl=60, linger=5)
+        calls.update(_Event(EventType.call_invite, 1, call_id='1@host'))
+        calls.update(_Event(EventType.call_invite, 2, call_id='2@host'))
+        calls.update(_Event(EventType.call_cancelled, 2))
+        now = calls.get(2).updated
+        self.assertEqual(calls.expire(now + 10), 1)
+        self.assertIn(1, calls)
+        self.assertNotIn(2, calls)
+        self.assertEqual(calls.expire(now + 61), 1)
+        self.assertEqual(calls.expirations, 2)
+        self.assertIsNone(calls.get_by_call_id('1@host'))
+
+    def test_maxsize(self):
+        calls = call.CallRegistry(maxsize=2)
+        for cid in range(1, 4):
+            calls.update(_Event(EventType.call_invite, cid, cid))
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn(1, calls)
+        self.assertIsNone(calls.get_by_did(1))
+
+
+class RequestTest(unittest.TestCase):
+
+    def test_empty_method(self):
+        for method in (None, ''):
+            with self.assertRaises(ValueError):
+                call.Request(MagicMock(), 1, method)
+
+
+class SendRequestsTest(unittest.TestCase):
+
+    def test_burst(self):
+        ctx = MagicMock()
+
+        def call_send_request(did, request):
+            if did == 2:
+                raise OsipNotFound()
+            return did * 10
+
+        ctx.call_send_request.side_effect = call_send_request
+        results = call.send_requests(ctx, [1, 2, 3], lambda c, did: 'OPTIONS')
+        self.assertEqual(ctx.lock.__enter__.call_count, 1)
+        self.assertEqual([(r.did, r.tid) for r in results], [(1, 10), (2, None), (3, 30)])
+        self.assertIsInstance(results[1].error, OsipNotFound)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,10 @@ import logging
 from time import time, sleep
 
 from exosip2ctypes import initialize, unload, Context
+from exosip2ctypes.call import CallRegistry
+from exosip2ctypes.credential import Credential
+from exosip2ctypes.guard import FloodGuard
+from exosip2ctypes.option import Option
 
 logging.basicConfig(
     level=logging.DEBUG, stream=sys.stdout,
@@ -95,6 +99,52 @@ class ContextTestCase(unittest.TestCase):
         self.ctx.stop()
         self.assertFalse(self.ctx.is_running)
 
+    def test_terminate_calls(self):
+        failures = self.ctx.terminate_calls([1, (2, 0), 3], batch_size=2)
+        self.assertEqual([f[0] for f in failures], [1, 2, 3])
+        self.assertFalse(self.ctx.lock.locked())
+
+    def test_credentials(self):
+        credentials = [
+            Credential.from_password('1001', 'secret', 'example.com'),
+            ('1002', '1002', 'secret', 'example.com'),
+            ('', None, None, None),
+        ]
+        failures = self.ctx.load_credentials(credentials)
+        self.assertEqual([entry for entry, _ in failures], [credentials[2]])
+        self.assertEqual(self.ctx.replace_all_credentials(credentials[:1]), [])
+        self.assertFalse(self.ctx.lock.locked())
+
+    def test_drain(self):
+        calls = CallRegistry()
+        calls.bind(self.ctx)
+        reports = []
+        self.assertEqual(self.ctx.drain(calls, 1, progress=lambda n, t: reports.append(n)), 0)
+        self.assertEqual(reports, [0])
+        self.assertTrue(self.ctx.draining)
+        self.ctx.resume()
+        self.assertFalse(self.ctx.draining)
+
+    def test_option(self):
+        self.assertIsNone(self.ctx.get_option(Option.udp_keep_alive))
+        self.ctx.set_option(Option.udp_keep_alive, 25)
+        self.ctx.add_dns_cache('proxy.example.com', '192.0.2.10')
+        self.ctx.delete_dns_cache('proxy.example.com')
+        self.assertEqual(self.ctx.get_option('udp_keep_alive'), 25)
+        with self.assertRaises(ValueError):
+            self.ctx.get_option(Option.add_dns_cache)
+        self.ctx.set_option(Option.set_header_user_agent, 'tuned')
+        self.assertEqual(self.ctx.user_agent, 'tuned')
+
+    def test_flood_guard(self):
+        self.assertIsNone(self.ctx.flood_guard)
+        guard = FloodGuard()
+        self.ctx.flood_guard = guard
+        self.assertIs(self.ctx.flood_guard, guard)
+        with self.assertRaises(TypeError):
+            self.ctx.flood_guard = object()
+        self.ctx.flood_guard = None
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import io
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from exosip2ctypes.credential import Credential, CredentialStore, compute_ha1
+
+
+class CredentialTestCase(unittest.TestCase):
+
+    def test_compute_ha1(self):
+        # RFC 2617, section 3.5
+        self.assertEqual(compute_ha1('Mufasa', 'testrealm@host.com', 'Circle Of Life'),
+                         '939e7578ed9e3c518a452acee763bce9')
+
+    def test_from_password(self):
+        credential = Credential.from_password('alice', 'secret', 'example.com')
+        self.assertEqual(credential.user_id, 'alice')
+        self.assertEqual(credential.ha1, compute_ha1('alice', 'example.com', 'secret'))
+        with self.assertRaises(ValueError):
+            Credential.from_password('alice', 'secret', None)
+
+
+class CredentialStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CredentialStore.from_csv(io.StringIO(
+            'user_name,user_id,realm,password,ha1\n'
+            '1001,,a.example.com,secret,\n'
+            '1002,login2,a.example.com,,0123456789ABCDEF0123456789abcdef\n'
+            '1001,,b.example.com,other,\n'
+        ))
+
+    def test_index(self):
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(sorted(self.store.realms), ['a.example.com', 'b.example.com'])
+        self.assertEqual(self.store.get('1002', 'a.example.com').ha1, '0123456789abcdef0123456789abcdef')
+        self.assertIn(('1001', 'b.example.com'), self.store)
+        self.assertEqual(len(self.store.select(realm='a.example.com')), 2)
+        self.assertEqual(len(self.store.select(user_names=['1001'])), 2)
+        self.store.remove('1001', 'b.example.com')
+        self.assertEqual(self.store.realms, ['a.example.com'])
+
+    def test_push(self):
+        ctx = MagicMock()
+        ctx.load_credentials.return_value = []
+        self.assertEqual(self.store.push(ctx, realm='a.example.com', user_names=['1002']), [])
+        ctx.load_credentials.assert_called_once_with([self.store.get('1002', 'a.example.com')])
+        self.store.push(ctx, replace=True)
+        self.assertEqual(len(ctx.replace_all_credentials.call_args[0][0]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
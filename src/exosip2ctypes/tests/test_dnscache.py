@@ -0,0 +1,82 @@
+import io
+import unittest
+try:
+    from unittest.mock import MagicMock, call
+except ImportError:
+    from mock import MagicMock, call
+
+from exosip2ctypes.dnscache import DnsCacheManager
+from exosip2ctypes.error import OsipError
+
+
+class DnsCacheManagerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = MagicMock()
+        self.answers = {'a.example.com': ('192.0.2.1', 60), 'b.example.com': '192.0.2.2'}
+        self.manager = DnsCacheManager(self.ctx, ['A.example.com', 'b.example.com'], ttl=100,
+                                       resolver=self.resolve)
+
+    def resolve(self, host):
+        answer = self.answers[host]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def test_refresh(self):
+        self.assertEqual(self.manager.refresh(0), 2)
+        self.assertEqual(self.manager.entries, {'a.example.com': '192.0.2.1', 'b.example.com': '192.0.2.2'})
+        self.ctx.add_dns_cache.assert_has_calls([call('a.example.com', '192.0.2.1')], any_order=True)
+        # refreshed at 80% of TTL: 48s for a (its own TTL), 80s for b (default TTL)
+        self.assertEqual(self.manager.next_refresh(), 48)
+        self.assertEqual(self.manager.refresh(47), 0)
+        self.ctx.add_dns_cache.reset_mock()
+        self.assertEqual(self.manager.refresh(48), 1)
+        self.assertFalse(self.ctx.add_dns_cache.called)  # unchanged address is not seeded again
+        self.answers['b.example.com'] = '192.0.2.3'
+        self.manager.refresh(80)
+        self.ctx.add_dns_cache.assert_called_once_with('b.example.com', '192.0.2.3')
+
+    def test_failures(self):
+        self.manager.refresh(0)
+        self.answers['a.example.com'] = IOError('timeout')
+        self.manager.refresh(48)
+        self.assertEqual(self.manager.get('a.example.com'), '192.0.2.1')
+        self.assertEqual(self.manager.next_refresh(), 58)
+        self.ctx.add_dns_cache.side_effect = OsipError('full')
+        self.answers['a.example.com'] = '192.0.2.9'
+        self.manager.refresh(58)
+        self.assertEqual(self.manager.get('a.example.com'), '192.0.2.1')
+        self.assertEqual(self.manager.stats['failures'], 2)
+
+    def test_resolve(self):
+        self.answers['c.example.com'] = '192.0.2.4'
+        self.assertEqual(self.manager.resolve('c.example.com'), '192.0.2.4')
+        self.assertEqual(self.manager.resolve('C.example.com'), '192.0.2.4')
+        self.assertIn('c.example.com', self.manager)
+        stats = self.manager.stats
+        self.assertEqual((stats['resolve_hits'], stats['resolve_misses']), (1, 1))
+
+    def test_load_hosts(self):
+        count = self.manager.load_hosts(io.StringIO(
+            '# trunks\n'
+            '198.51.100.1  trunk1.example.com trunk1  # static\n'
+            'c.example.com\n'
+            '\n'
+        ))
+        self.assertEqual(count, 3)
+        self.assertEqual(self.manager.get('trunk1'), '198.51.100.1')
+        self.ctx.add_dns_cache.assert_any_call('trunk1.example.com', '198.51.100.1')
+        self.assertIn('c.example.com', self.manager)
+        self.answers['c.example.com'] = '192.0.2.4'
+        self.assertEqual(self.manager.refresh(0), 3)
+
+    def test_remove(self):
+        self.manager.refresh(0)
+        self.manager.remove('a.example.com')
+        self.ctx.delete_dns_cache.assert_called_once_with('a.example.com')
+        self.assertEqual(len(self.manager), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+from exosip2ctypes.event import EventType
+from exosip2ctypes.guard import CountMinSketch, FloodGuard
+from exosip2ctypes.header import NameAddr, Uri, Via
+
+
+class CountMinSketchTestCase(unittest.TestCase):
+
+    def test_estimate(self):
+        sketch = CountMinSketch(width=64, depth=4)
+        for i in range(1000):
+            sketch.add('key{}'.format(i % 100))
+        self.assertEqual(sketch.add('hot', 50), sketch.estimate('hot'))
+        for i in range(100):
+            self.assertGreaterEqual(sketch.estimate('key{}'.format(i)), 10)
+        self.assertGreaterEqual(sketch.estimate('hot'), 50)
+        sketch.clear()
+        self.assertEqual(sketch.estimate('hot'), 0)
+
+    def test_independent_rows(self):
+        # same length keys: a CRC of another seed would give the same collisions in every row
+        width = 64
+        sketch = CountMinSketch(width=width, depth=12)
+        keys = ['198.51.{:03d}.{:03d}'.format(i // 50, i % 50) for i in range(2000)]
+        indexes = [[x % width for x in sketch._indexes(key)] for key in keys]
+        for row in range(1, 12):
+            first = {}
+            both = {}
+            for idx in indexes:
+                first[idx[0]] = first.get(idx[0], 0) + 1
+                both[idx[0], idx[row]] = both.get((idx[0], idx[row]), 0) + 1
+            collisions = sum(n * (n - 1) // 2 for n in first.values())
+            also = sum(n * (n - 1) // 2 for n in both.values())
+            # about 1 / width of the collisions of row 0 if the rows are independent
+            self.assertLess(also, collisions / 8.)
+
+
+class FloodGuardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.guard = FloodGuard(max_per_source=3, max_per_user=5, window=1, ban_time=10, max_bans=2,
+                                whitelist=['192.0.2.99'])
+
+    def test_source_rate(self):
+        results = [self.guard.check('198.51.100.1', now=0.1 * i) for i in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertTrue(self.guard.is_banned(source='198.51.100.1', now=5))
+        self.assertFalse(self.guard.is_banned(source='198.51.100.1', now=11))
+        self.assertTrue(self.guard.check('198.51.100.1', now=11))
+        self.assertTrue(self.guard.check('198.51.100.2', now=0.5))
+
+    def test_sliding_window(self):
+        for i in range(3):
+            self.assertTrue(self.guard.check('198.51.100.1', now=0.9))
+        # 90% of the previous window still counts
+        self.assertFalse(self.guard.check('198.51.100.1', now=1.1))
+        self.assertTrue(self.guard.check('198.51.100.3', now=5))
+
+    def test_user_rate_and_whitelist(self):
+        for i in range(5):
+            self.assertTrue(self.guard.check('198.51.100.{}'.format(i), '1001', now=0))
+        self.assertFalse(self.guard.check('198.51.100.9', '1001', now=0))
+        self.assertTrue(self.guard.is_banned(user='1001', now=1))
+        for _ in range(10):
+            self.assertTrue(self.guard.check('192.0.2.99', '1001', now=0))
+
+    def test_bounded_bans(self):
+        for i in range(5):
+            self.guard.ban(source='198.51.100.{}'.format(i))
+        self.assertEqual(sorted(self.guard.bans), ['source:198.51.100.3', 'source:198.51.100.4'])
+        self.guard.unban(source='198.51.100.4')
+        self.assertEqual(len(self.guard.bans), 1)
+        self.assertEqual(self.guard.stats['banned'], 5)
+
+    def test_screen(self):
+        request = MagicMock(via=Via('2.0', 'UDP', '198.51.100.1', 5060, None, ()),
+                            from_addr=NameAddr(None, Uri('sip', 'scanner', None, 'example.com', None)))
+        evt_ptr = MagicMock()
+        evt_ptr.contents.type = EventType.call_invite
+        with patch('exosip2ctypes.guard.ExosipMessage', return_value=request), \
+                patch('exosip2ctypes.guard.AutoResponse') as response_class:
+            self.guard.ban(user='scanner')
+            self.assertTrue(self.guard.screen(MagicMock(), evt_ptr))
+            response_class.assert_called_once_with(EventType.call_invite, 403)
+            self.assertTrue(response_class.return_value.send.called)
+            evt_ptr.contents.type = EventType.call_ack
+            self.assertFalse(self.guard.screen(MagicMock(), evt_ptr))
+        self.assertEqual(self.guard.stats['rejected'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import threading
+
+from exosip2ctypes.header import Uri, NameAddr, NameAddrCache, parse_uri, parse_name_addr
+
+
+class ParseTestCase(unittest.TestCase):
+
+    def test_parse_uri(self):
+        uri = parse_uri('sip:alice:secret@example.com:5061;transport=tcp;lr?subject=project')
+        self.assertEqual(uri.scheme, 'sip')
+        self.assertEqual(uri.user, 'alice')
+        self.assertEqual(uri.password, 'secret')
+        self.assertEqual(uri.host, 'example.com')
+        self.assertEqual(uri.port, 5061)
+        self.assertEqual(uri.params, (('transport', 'tcp'), ('lr', None)))
+        self.assertEqual(uri.get_param('TRANSPORT'), 'tcp')
+        self.assertEqual(uri.headers, (('subject', 'project'),))
+        self.assertEqual(str(uri), 'sip:alice:secret@example.com:5061;transport=tcp;lr?subject=project')
+
+    def test_parse_uri_ipv6(self):
+        uri = parse_uri('sip:[::1]:5060')
+        self.assertEqual(uri.host, '[::1]')
+        self.assertEqual(uri.port, 5060)
+        self.assertIsNone(uri.user)
+
+    def test_parse_uri_other_scheme(self):
+        uri = parse_uri('mailto:alice@example.com')
+        self.assertEqual(uri.scheme, 'mailto')
+        self.assertEqual(uri.string, 'alice@example.com')
+        self.assertEqual(str(uri), 'mailto:alice@example.com')
+
+    def test_parse_name_addr(self):
+        na = parse_name_addr('"Alice \\"A\\" <x>" <sip:alice@example.com>;tag=1928301774')
+        self.assertEqual(na.display_name, '"Alice \\"A\\" <x>"')
+        self.assertEqual(na.user, 'alice')
+        self.assertEqual(na.host, 'example.com')
+        self.assertEqual(na.tag, '1928301774')
+
+    def test_parse_name_addr_unquoted(self):
+        na = parse_name_addr('Bob <sip:bob@biloxi.com;transport=udp>;expires=60')
+        self.assertEqual(na.display_name, 'Bob')
+        self.assertEqual(na.uri.params, (('transport', 'udp'),))
+        self.assertEqual(na.get_param('expires'), '60')
+
+    def test_parse_addr_spec(self):
+        na = parse_name_addr('sip:carol@chicago.com;tag=887s')
+        self.assertIsNone(na.display_name)
+        self.assertEqual(na.uri, Uri('sip', 'carol', None, 'chicago.com'))
+        self.assertEqual(na.tag, '887s')
+
+    def test_immutable(self):
+        na = parse_name_addr('<sip:a@b>')
+        with self.assertRaises(AttributeError):
+            na.display_name = 'x'
+        self.assertEqual(na, NameAddr(None, Uri('sip', 'a', None, 'b')))
+
+
+class NameAddrCacheTestCase(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = NameAddrCache(maxsize=8)
+        first = cache.parse('<sip:alice@example.com>;tag=1')
+        second = cache.parse(b'<sip:alice@example.com>;tag=1')
+        self.assertIs(first, second)
+        stats = cache.stats
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_eviction(self):
+        cache = NameAddrCache(maxsize=2)
+        cache.parse('<sip:1@example.com>')
+        cache.parse('<sip:2@example.com>')
+        cache.parse('<sip:1@example.com>')  # refresh 1, so 2 is the least recently used
+        cache.parse('<sip:3@example.com>')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats['evictions'], 1)
+        cache.parse('<sip:1@example.com>')
+        self.assertEqual(cache.stats['hits'], 2)
+        cache.maxsize = 1
+        self.assertEqual(len(cache), 1)
+
+    def test_disabled(self):
+        cache = NameAddrCache(maxsize=0)
+        cache.parse('<sip:1@example.com>')
+        self.assertEqual(len(cache), 0)
+
+    def test_threads(self):
+        cache = NameAddrCache(maxsize=16)
+        values = ['<sip:{}@example.com>'.format(i) for i in range(32)]
+
+        def run():
+            for _ in range(50):
+                for v in values:
+                    self.assertEqual(cache.parse(v).user, v[5:v.index('@')])
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(len(cache), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
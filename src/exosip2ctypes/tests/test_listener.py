@@ -0,0 +1,75 @@
+import socket
+import unittest
+try:
+    from unittest.mock import MagicMock, patch
+except ImportError:
+    from mock import MagicMock, patch
+
+from exosip2ctypes.listener import Transport, ListenerSet, parse_destination
+from exosip2ctypes.option import Option
+
+
+class ParseDestinationTestCase(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_destination('gw.example.com'), ('gw.example.com', None, None))
+        self.assertEqual(parse_destination('sip:1001@GW.example.com:5080;user=phone'),
+                         ('gw.example.com', 5080, None))
+        self.assertEqual(parse_destination('<sip:gw.example.com;transport=TCP>'),
+                         ('gw.example.com', None, Transport.tcp))
+        self.assertEqual(parse_destination('sips:1001@[2001:db8::1]:5061'), ('[2001:db8::1]', 5061, Transport.tls))
+
+
+class ListenerSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('exosip2ctypes.listener.Context', side_effect=lambda *args: MagicMock())
+        self.context_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.listeners = ListenerSet(profile='profile')
+        self.udp = self.listeners.listen('udp', port=5060)
+        self.tcp = self.listeners.listen(Transport.tcp, port=0)
+        self.udp6 = self.listeners.listen('udp', port=0, family=socket.AF_INET6)
+
+    def test_listen(self):
+        self.assertEqual(len(self.listeners), 3)
+        self.context_class.assert_called_with(None, 'profile')
+        self.udp.context.listen_on_address.assert_called_once_with(
+            None, socket.IPPROTO_UDP, 5060, socket.AF_INET, False)
+        self.assertNotEqual(self.tcp.port, 0)
+        self.tcp.context.listen_on_address.assert_called_once_with(
+            None, socket.IPPROTO_TCP, self.tcp.port, socket.AF_INET, False)
+        self.udp6.context.set_option.assert_called_once_with(Option.enable_ipv6, True)
+        self.assertIs(self.listeners.get('udp', socket.AF_INET6), self.udp6)
+        with self.assertRaises(ValueError):
+            self.listeners.listen('udp')
+
+    def test_route(self):
+        self.assertIs(self.listeners.route('sip:gw.example.com'), self.udp)
+        self.assertIs(self.listeners.route('sip:gw.example.com', size=2000), self.tcp)
+        self.assertIs(self.listeners.route('sip:gw.example.com;transport=tcp'), self.tcp)
+        self.assertIs(self.listeners.route('sip:[2001:db8::1]'), self.udp6)
+        self.listeners.set_preferred('gw.example.com', 'tcp')
+        self.assertIs(self.listeners.route('sip:1001@gw.example.com:5060'), self.tcp)
+        self.listeners.set_preferred('other.example.com', 'udp')
+        self.assertIs(self.listeners.route('other.example.com', size=2000), self.tcp)
+        self.listeners.set_preferred('gw.example.com', None)
+        self.assertIs(self.listeners.route('gw.example.com'), self.udp)
+        self.assertEqual(self.listeners.stats[('tcp', socket.AF_INET)]['routed'], 4)
+
+    def test_received(self):
+        hook = self.udp.context.add_event_hook.call_args[0][0]
+        hook(self.udp.context, MagicMock(request=None, response=None))
+        hook(self.udp.context, MagicMock())
+        self.assertEqual(self.udp.received, 1)
+
+    def test_quit(self):
+        contexts = [x.context for x in self.listeners]
+        self.listeners.quit()
+        self.assertEqual(len(self.listeners), 0)
+        for ctx in contexts:
+            ctx.quit.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
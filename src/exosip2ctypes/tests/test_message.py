@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from exosip2ctypes import initialize, unload
+from exosip2ctypes.header import CSeq, NameAddr, Uri, Via
+from exosip2ctypes.message import ParsedMessage, BodyPart
+
+SDP = (
+    'v=0\r\n'
+    'o=alice 2890844526 2890844526 IN IP4 192.0.2.101\r\n'
+    's=-\r\n'
+    'c=IN IP4 192.0.2.101\r\n'
+    't=0 0\r\n'
+    'm=audio 49170 RTP/AVP 0 8 101\r\n'
+    'a=rtpmap:101 telephone-event/8000\r\n'
+    'a=fmtp:101 0-15\r\n'
+    'a=ptime:20\r\n'
+    'a=sendrecv\r\n'
+)
+
+INVITE = '\r\n'.join([
+    'INVITE sip:bob@biloxi.example.com SIP/2.0',
+    'Via: SIP/2.0/TCP client.atlanta.example.com:5060;branch=z9hG4bK74bf9;received=192.0.2.101;rport=40000',
+    'Via: SIP/2.0/UDP proxy.example.com;branch=z9hG4bK1',
+    'Max-Forwards: 70',
+    'Route: <sip:proxy.example.com;lr>',
+    'Record-Route: <sip:rr.example.com;lr>',
+    'From: "Alice" <sip:alice@atlanta.example.com>;tag=9fxced76sl',
+    'To: Bob <sip:bob@biloxi.example.com>',
+    'Call-ID: 3848276298220188511@atlanta.example.com',
+    'CSeq: 2 INVITE',
+    'Contact: <sip:alice@client.atlanta.example.com;transport=tcp>',
+    'Proxy-Authorization: Digest username="alice", realm="atlanta.example.com", '
+    'nonce="wf84f1ceczx41ae6cbe5aea9c8e88d359", uri="sip:bob@biloxi.example.com", '
+    'response="42ce3cef44b22f50c6a6071bc8"',
+    'P-Asserted-Identity: "Alice" <sip:alice@atlanta.example.com>',
+    'X-Custom: a',
+    'X-Custom: b',
+    'Content-Type: application/sdp',
+    'Content-Length: {}'.format(len(SDP)),
+    '',
+    SDP,
+])
+
+PROXY_AUTHENTICATE = '\r\n'.join([
+    'SIP/2.0 407 Proxy Authentication Required',
+    'Via: SIP/2.0/TCP client.atlanta.example.com:5060;branch=z9hG4bK74bf9;received=192.0.2.101',
+    'From: "Alice" <sip:alice@atlanta.example.com>;tag=9fxced76sl',
+    'To: Bob <sip:bob@biloxi.example.com>;tag=3flal12sf',
+    'Call-ID: 3848276298220188511@atlanta.example.com',
+    'CSeq: 1 INVITE',
+    'Proxy-Authenticate: Digest realm="atlanta.example.com", qop="auth", '
+    'nonce="f84f1cec41e6cbe5aea9c8e88d359", algorithm=MD5',
+    'Content-Length: 0',
+    '',
+    '',
+])
+
+
+class ParsedMessageTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize()
+
+    @classmethod
+    def tearDownClass(cls):
+        unload()
+
+    def test_headers(self):
+        with ParsedMessage(INVITE) as msg:
+            self.assertEqual(msg.get_headers('X-Custom'), ['a', 'b'])
+            msg.add_headers([('X-Trace', '1'), ('X-Trace', '2')])
+            msg.add_headers({'X-Other': 'c'})
+            self.assertEqual(msg.get_headers('X-Trace'), ['1', '2'])
+            self.assertEqual(msg.remove_headers('x-custom'), 2)
+            self.assertEqual(msg.get_headers('X-Custom'), [])
+            self.assertEqual(msg.remove_headers('X-Custom'), 0)
+            self.assertEqual(msg.replace_header('X-Trace', '3'), 2)
+            self.assertEqual(msg.get_headers('X-Trace'), ['3'])
+            text = str(msg)
+            self.assertNotIn('X-Custom', text)
+            self.assertIn('X-Trace: 3\r\n', text)
+            self.assertIn('X-Other: c\r\n', text)
+            self.assertEqual(msg.replace_header('X-Trace', None), 1)
+            self.assertEqual(msg.get_headers('X-Trace'), [])
+            self.assertEqual(msg.get_headers('X-Other'), ['c'])
+
+    def test_via_and_cseq(self):
+        with ParsedMessage(INVITE) as msg:
+            self.assertEqual(msg.via, Via(
+                '2.0', 'TCP', 'client.atlanta.example.com', 5060, None,
+                (('branch', 'z9hG4bK74bf9'), ('received', '192.0.2.101'), ('rport', '40000'))
+            ))
+            self.assertEqual((msg.via.received, msg.via.rport), ('192.0.2.101', 40000))
+            vias = msg.vias
+            self.assertEqual(len(vias), 2)
+            self.assertEqual((vias[1].protocol, vias[1].host, vias[1].port), ('UDP', 'proxy.example.com', None))
+            self.assertEqual(vias[1].branch, 'z9hG4bK1')
+            self.assertEqual(msg.cseq, CSeq(2, 'INVITE'))
+
+    def test_routes(self):
+        with ParsedMessage(INVITE) as msg:
+            routes = msg.routes
+            self.assertEqual([x.host for x in routes], ['proxy.example.com'])
+            self.assertEqual(routes[0].uri.params, (('lr', None),))
+            self.assertEqual([x.host for x in msg.record_routes], ['rr.example.com'])
+
+    def test_auth(self):
+        with ParsedMessage(INVITE) as msg:
+            self.assertEqual(msg.authorizations, [])
+            auth = msg.proxy_authorizations[0]
+            self.assertEqual(auth.auth_type, 'Digest')
+            self.assertEqual(auth.username, '"alice"')
+            self.assertEqual(auth.realm, '"atlanta.example.com"')
+            self.assertEqual(auth.uri, '"sip:bob@biloxi.example.com"')
+            self.assertEqual(auth.response, '"42ce3cef44b22f50c6a6071bc8"')
+        with ParsedMessage(PROXY_AUTHENTICATE) as msg:
+            self.assertEqual((msg.status_code, msg.cseq), (407, CSeq(1, 'INVITE')))
+            self.assertEqual(msg.www_authenticates, [])
+            challenge = msg.proxy_authenticates[0]
+            self.assertEqual(challenge.auth_type, 'Digest')
+            self.assertEqual(challenge.realm, '"atlanta.example.com"')
+            self.assertEqual(challenge.nonce, '"f84f1cec41e6cbe5aea9c8e88d359"')
+            self.assertEqual((challenge.qop_options, challenge.algorithm), ('"auth"', 'MD5'))
+
+    def test_name_addrs(self):
+        with ParsedMessage(INVITE) as msg:
+            self.assertEqual(msg.from_, '"Alice" <sip:alice@atlanta.example.com>;tag=9fxced76sl')
+            self.assertEqual(msg.from_addr, NameAddr(
+                '"Alice"', Uri('sip', 'alice', None, 'atlanta.example.com'), (('tag', '9fxced76sl'),)
+            ))
+            self.assertEqual(str(msg.from_addr), msg.from_)
+            self.assertEqual(msg.from_addr.tag, '9fxced76sl')
+            self.assertEqual(msg.to, 'Bob <sip:bob@biloxi.example.com>')
+            self.assertEqual((msg.to_addr.display_name, msg.to_addr.user, msg.to_addr.tag), ('Bob', 'bob', None))
+            self.assertEqual(msg.contacts, ['<sip:alice@client.atlanta.example.com;transport=tcp>'])
+            contact = msg.contact_addrs[0]
+            self.assertEqual((contact.host, contact.uri.get_param('transport')), ('client.atlanta.example.com', 'tcp'))
+            self.assertEqual([str(x) for x in msg.contact_addrs], msg.contacts)
+            identity = msg.get_name_addrs('P-Asserted-Identity')[0]
+            self.assertEqual((identity.display_name, identity.user), ('"Alice"', 'alice'))
+
+    def test_iter_bodies(self):
+        with ParsedMessage(INVITE) as msg:
+            self.assertEqual(list(msg.iter_bodies()), [BodyPart('application/sdp', SDP.encode())])
+            view = next(msg.iter_bodies(copy=False)).data
+            self.assertEqual(bytes(view), SDP.encode())
+            self.assertEqual(msg.bodies, [SDP])
+
+    def test_add_body_from_file(self):
+        data = bytes(bytearray(range(256))) * 64
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'body.bin')
+            with open(path, 'wb') as fp:
+                fp.write(data)
+            with ParsedMessage(INVITE) as msg:
+                msg.add_body_from_file(path)
+                with open(path, 'rb') as fp:
+                    msg.add_body_from_file(fp)
+                parts = list(msg.iter_bodies())
+                self.assertEqual(len(parts), 3)
+                self.assertEqual([x.data for x in parts[1:]], [data, data])
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
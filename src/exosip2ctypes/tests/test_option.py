@@ -0,0 +1,78 @@
+import sys
+import unittest
+try:
+    from unittest.mock import MagicMock, call
+except ImportError:
+    from mock import MagicMock, call
+
+from exosip2ctypes.option import Option, Profile, validate_option, is_action
+
+
+class ValidateOptionTestCase(unittest.TestCase):
+
+    def test_keys(self):
+        self.assertEqual(validate_option('udp_keep_alive', 25), (Option.udp_keep_alive, 25))
+        self.assertEqual(validate_option(int(Option.use_rport), 1), (Option.use_rport, True))
+        with self.assertRaises(ValueError):
+            validate_option('no_such_option', 1)
+
+    def test_values(self):
+        self.assertEqual(validate_option(Option.add_dns_cache, (b'proxy.example.com', '192.0.2.10'))[1],
+                         ('proxy.example.com', '192.0.2.10'))
+        self.assertEqual(validate_option(Option.add_account_info, ('sip:proxy', '198.51.100.1', 5060))[1],
+                         ('sip:proxy', '198.51.100.1', 5060))
+        with self.assertRaises(TypeError):
+            validate_option(Option.udp_keep_alive, '25')
+        with self.assertRaises(TypeError):
+            validate_option(Option.enable_ipv6, 2)
+        with self.assertRaises(TypeError):
+            validate_option(Option.set_header_user_agent, 1)
+        with self.assertRaises(ValueError):
+            validate_option(Option.udp_keep_alive, -1)
+        with self.assertRaises(ValueError):
+            validate_option(Option.dns_capabilities, 3)
+        with self.assertRaises(ValueError):
+            validate_option(Option.add_dns_cache, ('x' * 1024, '192.0.2.10'))
+        with self.assertRaises(ValueError):
+            validate_option(Option.add_account_info, ('sip:proxy', '198.51.100.1', 70000))
+
+
+class ProfileTestCase(unittest.TestCase):
+
+    def test_init(self):
+        profile = Profile([('use_rport', True)], udp_keep_alive=25,
+                          add_dns_cache=[('a.example.com', '192.0.2.1'), ('b.example.com', '192.0.2.2')])
+        self.assertEqual(len(profile), 3)
+        self.assertIn(Option.udp_keep_alive, profile)
+        self.assertEqual(list(profile)[0], Option.use_rport)
+        self.assertEqual(len(profile['add_dns_cache']), 2)
+        self.assertTrue(is_action(Option.add_dns_cache))
+        with self.assertRaises(ValueError):
+            Profile(set_dscp=64)
+
+    @unittest.skipIf(sys.version_info < (3, 6), 'keyword arguments are not ordered')
+    def test_order(self):
+        profile = Profile({'use_rport': True}, udp_keep_alive=25, dns_capabilities=2, enable_reuse_tcp_port=True)
+        self.assertEqual(list(profile), [
+            Option.use_rport, Option.udp_keep_alive, Option.dns_capabilities, Option.enable_reuse_tcp_port])
+        derived = profile.derive(enable_ipv6=False, udp_keep_alive=0)
+        self.assertEqual(list(derived)[-1], Option.enable_ipv6)
+
+    def test_derive(self):
+        profile = Profile(udp_keep_alive=25, use_rport=True)
+        derived = profile.derive(udp_keep_alive=0)
+        self.assertEqual(profile[Option.udp_keep_alive], 25)
+        self.assertEqual(derived[Option.udp_keep_alive], 0)
+        self.assertTrue(derived[Option.use_rport])
+
+    def test_apply(self):
+        ctx = MagicMock()
+        Profile([('add_dns_cache', [('a.example.com', '192.0.2.1')]), ('udp_keep_alive', 25)]).apply(ctx)
+        self.assertEqual(ctx.set_option.call_args_list, [
+            call(Option.add_dns_cache, ('a.example.com', '192.0.2.1')),
+            call(Option.udp_keep_alive, 25),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
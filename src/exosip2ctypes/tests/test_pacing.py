@@ -0,0 +1,102 @@
+import unittest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from exosip2ctypes.error import OsipTimeout, OsipTooMuchCall, OsipNoNetwork
+from exosip2ctypes.event import EventType
+from exosip2ctypes.pacing import Pacer
+from exosip2ctypes.utils import _monotonic
+
+
+class PacerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = MagicMock()
+        self.pacer = Pacer(self.ctx, max_queue=4, timeout=None)
+
+    def test_global_rate(self):
+        pacer = Pacer(self.ctx, rate=10, burst=2)
+        futures = [pacer.submit('a.example.com', lambda: 'ok') for _ in range(3)]
+        ready, delay = pacer.poll()
+        self.assertEqual(len(ready), 2)
+        self.assertGreater(delay, 0)
+        pacer._send(ready)
+        self.assertEqual([f.result(0) for f in futures[:2]], ['ok', 'ok'])
+        self.assertEqual(pacer.queue_depth, 1)
+        self.assertEqual(pacer.stats['a.example.com']['sent'], 2)
+
+    def test_trunk_rate(self):
+        self.pacer.set_limits('sip:carrier.example.com', rate=10, burst=1)
+        self.pacer.submit('sip:1@carrier.example.com', lambda: 1)
+        self.pacer.submit('sip:2@carrier.example.com', lambda: 2)
+        self.pacer.submit('sip:3@other.example.com', lambda: 3)
+        ready, _ = self.pacer.poll()
+        self.assertEqual([item.send() for item in ready], [1, 3])
+
+    def test_max_calls(self):
+        self.pacer.set_limits('carrier.example.com', max_calls=1)
+        first = self.pacer.submit('carrier.example.com', lambda: 7, is_call=True)
+        self.pacer.submit('carrier.example.com', lambda: 8, is_call=True)
+        ready, _ = self.pacer.poll()
+        self.pacer._send(ready)
+        self.assertEqual(first.result(0), 7)
+        self.assertEqual(self.pacer.poll()[0], [])
+        trunk = self.pacer.get_trunk('carrier.example.com')
+        self.assertEqual((trunk.active, trunk.queued), (1, 1))
+        self.pacer._hook(self.ctx, MagicMock(type=EventType.call_closed, cid=7))
+        self.pacer._hook(self.ctx, MagicMock(type=EventType.call_released, cid=7))
+        self.assertEqual(trunk.active, 0)
+        self.assertEqual(len(self.pacer.poll()[0]), 1)
+
+    def test_send_error(self):
+        def send():
+            raise OsipNoNetwork()
+
+        fut = self.pacer.submit('carrier.example.com', send, is_call=True)
+        self.pacer._send(self.pacer.poll()[0])
+        self.assertIsInstance(fut.exception(0), OsipNoNetwork)
+        self.assertEqual(self.pacer.get_trunk('carrier.example.com').active, 0)
+
+    def test_deadline_and_queue_bound(self):
+        fut = self.pacer.submit('a.example.com', lambda: None, timeout=1)
+        for _ in range(3):
+            self.pacer.submit('a.example.com', lambda: None)
+        with self.assertRaises(OsipTooMuchCall):
+            self.pacer.submit('a.example.com', lambda: None)
+        ready, _ = self.pacer.poll(now=_monotonic() + 2)
+        self.assertEqual(len(ready), 3)
+        self.assertIsInstance(fut.exception(0), OsipTimeout)
+        stats = self.pacer.stats['a.example.com']
+        self.assertEqual((stats['expired'], stats['rejected'], stats['queued']), (1, 1, 0))
+
+    def test_cancel(self):
+        self.pacer.set_limits('carrier.example.com', max_calls=1)
+        first = self.pacer.submit('carrier.example.com', lambda: 7, is_call=True)
+        second = self.pacer.submit('carrier.example.com', lambda: 8, is_call=True)
+        expired = self.pacer.submit('carrier.example.com', lambda: 9, timeout=1)
+        self.assertTrue(first.cancel())
+        self.assertTrue(expired.cancel())
+        ready, _ = self.pacer.poll(now=_monotonic() + 2)
+        self.assertEqual([item.future for item in ready], [second])
+        self.assertFalse(second.cancel())
+        self.pacer._send(ready)
+        self.assertEqual(second.result(0), 8)
+        trunk = self.pacer.get_trunk('carrier.example.com')
+        self.assertEqual((trunk.active, trunk.queued, trunk.sent, trunk.expired), (1, 0, 1, 0))
+
+    def test_send_invite(self):
+        invite = MagicMock(route=None, to_url='sip:1001@carrier.example.com')
+        self.ctx.call_send_init_invite.return_value = 3
+        self.pacer.start()
+        try:
+            self.assertEqual(self.pacer.send_invite(invite).result(5), 3)
+        finally:
+            self.pacer.stop()
+        self.ctx.call_send_init_invite.assert_called_once_with(invite, False)
+        self.assertEqual(self.pacer.get_trunk('carrier.example.com').active, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import time
+import unittest
+try:
+    from unittest.mock import MagicMock, Mock, patch
+except ImportError:
+    from mock import MagicMock, Mock, patch
+
+from exosip2ctypes.event import EventType
+from exosip2ctypes.register import Registration, RegistrationIndex, RegistrationManager, RegistrationState
+
+
+class _InitialRegister(object):
+    rids = iter(range(1, 1000))
+
+    def __init__(self, context, from_, proxy, contact=None, expires=3600):
+        self.rid = next(self.rids)
+        self.expires = expires
+
+    def send(self):
+        pass
+
+
+def _event(type_, rid, status):
+    return Mock(type=type_, rid=rid, response=Mock(status_code=status))
+
+
+class RegistrationManagerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = MagicMock()
+        patcher = patch('exosip2ctypes.register.InitialRegister', _InitialRegister)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _wait_sent(self, manager, n):
+        for _ in range(100):
+            if sum(1 for r in manager if r.rid) >= n:
+                return
+            time.sleep(0.01)
+        self.fail('REGISTERs not sent')
+
+    def test_register(self):
+        manager = RegistrationManager(self.ctx, 'sip:registrar', expires=1000, jitter=0.5, rate=1000)
+        self.assertEqual(manager.add(['sip:{}@example.com'.format(i) for i in range(10)]), 10)
+        self.assertEqual(manager.add(['sip:0@example.com']), 0)
+        self.assertEqual(manager.pending, 10)
+        for record in manager:
+            self.assertTrue(500 <= record.expires <= 1000)
+        manager.start()
+        try:
+            self._wait_sent(manager, 10)
+            hook = self.ctx.add_event_hook.call_args[0][0]
+            alice = manager.get('sip:0@example.com')
+            bob = manager.get('sip:1@example.com')
+            hook(self.ctx, _event(EventType.registration_success, alice.rid, 200))
+            hook(self.ctx, _event(EventType.registration_failure, bob.rid, 401))
+            self.assertEqual(bob.state, RegistrationState.pending)
+            hook(self.ctx, _event(EventType.registration_failure, bob.rid, 401))
+            self.assertEqual(bob.state, RegistrationState.failed)
+            self.assertIs(manager.get_by_rid(alice.rid), alice)
+            self.assertIsNotNone(alice.expiry)
+            self.assertEqual((manager.registered, manager.pending, manager.failed), (1, 8, 1))
+        finally:
+            manager.stop()
+        self.ctx.remove_event_hook.assert_called_once_with(hook)
+
+
+class RegistrationIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.ctx = MagicMock()
+        self.index = RegistrationIndex(self.ctx)
+        for i, expires in enumerate([300, 100, 200]):
+            record = Registration('sip:{}@example.com'.format(i), 'sip:registrar', expires=expires)
+            self.index.add(record)
+            self.index.set_rid(record, i + 1)
+            self.index.update(_event(EventType.registration_success, i + 1, 200))
+
+    def test_lookup(self):
+        record = self.index.get('sip:1@example.com')
+        self.assertIs(self.index.get_by_rid(2), record)
+        self.assertEqual(record.state, RegistrationState.registered)
+        self.assertEqual(self.index.count(RegistrationState.registered), 3)
+        self.assertEqual([r.expires for r in self.index.by_expiry()], [100, 200, 300])
+        self.assertEqual([r.expires for r in self.index.by_expiry(1)], [100])
+
+    def test_unknown_rid(self):
+        evt = _event(EventType.registration_success, 9, 200)
+        evt.request.to_addr.uri = 'sip:9@example.com'
+        evt.request.request_uri = 'sip:registrar'
+        record = self.index.update(evt)
+        self.assertEqual((record.aor, record.rid), ('sip:9@example.com', 9))
+        self.assertIs(self.index.get('sip:9@example.com'), record)
+
+    def test_unregister(self):
+        with patch('exosip2ctypes.register.Register') as register:
+            failures = self.index.unregister(['sip:0@example.com', 'sip:1@example.com', 'sip:x@example.com'],
+                                             batch_size=2)
+        self.assertEqual(failures, [])
+        self.assertEqual(register.call_count, 2)
+        self.assertEqual(self.ctx.lock.__enter__.call_count, 2)
+        self.assertEqual(self.index.count(RegistrationState.unregistering), 2)
+        self.index.update(_event(EventType.registration_success, 1, 200))
+        self.assertNotIn('sip:0@example.com', self.index)
+        self.assertEqual(len(self.index), 2)
+
+    def test_remove(self):
+        with patch('exosip2ctypes.register.register.FuncRegisterRemove') as func:
+            func.c_func.return_value = 0
+            self.index.remove(self.index.iter_state(RegistrationState.registered))
+        self.assertEqual(func.c_func.call_count, 3)
+        self.assertEqual(len(self.index), 0)
+        self.assertIsNone(self.index.get_by_rid(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
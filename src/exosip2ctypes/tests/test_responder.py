@@ -0,0 +1,107 @@
+import unittest
+from ctypes import pointer
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+from exosip2ctypes._c import event
+from exosip2ctypes.error import OsipError
+from exosip2ctypes.event import EventType
+from exosip2ctypes.header import parse_uri
+from exosip2ctypes.responder import AutoResponse, AutoResponder
+
+
+def _request(method='INVITE', uri='sip:ivr@example.com', headers=None):
+    headers = headers or {}
+    return Mock(method=method, request_uri=parse_uri(uri), get_headers=lambda name: headers.get(name, []))
+
+
+class _Rule(AutoResponse):
+    __slots__ = ('sent',)
+
+    def _answer(self, context, tid, request):
+        self.sent = tid
+        return 1, None
+
+
+class AutoResponseTestCase(unittest.TestCase):
+
+    def test_match(self):
+        rule = AutoResponse(EventType.message_new, 200, method='options', request_uri=r'^sip:ivr@',
+                            header=('User-Agent', r'^friendly-scanner'))
+        self.assertTrue(rule.match(_request('OPTIONS', headers={'User-Agent': ['friendly-scanner 1.0']})))
+        self.assertFalse(rule.match(_request('OPTIONS')))
+        self.assertFalse(rule.match(_request('MESSAGE', headers={'User-Agent': ['friendly-scanner']})))
+        self.assertFalse(rule.match(_request('OPTIONS', 'sip:bob@example.com',
+                                             headers={'User-Agent': ['friendly-scanner']})))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            AutoResponse(EventType.call_answered, 200)
+        with self.assertRaises(ValueError):
+            AutoResponse(EventType.call_invite, 200, body='v=0\r\n')
+
+
+class AutoResponderTestCase(unittest.TestCase):
+
+    def _event_ptr(self, type_, tid=1):
+        evt = event.Event()
+        evt.type = type_
+        evt.tid = tid
+        evt.request = 1
+        return pointer(evt)
+
+    def test_respond(self):
+        responder = AutoResponder()
+        self.assertFalse(responder)
+        rule = _Rule(EventType.call_invite, 486, request_uri=r'^sip:busy@')
+        responder.add(rule)
+        self.assertEqual(len(responder), 1)
+        ctx = Mock()
+        ptr = self._event_ptr(EventType.call_invite, 7)
+        with patch('exosip2ctypes.responder.ExosipMessage', return_value=_request(uri='sip:busy@a')):
+            self.assertTrue(responder.respond(ctx, ptr))
+            self.assertFalse(responder.respond(ctx, self._event_ptr(EventType.message_new)))
+        self.assertEqual(rule.sent, 7)
+        with patch('exosip2ctypes.responder.ExosipMessage', return_value=_request(uri='sip:ivr@a')):
+            self.assertFalse(responder.respond(ctx, ptr))
+        responder.remove(rule)
+        self.assertEqual(responder.rules, [])
+
+    def test_final_answer_failure(self):
+        responder = AutoResponder()
+        rule = AutoResponse(EventType.call_invite, 486, provisional=(180,))
+        responder.add(rule)
+        ctx = Mock()
+        with patch('exosip2ctypes.responder.ExosipMessage', return_value=_request()), \
+                patch('exosip2ctypes.responder.call') as c_call:
+            c_call.FuncCallSendAnswer.c_func.side_effect = [0, -1]
+            # the 180 went out: the event is consumed
+            self.assertTrue(responder.respond(ctx, self._event_ptr(EventType.call_invite, 7)))
+            c_call.FuncCallSendAnswer.c_func.side_effect = [-1]
+            self.assertFalse(responder.respond(ctx, self._event_ptr(EventType.call_invite, 8)))
+            c_call.FuncCallSendAnswer.c_func.side_effect = [-1]
+            with self.assertRaises(OsipError):
+                rule.send(ctx, 9, _request())
+        self.assertEqual(rule.count, 0)
+
+    def test_body_failure(self):
+        def body(request):
+            raise RuntimeError('no RTP port')
+
+        rule = AutoResponse(EventType.call_invite, 200, body=body, content_type='application/sdp')
+        with patch('exosip2ctypes.responder.ExosipMessage'), \
+                patch('exosip2ctypes.responder.call') as c_call, \
+                patch('exosip2ctypes.responder.osip_parser') as c_parser:
+            c_call.FuncCallBuildAnswer.c_func.return_value = 0
+            with self.assertRaises(RuntimeError):
+                rule.send(Mock(), 9, _request())
+        # the built answer is freed, as it is never handed to eXosip
+        self.assertEqual(c_parser.FuncMessageFree.c_func.call_count, 1)
+        self.assertFalse(c_call.FuncCallSendAnswer.c_func.called)
+        self.assertEqual(rule.count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
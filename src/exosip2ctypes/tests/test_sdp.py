@@ -0,0 +1,222 @@
+import unittest
+
+from exosip2ctypes import initialize, unload
+from exosip2ctypes.error import OsipNoCommonCodec, OsipPortBusy
+from exosip2ctypes.event import EventType
+from exosip2ctypes.message import ParsedMessage
+from exosip2ctypes.sdp import Media, Codec, Connection, Origin, SdpMessage, SdpAnswerer, RtpPortAllocator
+
+OFFER = (
+    'v=0\r\n'
+    'o=alice 2890844526 2890844527 IN IP4 192.0.2.101\r\n'
+    's=call\r\n'
+    'c=IN IP4 192.0.2.101\r\n'
+    't=0 0\r\n'
+    'a=sendrecv\r\n'
+    'm=audio 49170 RTP/AVP 0 8 101\r\n'
+    'a=rtpmap:101 telephone-event/8000\r\n'
+    'a=fmtp:101 0-15\r\n'
+    'a=ptime:20\r\n'
+    'm=video 51372 RTP/AVP 99\r\n'
+    'c=IN IP4 192.0.2.102\r\n'
+    'a=rtpmap:99 H264/90000\r\n'
+    'a=sendonly\r\n'
+)
+
+INVITE = '\r\n'.join([
+    'INVITE sip:bob@biloxi.example.com SIP/2.0',
+    'Via: SIP/2.0/UDP 192.0.2.101:5060;branch=z9hG4bK776asdhds',
+    'Max-Forwards: 70',
+    'From: <sip:alice@atlanta.example.com>;tag=1928301774',
+    'To: <sip:bob@biloxi.example.com>',
+    'Call-ID: a84b4c76e66710@atlanta.example.com',
+    'CSeq: 314159 INVITE',
+    'Contact: <sip:alice@192.0.2.101>',
+    'Content-Type: application/sdp',
+    'Content-Length: {}'.format(len(OFFER)),
+    '',
+    OFFER,
+])
+
+
+def _audio(formats, attributes=(), port=40000):
+    return Media('audio', port, 'RTP/AVP', formats, attributes=attributes)
+
+
+class MediaTestCase(unittest.TestCase):
+
+    def test_codecs(self):
+        media = _audio(['0', '96', '101'], [
+            ('rtpmap', '96 opus/48000/2'), ('fmtp', '96 useinbandfec=1'),
+            ('rtpmap', '101 telephone-event/8000'), ('ptime', '30'), ('sendonly', None),
+        ])
+        self.assertEqual(media.codec(0).name, 'PCMU')
+        self.assertEqual(media.codec(96).channels, 2)
+        self.assertEqual(media.codec(96).fmtp, 'useinbandfec=1')
+        self.assertEqual(media.find_codec('OPUS').payload_type, 96)
+        self.assertIsNone(media.find_codec('opus', 8000))
+        self.assertEqual(media.find_codec('telephone-event', 8000).payload_type, 101)
+        self.assertEqual(media.ptime, 30)
+        self.assertEqual(media.direction, 'sendonly')
+
+
+class SdpMessageTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize()
+
+    @classmethod
+    def tearDownClass(cls):
+        unload()
+
+    def test_parse(self):
+        sdp = SdpMessage.parse(OFFER)
+        try:
+            self.assertEqual(sdp.version, '0')
+            self.assertEqual(sdp.origin, Origin('alice', '2890844526', '2890844527', 'IN', 'IP4', '192.0.2.101'))
+            self.assertEqual(sdp.session_name, 'call')
+            self.assertEqual(sdp.connection, Connection('IN', 'IP4', '192.0.2.101'))
+            self.assertEqual(sdp.attributes, (('sendrecv', None),))
+            self.assertIn('m=video 51372 RTP/AVP 99', str(sdp))
+        finally:
+            sdp.dispose()
+        # fields are kept once materialized
+        self.assertEqual([m.media for m in sdp.media], ['audio', 'video'])
+        audio = sdp.find_media('audio')
+        self.assertEqual((audio.port, audio.proto, audio.formats), (49170, 'RTP/AVP', ('0', '8', '101')))
+        self.assertEqual([c.name for c in audio.codecs], ['PCMU', 'PCMA', 'telephone-event'])
+        self.assertEqual(audio.find_codec('telephone-event').fmtp, '0-15')
+        self.assertEqual(audio.ptime, 20)
+        self.assertIsNone(audio.connection)
+        self.assertEqual(sdp.media_connection(audio), sdp.connection)
+        self.assertEqual(sdp.media_direction(audio), 'sendrecv')
+        video = sdp.find_media('video')
+        self.assertEqual(video.codec(99), Codec(99, 'H264', 90000, 1, None))
+        self.assertEqual(sdp.media_connection(video), Connection('IN', 'IP4', '192.0.2.102'))
+        self.assertEqual(sdp.media_direction(video), 'sendonly')
+
+    def test_from_message(self):
+        with ParsedMessage(INVITE) as msg:
+            sdp = SdpMessage.from_message(msg)
+        try:
+            self.assertEqual(sdp.origin.sess_version, '2890844527')
+            answer = SdpAnswerer([('PCMA', 8000), ('PCMU', 8000)], '192.168.56.101').answer(sdp, 54000, sess_id=1)
+        finally:
+            sdp.dispose()
+        self.assertIn(b'm=audio 54000 RTP/AVP 0 101\r\n', answer)
+        self.assertIn(b'm=video 0 RTP/AVP 99\r\n', answer)
+
+
+class SdpAnswererTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.answerer = SdpAnswerer([('PCMA', 8000), ('PCMU', 8000)], '192.168.56.101')
+
+    def test_answer_offer_order(self):
+        offer = [_audio(['0', '8', '101'], [('rtpmap', '101 telephone-event/8000')])]
+        body = self.answerer.answer(offer, 54000, sess_id=1)
+        self.assertEqual(
+            body,
+            b'v=0\r\n'
+            b'o=- 1 1 IN IP4 192.168.56.101\r\n'
+            b's=-\r\n'
+            b'c=IN IP4 192.168.56.101\r\n'
+            b't=0 0\r\n'
+            b'm=audio 54000 RTP/AVP 0 101\r\n'
+            b'a=rtpmap:0 PCMU/8000\r\n'
+            b'a=rtpmap:101 telephone-event/8000\r\n'
+            b'a=fmtp:101 0-16\r\n'
+            b'a=ptime:20\r\n'
+            b'a=sendrecv\r\n'
+        )
+
+    def test_answer_local_preference(self):
+        answerer = SdpAnswerer([('PCMA', 8000), ('PCMU', 8000)], '10.0.0.1', prefer_local=True,
+                               telephone_event=None, ptime=None)
+        body = answerer.answer([_audio(['0', '8'])], 4000, sess_id=1)
+        self.assertIn(b'm=audio 4000 RTP/AVP 8\r\na=rtpmap:8 PCMA/8000\r\n', body)
+
+    def test_answer_all_common(self):
+        answerer = SdpAnswerer([('PCMA', 8000), ('PCMU', 8000)], '10.0.0.1', single_codec=False)
+        body = answerer.answer([_audio(['18', '0', '8'])], 4000)
+        self.assertIn(b'm=audio 4000 RTP/AVP 0 8\r\n', body)
+
+    def test_direction_and_rejected_streams(self):
+        offer = [
+            Media('video', 5000, 'RTP/AVP', ['96']),
+            _audio(['8'], [('sendonly', None)]),
+        ]
+        body = self.answerer.answer(offer, 4000)
+        self.assertIn(b'm=video 0 RTP/AVP 96\r\n', body)
+        self.assertIn(b'a=recvonly\r\n', body)
+        self.assertLess(body.index(b'm=video'), body.index(b'm=audio'))
+
+    def test_no_common_codec(self):
+        with self.assertRaises(OsipNoCommonCodec):
+            self.answerer.answer([_audio(['18'])], 4000)
+
+
+class _Event(object):
+
+    def __init__(self, type_, cid):
+        self.type = type_
+        self.cid = cid
+
+
+class _Context(object):
+
+    def __init__(self):
+        self.hooks = []
+
+    def add_event_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_event_hook(self, hook):
+        self.hooks.remove(hook)
+
+
+class RtpPortAllocatorTestCase(unittest.TestCase):
+
+    def test_allocate(self):
+        ports = RtpPortAllocator(10001, 10007, quarantine=0)
+        self.assertEqual((ports.start, ports.end, len(ports)), (10002, 10006, 2))
+        self.assertEqual([ports.allocate(), ports.allocate()], [10002, 10004])
+        with self.assertRaises(OsipPortBusy):
+            ports.allocate()
+        ports.release(10002)
+        self.assertEqual(ports.allocate(), 10002)
+        with self.assertRaises(ValueError):
+            ports.release(10003)
+
+    def test_quarantine(self):
+        ports = RtpPortAllocator(10000, 10004, quarantine=3600)
+        port = ports.allocate()
+        ports.release(port)
+        self.assertEqual(ports.available, 1)
+        self.assertEqual(ports.in_use, 0)
+        self.assertNotEqual(ports.allocate(), port)
+        with self.assertRaises(OsipPortBusy):
+            ports.allocate()
+        with self.assertRaises(ValueError):
+            ports.release(port)
+
+    def test_call_released(self):
+        ports = RtpPortAllocator(10000, 10100, quarantine=0)
+        ctx = _Context()
+        ports.bind(ctx)
+        audio, video = ports.allocate(1), ports.allocate(1)
+        other = ports.allocate(2)
+        self.assertEqual(ports.get_call_ports(1), [audio, video])
+        for hook in ctx.hooks:
+            hook(ctx, _Event(EventType.call_released, 1))
+        self.assertEqual(ports.get_call_ports(1), [])
+        self.assertEqual(ports.in_use, 1)
+        ports.release(other)
+        self.assertEqual(ports.release_call(2), 0)
+        ports.unbind(ctx)
+        self.assertEqual(ctx.hooks, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from exosip2ctypes import initialize, unload
+from exosip2ctypes.message import ParsedMessage
+from exosip2ctypes.trace import RawMessage, MessageSnapshot, CallAggregator, iter_sip_file, snapshot, parse_trace
+
+
+def _message(start_line, call_id, cseq, to_tag=None):
+    lines = [
+        start_line,
+        'Via: SIP/2.0/UDP 192.0.2.101:5060;branch=z9hG4bK776asdhds',
+        'From: <sip:alice@atlanta.example.com>;tag=1928301774',
+        'To: <sip:bob@biloxi.example.com>' + (';tag=' + to_tag if to_tag else ''),
+        'Call-ID: ' + call_id,
+        'CSeq: ' + cseq,
+        'Content-Length: 0',
+        '',
+        '',
+    ]
+    return '\r\n'.join(lines).encode()
+
+
+INVITE_URI = 'INVITE sip:bob@biloxi.example.com SIP/2.0'
+
+TRACE = [
+    RawMessage(10.0, _message(INVITE_URI, 'a@atlanta', '1 INVITE')),
+    RawMessage(10.5, _message('SIP/2.0 180 Ringing', 'a@atlanta', '1 INVITE', 'b1')),
+    RawMessage(12.0, _message('SIP/2.0 200 OK', 'a@atlanta', '1 INVITE', 'b1')),
+    RawMessage(20.0, _message('BYE sip:bob@192.0.2.102 SIP/2.0', 'a@atlanta', '2 BYE', 'b1')),
+    RawMessage(30.0, _message(INVITE_URI, 'c@atlanta', '1 INVITE')),
+    RawMessage(31.0, _message('SIP/2.0 486 Busy Here', 'c@atlanta', '1 INVITE', 'b2')),
+    RawMessage(32.0, b'not a SIP message\r\n\r\n'),
+]
+
+
+class IterSipFileTestCase(unittest.TestCase):
+
+    def test_log_prefixes(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'trace.log')
+            with open(path, 'wb') as fp:
+                for raw in TRACE[:6]:
+                    fp.write(b'2016-01-01 00:00:00 received:\n' + raw.data + b'\n')
+            for chunk_size in (64, 65536):
+                self.assertEqual([x.data for x in iter_sip_file(path, chunk_size)], [x.data for x in TRACE[:6]])
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+def _snapshot(timestamp, cseq, method=None, status_code=None, call_id='a@atlanta'):
+    return MessageSnapshot(timestamp, call_id, method, status_code, cseq, method or 'INVITE',
+                           'alice', '1928301774', 'bob', 'b1' if status_code else None)
+
+
+class CallAggregatorTestCase(unittest.TestCase):
+
+    def test_auth_challenge(self):
+        aggregator = CallAggregator()
+        aggregator.update([
+            _snapshot(10.0, 1, 'INVITE'),
+            _snapshot(10.1, 1, status_code=407),
+            _snapshot(10.2, 2, 'INVITE'),
+            _snapshot(10.2, 2, 'INVITE'),
+            _snapshot(10.3, 1, status_code=407),
+            _snapshot(11.2, 2, status_code=180),
+            _snapshot(13.0, 2, status_code=200),
+            _snapshot(15.0, 3, 'INVITE'),
+            _snapshot(15.1, 3, status_code=491),
+        ])
+        call = aggregator.calls['a@atlanta']
+        self.assertEqual((call.attempts, call.invite_cseq, call.final_status, call.failed), (2, 2, 200, False))
+        self.assertEqual((call.post_dial_delay, call.answer_time), (1.0, 13.0))
+        self.assertEqual(dict(aggregator.failure_codes), {})
+        self.assertEqual(aggregator.methods['INVITE'], 4)
+
+    def test_unanswered_challenge(self):
+        aggregator = CallAggregator()
+        aggregator.update([
+            _snapshot(10.0, 1, 'INVITE'),
+            _snapshot(10.1, 1, status_code=401),
+            _snapshot(20.0, 1, 'INVITE', call_id='b@atlanta'),
+            _snapshot(20.1, 1, status_code=302, call_id='b@atlanta'),
+            _snapshot(20.2, 2, 'INVITE', call_id='b@atlanta'),
+            _snapshot(21.0, 2, status_code=486, call_id='b@atlanta'),
+        ])
+        self.assertTrue(aggregator.calls['a@atlanta'].failed)
+        redirected = aggregator.calls['b@atlanta']
+        self.assertEqual((redirected.attempts, redirected.invite_time, redirected.end_time), (2, 20.2, 21.0))
+        self.assertEqual(dict(aggregator.failure_codes), {401: 1, 486: 1})
+
+
+class TraceParseTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize()
+
+    @classmethod
+    def tearDownClass(cls):
+        unload()
+
+    def test_parsed_message(self):
+        with ParsedMessage(TRACE[1].data) as msg:
+            self.assertFalse(msg.is_request)
+            self.assertEqual((msg.status_code, msg.reason_phrase, msg.call_id), (180, 'Ringing', 'a@atlanta'))
+        with ParsedMessage(TRACE[0].data) as msg:
+            self.assertTrue(msg.is_request)
+            self.assertEqual((msg.method, str(msg.request_uri)), ('INVITE', 'sip:bob@biloxi.example.com'))
+
+    def test_snapshot(self):
+        self.assertEqual(snapshot(TRACE[1]), MessageSnapshot(
+            10.5, 'a@atlanta', None, 180, 1, 'INVITE', 'alice', '1928301774', 'bob', 'b1'))
+        self.assertEqual(snapshot(TRACE[3]).method, 'BYE')
+
+    def test_parse_trace_and_aggregate(self):
+        snapshots = list(parse_trace(TRACE, max_workers=1, chunk_size=2))
+        self.assertEqual([x.timestamp for x in snapshots], [x.timestamp for x in TRACE[:6]])
+        aggregator = CallAggregator()
+        aggregator.update(snapshots)
+        answered = aggregator.calls['a@atlanta']
+        self.assertEqual((answered.caller, answered.callee, answered.final_status), ('alice', 'bob', 200))
+        self.assertEqual((answered.post_dial_delay, answered.duration), (0.5, 8.0))
+        busy = aggregator.calls['c@atlanta']
+        self.assertTrue(busy.failed)
+        self.assertEqual((busy.final_status, busy.end_time, busy.post_dial_delay), (486, 31.0, None))
+        self.assertEqual(dict(aggregator.failure_codes), {486: 1})
+        self.assertEqual(dict(aggregator.methods), {'INVITE': 2, 'BYE': 1})
+        self.assertEqual(aggregator.post_dial_delays, [0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
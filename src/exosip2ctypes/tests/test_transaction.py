@@ -0,0 +1,67 @@
+import unittest
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from exosip2ctypes.error import OsipWrongState
+from exosip2ctypes.event import EventType
+from exosip2ctypes.transaction import TransactionTracker
+
+
+def _event(type_, cid=0, rid=0, tid=0, status=None):
+    response = Mock(status_code=status) if status else None
+    return Mock(type=type_, cid=cid, rid=rid, tid=tid, response=response)
+
+
+class TransactionTrackerTestCase(unittest.TestCase):
+
+    def test_call(self):
+        tracker = TransactionTracker()
+        fut = tracker.watch_call(5)
+        self.assertIs(tracker.watch_call(5), fut)
+        ringing = _event(EventType.call_ringing, cid=5, tid=1, status=180)
+        tracker.update(ringing)
+        tracker.update(_event(EventType.call_ringing, cid=6, tid=2, status=180))
+        self.assertFalse(fut.done())
+        answered = _event(EventType.call_answered, cid=5, tid=1, status=200)
+        tracker.update(answered)
+        self.assertIs(fut.result(0), answered)
+        self.assertEqual(list(fut.iter_provisional(0)), [ringing])
+        self.assertEqual(len(tracker), 0)
+
+    def test_call_challenge(self):
+        tracker = TransactionTracker()
+        fut = tracker.watch_call(5)
+        tracker.update(_event(EventType.call_requestfailure, cid=5, status=407))
+        self.assertFalse(fut.done())
+        failure = _event(EventType.call_requestfailure, cid=5, status=407)
+        tracker.update(failure)
+        self.assertIs(fut.result(0), failure)
+
+    def test_call_released(self):
+        tracker = TransactionTracker()
+        fut = tracker.watch_call(5)
+        tracker.update(_event(EventType.call_released, cid=5))
+        self.assertIsInstance(fut.exception(0), OsipWrongState)
+
+    def test_registration_and_request(self):
+        tracker = TransactionTracker()
+        reg = tracker.watch_registration(3)
+        req = tracker.watch_request(9)
+        success = _event(EventType.registration_success, rid=3, tid=8, status=200)
+        tracker.update(success)
+        self.assertIs(reg.result(0), success)
+        answered = _event(EventType.call_message_answered, cid=1, tid=9, status=200)
+        tracker.update(answered)
+        self.assertIs(req.result(0), answered)
+
+    def test_clear(self):
+        tracker = TransactionTracker()
+        fut = tracker.watch_request(1)
+        tracker.clear()
+        self.assertIsInstance(fut.exception(0), OsipWrongState)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from exosip2ctypes.utils import HandleTable, TokenBucket
+
+
+class HandleTableTestCase(unittest.TestCase):
+
+    def test_add_get_remove(self):
+        table = HandleTable()
+        a, b = object(), object()
+        ha, hb = table.add(a), table.add(b)
+        self.assertEqual((ha, hb), (1, 2))
+        self.assertIs(table.get(ha), a)
+        self.assertIsNone(table.get(0))
+        self.assertIsNone(table.get(99))
+        self.assertIs(table.remove(ha), a)
+        self.assertNotIn(ha, table)
+        self.assertIsNone(table.remove(ha))
+        self.assertEqual(table.add(a), ha)  # reused
+        self.assertEqual(len(table), 2)
+
+    def test_replace(self):
+        table = HandleTable()
+        handle = table.add('a')
+        table.replace(handle, 'b')
+        self.assertEqual(table.get(handle), 'b')
+        with self.assertRaises(KeyError):
+            table.replace(handle + 1, 'c')
+        with self.assertRaises(ValueError):
+            table.add(None)
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    def test_take(self):
+        bucket = TokenBucket(100, burst=5)
+        self.assertEqual(bucket.take(10), 5)
+        self.assertEqual(bucket.take(1, block=False), 0)
+        self.assertEqual(bucket.take(1), 1)
+
+    def test_delay(self):
+        bucket = TokenBucket(10, burst=2)
+        self.assertEqual(bucket.delay(), 0)
+        bucket.take(2)
+        self.assertGreater(bucket.delay(), 0)
+        self.assertLessEqual(bucket.delay(), 0.1)
+        self.assertEqual(bucket.take(1, block=False), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+
+"""
+Offline SIP trace analysis
+
+Parse captured SIP traffic with oSIP's native parser, the same one used for live messages.
+
+Sources can be:
+
+* a text file of SIP messages, as written by most SIP loggers (:func:`iter_sip_file`)
+* a `pcap` capture file, SIP messages are taken from UDP payloads (:func:`iter_pcap`)
+
+:func:`parse_trace` spreads the parse work over a process pool and yields :class:`MessageSnapshot` records,
+:class:`CallAggregator` folds them into per-call figures such as post-dial delay and failure codes.
+
+eg::
+
+    from exosip2ctypes import trace
+
+    aggregator = trace.CallAggregator()
+    for snapshot in trace.parse_trace(trace.iter_pcap('night.pcap')):
+        aggregator.add(snapshot)
+    print(aggregator.failure_codes)
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import re
+import socket
+import struct
+from collections import namedtuple, deque, Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from ._c import globs
+from ._c.lib import initialize
+from .error import OsipError
+from .message import ParsedMessage
+
+__all__ = ['RawMessage', 'MessageSnapshot', 'CallSummary', 'CallAggregator',
+           'iter_sip_file', 'iter_pcap', 'snapshot', 'parse_trace']
+
+_logger = logging.getLogger(__name__)
+
+_CONTENT_LENGTH_RE = re.compile(br'^(?:content-length|l)[ \t]*:[ \t]*(\d+)', re.IGNORECASE | re.MULTILINE)
+_START_LINE_RE = re.compile(br'(?:SIP/2\.0 \d{3}|[A-Z]+ \S+ SIP/2\.0)')
+
+
+class RawMessage(namedtuple('RawMessage', ['timestamp', 'data'])):
+    """A raw SIP message read from a trace source
+
+    `timestamp` is a `float` (seconds since epoch) or `None` if the source has no time information.
+    """
+    __slots__ = ()
+
+
+class MessageSnapshot(namedtuple('MessageSnapshot', [
+    'timestamp', 'call_id', 'method', 'status_code', 'cseq_number', 'cseq_method',
+    'from_user', 'from_tag', 'to_user', 'to_tag',
+])):
+    """Header snapshot of a parsed SIP message
+
+    For a response, `method` is `None` and `cseq_method` tells the method it answers.
+    """
+    __slots__ = ()
+
+
+def iter_sip_file(path, chunk_size=65536):
+    """Stream SIP messages out of a text file
+
+    :param str path: File path
+    :param int chunk_size: Read buffer size
+    :return: Generator of :class:`RawMessage`, `timestamp` is `None`
+
+    Messages are framed by their start line, the empty line after the headers and `Content-Length`.
+    Anything between messages (log prefixes, blank lines...) is skipped.
+    """
+    buf = b''
+    with open(path, 'rb') as fp:
+        eof = False
+        while not eof:
+            chunk = fp.read(chunk_size)
+            if chunk:
+                buf += chunk
+            else:
+                eof = True
+            while True:
+                start = _find_start_line(buf)
+                if start < 0:
+                    # keep the last line, a start line may be cut by the chunk boundary
+                    buf = buf[buf.rfind(b'\n') + 1:] if not eof else b''
+                    break
+                buf = buf[start:]
+                head_end, sep_len = _find_headers_end(buf)
+                if head_end < 0:
+                    if eof:
+                        buf = b''
+                    break
+                m = _CONTENT_LENGTH_RE.search(buf, 0, head_end)
+                length = int(m.group(1)) if m else 0
+                end = head_end + sep_len + length
+                if len(buf) < end and not eof:
+                    break
+                yield RawMessage(None, buf[:end])
+                buf = buf[end:]
+
+
+def _find_start_line(buf):
+    pos = 0
+    while True:
+        m = _START_LINE_RE.match(buf, pos)
+        if m:
+            return pos
+        pos = buf.find(b'\n', pos)
+        if pos < 0:
+            return -1
+        pos += 1
+
+
+def _find_headers_end(buf):
+    crlf = buf.find(b'\r\n\r\n')
+    lf = buf.find(b'\n\n')
+    if crlf >= 0 and (lf < 0 or crlf < lf):
+        return crlf, 4
+    if lf >= 0:
+        return lf, 2
+    return -1, 0
+
+
+_PCAP_LINKTYPE_NULL = 0
+_PCAP_LINKTYPE_ETHERNET = 1
+_PCAP_LINKTYPE_RAW = 101
+_PCAP_LINKTYPE_LINUX_SLL = 113
+_PCAP_LINKTYPE_IPV4 = 228
+_PCAP_LINKTYPE_IPV6 = 229
+
+
+def iter_pcap(path):
+    """Stream SIP messages out of UDP payloads in a `pcap` capture file
+
+    :param str path: File path
+    :return: Generator of :class:`RawMessage`
+
+    Classic `pcap` format (not `pcapng`) with Ethernet, Linux cooked, loopback or raw IP link layers is supported.
+    IP fragments and non-SIP payloads are skipped.
+    """
+    with open(path, 'rb') as fp:
+        header = fp.read(24)
+        if len(header) < 24:
+            return
+        magic = header[:4]
+        if magic in (b'\xd4\xc3\xb2\xa1', b'\x4d\x3c\xb2\xa1'):
+            endian = '<'
+        elif magic in (b'\xa1\xb2\xc3\xd4', b'\xa1\xb2\x3c\x4d'):
+            endian = '>'
+        else:
+            raise ValueError('{!r} is not a pcap file'.format(path))
+        ts_div = 1e9 if magic in (b'\x4d\x3c\xb2\xa1', b'\xa1\xb2\x3c\x4d') else 1e6
+        linktype = struct.unpack(endian + 'I', header[20:24])[0]
+        rec_fmt = endian + 'IIII'
+        while True:
+            rec = fp.read(16)
+            if len(rec) < 16:
+                break
+            ts_sec, ts_frac, incl_len, _ = struct.unpack(rec_fmt, rec)
+            frame = fp.read(incl_len)
+            if len(frame) < incl_len:
+                break
+            payload = _udp_payload(frame, linktype)
+            if payload and _START_LINE_RE.match(payload):
+                yield RawMessage(ts_sec + ts_frac / ts_div, payload)
+
+
+def _udp_payload(frame, linktype):
+    if linktype == _PCAP_LINKTYPE_ETHERNET:
+        offset = 12
+        ether_type = struct.unpack('!H', frame[offset:offset + 2])[0]
+        offset += 2
+        while ether_type in (0x8100, 0x88a8):  # VLAN tags
+            ether_type = struct.unpack('!H', frame[offset + 2:offset + 4])[0]
+            offset += 4
+    elif linktype == _PCAP_LINKTYPE_LINUX_SLL:
+        ether_type = struct.unpack('!H', frame[14:16])[0]
+        offset = 16
+    elif linktype == _PCAP_LINKTYPE_NULL:
+        family = struct.unpack('=I', frame[:4])[0]
+        ether_type = 0x0800 if family == socket.AF_INET else 0x86dd
+        offset = 4
+    elif linktype in (_PCAP_LINKTYPE_RAW, _PCAP_LINKTYPE_IPV4, _PCAP_LINKTYPE_IPV6):
+        version = (bytearray(frame[:1]) or bytearray(b'\0'))[0] >> 4
+        ether_type = 0x0800 if version == 4 else 0x86dd
+        offset = 0
+    else:
+        return None
+    ip = frame[offset:]
+    if ether_type == 0x0800:
+        if len(ip) < 20:
+            return None
+        ihl = (bytearray(ip[:1])[0] & 0x0f) * 4
+        flags_frag = struct.unpack('!H', ip[6:8])[0]
+        if flags_frag & 0x3fff:  # fragmented
+            return None
+        if bytearray(ip[9:10])[0] != socket.IPPROTO_UDP:
+            return None
+        udp = ip[ihl:]
+    elif ether_type == 0x86dd:
+        if len(ip) < 40 or bytearray(ip[6:7])[0] != socket.IPPROTO_UDP:
+            return None
+        udp = ip[40:]
+    else:
+        return None
+    if len(udp) < 8:
+        return None
+    udp_len = struct.unpack('!H', udp[4:6])[0]
+    return udp[8:udp_len] if udp_len >= 8 else udp[8:]
+
+
+def snapshot(raw):
+    """Parse a raw message with oSIP and take a snapshot of its headers
+
+    :param RawMessage raw: Raw message
+    :rtype: MessageSnapshot
+    :raises OsipError: When failed to parse
+    """
+    with ParsedMessage(raw.data) as msg:
+        cseq = msg.cseq
+        from_ = msg.from_addr
+        to = msg.to_addr
+        return MessageSnapshot(
+            raw.timestamp, msg.call_id, msg.method, msg.status_code,
+            cseq.number if cseq else None, cseq.method if cseq else None,
+            from_.user if from_ else None, from_.tag if from_ else None,
+            to.user if to else None, to.tag if to else None,
+        )
+
+
+def _parse_chunk(library_path, chunk):
+    if not globs.libexosip2:
+        initialize(library_path)
+    result = []
+    errors = 0
+    for raw in chunk:
+        try:
+            result.append(snapshot(RawMessage(*raw)))
+        except (OsipError, ValueError):
+            errors += 1
+    return result, errors
+
+
+def parse_trace(source, library_path=None, max_workers=None, chunk_size=2000):
+    """Parse raw messages in a process pool, yielding snapshots in source order.
+
+    :param source: Iterable of :class:`RawMessage`, eg: :func:`iter_sip_file` or :func:`iter_pcap`
+    :param str library_path: `libeXosip2` SO/DLL path for the worker processes, see :func:`initialize`
+    :param int max_workers: Count of worker processes, default is the number of processors
+    :param int chunk_size: Count of messages sent to a worker at once
+    :return: Generator of :class:`MessageSnapshot`
+
+    At most two chunks per worker are in flight, so memory stays bounded for huge traces.
+    Messages failed to parse are skipped and logged.
+    """
+    executor = ProcessPoolExecutor(max_workers)
+    try:
+        depth = 2 * (max_workers or getattr(executor, '_max_workers', 1))
+        pending = deque()
+        chunk = []
+
+        def drain(wait_all):
+            while pending and (wait_all or len(pending) >= depth):
+                snapshots, errors = pending.popleft().result()
+                if errors:
+                    _logger.warning('parse_trace: %d message(s) failed to parse', errors)
+                for s in snapshots:
+                    yield s
+
+        for raw in source:
+            chunk.append(tuple(raw))
+            if len(chunk) >= chunk_size:
+                pending.append(executor.submit(_parse_chunk, library_path, chunk))
+                chunk = []
+                for s in drain(False):
+                    yield s
+        if chunk:
+            pending.append(executor.submit(_parse_chunk, library_path, chunk))
+        for s in drain(True):
+            yield s
+    finally:
+        executor.shutdown()
+
+
+class CallSummary(object):
+    """Figures of a call (an INVITE dialog set) in a trace
+
+    An INVITE sent again with a new CSeq after a 401/407 challenge or a 3xx redirection is a new attempt
+    of the same call: the figures are the ones of the last attempt.
+    """
+    __slots__ = ('call_id', 'caller', 'callee', 'attempts', 'invite_cseq', 'invite_time', 'ringing_time',
+                 'answer_time', 'end_time', 'final_status')
+
+    def __init__(self, call_id):
+        self.call_id = call_id
+        self.caller = None
+        self.callee = None
+        self.attempts = 0
+        self.invite_cseq = None
+        self.invite_time = None
+        self.ringing_time = None
+        self.answer_time = None
+        self.end_time = None
+        self.final_status = None
+
+    def __repr__(self):
+        return '<CallSummary call_id={!r} final_status={!r} post_dial_delay={!r}>'.format(
+            self.call_id, self.final_status, self.post_dial_delay)
+
+    @property
+    def post_dial_delay(self):
+        """Seconds from the INVITE of the last attempt to its first 180/183 (or to its final response if no ringing)
+
+        :rtype: float
+        """
+        end = self.ringing_time if self.ringing_time is not None else self.answer_time
+        if self.invite_time is None or end is None:
+            return None
+        return end - self.invite_time
+
+    @property
+    def duration(self):
+        """Seconds from answer to BYE
+
+        :rtype: float
+        """
+        if self.answer_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.answer_time
+
+    @property
+    def failed(self):
+        """Is the call finished with a final status other than 2xx
+
+        :rtype: bool
+        """
+        return self.final_status is not None and self.final_status >= 300
+
+    @property
+    def retried(self):
+        """Can the final status be followed by a new attempt: a 401/407 challenge or a 3xx redirection
+
+        :rtype: bool
+        """
+        return self.final_status in (401, 407) or (self.final_status is not None and 300 <= self.final_status < 400)
+
+
+class CallAggregator(object):
+    """Fold :class:`MessageSnapshot` records into per-call :class:`CallSummary` figures
+    """
+
+    def __init__(self):
+        #: :class:`CallSummary` objects by Call-ID
+        self.calls = {}
+        #: Counts of requests by method
+        self.methods = Counter()
+
+    def add(self, snapshot):
+        """Add a snapshot
+
+        :param MessageSnapshot snapshot: snapshot to add, in time order
+        """
+        if snapshot.method:
+            self.methods[snapshot.method] += 1
+        if snapshot.cseq_method not in ('INVITE', 'BYE') or not snapshot.call_id:
+            return
+        call = self.calls.get(snapshot.call_id)
+        if call is None:
+            if snapshot.method != 'INVITE':
+                return
+            call = self.calls[snapshot.call_id] = CallSummary(snapshot.call_id)
+        ts = snapshot.timestamp
+        if snapshot.method == 'INVITE':
+            if call.invite_cseq is None:
+                call.caller = snapshot.from_user
+                call.callee = snapshot.to_user
+            # retransmissions keep the CSeq, re-INVITEs come after a final status which is not retried
+            if snapshot.cseq_number != call.invite_cseq and (call.final_status is None or call.retried):
+                call.attempts += 1
+                call.invite_cseq = snapshot.cseq_number
+                call.invite_time = ts
+                call.ringing_time = call.end_time = call.final_status = None
+        elif snapshot.method == 'BYE':
+            if call.end_time is None:
+                call.end_time = ts
+        elif (snapshot.cseq_method == 'INVITE' and snapshot.cseq_number == call.invite_cseq
+              and call.final_status is None):
+            status = snapshot.status_code
+            if status in (180, 183):
+                if call.ringing_time is None:
+                    call.ringing_time = ts
+            elif status >= 200:
+                call.final_status = status
+                if status < 300:
+                    call.answer_time = ts
+                else:
+                    call.end_time = ts
+
+    def update(self, snapshots):
+        """Add many snapshots
+
+        :param snapshots: iterable of :class:`MessageSnapshot`, in time order
+        """
+        for s in snapshots:
+            self.add(s)
+
+    @property
+    def failure_codes(self):
+        """Counts of the final status codes of failed calls
+
+        A 401/407 or 3xx status is only counted if no new attempt followed it.
+
+        :rtype: collections.Counter
+        """
+        return Counter(c.final_status for c in self.calls.values() if c.failed)
+
+    @property
+    def post_dial_delays(self):
+        """Post-dial delays of all calls having one
+
+        :rtype: list(float)
+        """
+        return [c.post_dial_delay for c in self.calls.values() if c.post_dial_delay is not None]
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""
+Futures of eXosip2 transactions
+
+Sending an initial INVITE, a REGISTER or an in-dialog request may return a :class:`TransactionFuture`,
+which is resolved with the event of the final response.
+Provisional events (`1xx`, authentication challenges answered automatically) are streamed by
+:meth:`TransactionFuture.iter_provisional`.
+
+Futures are correlated with events by :class:`TransactionTracker`, in the context's event loop thread,
+before the events are passed to the event callback.
+
+To await a future in :mod:`asyncio`, wrap it::
+
+    with ctx.lock:
+        fut = ctx.call_send_init_invite(invite, future=True)
+    evt = await asyncio.wrap_future(fut)
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from concurrent.futures import Future
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from .error import OsipWrongState
+from .event import EventType
+
+__all__ = ['TransactionFuture', 'TransactionTracker']
+
+_CALL_PROVISIONAL = frozenset([EventType.call_proceeding, EventType.call_ringing])
+_CALL_FINAL = frozenset([
+    EventType.call_answered, EventType.call_redirected, EventType.call_requestfailure,
+    EventType.call_serverfailure, EventType.call_globalfailure, EventType.call_noanswer,
+])
+_REQUEST_PROVISIONAL = frozenset([EventType.call_message_proceeding, EventType.message_proceeding])
+_REQUEST_FINAL = frozenset([
+    EventType.call_message_answered, EventType.call_message_redirected, EventType.call_message_requestfailure,
+    EventType.call_message_serverfailure, EventType.call_message_globalfailure,
+    EventType.message_answered, EventType.message_redirected, EventType.message_requestfailure,
+    EventType.message_serverfailure, EventType.message_globalfailure,
+])
+_REGISTRATION_FINAL = frozenset([EventType.registration_success, EventType.registration_failure])
+
+_AUTH_CHALLENGES = (401, 407)
+
+
+class TransactionFuture(Future):
+    """Future of a transaction's final response
+
+    Its result is the :class:`event.Event` of the final response, whether a success or a failure.
+    Check :attr:`event.Event.type` or the status code of :attr:`event.Event.response`.
+
+    .. attention:: Done callbacks are called in the context's event loop thread, they must return quickly.
+    """
+
+    def __init__(self, kind, id_):
+        """
+        :param str kind: `'call'`, `'registration'` or `'request'`
+        :param int id_: call id, registration id or transaction id
+        """
+        super(TransactionFuture, self).__init__()
+        self._kind = kind
+        self._id = id_
+        self._provisional = queue.Queue()
+        self._challenged = False
+
+    def __repr__(self):
+        return '<TransactionFuture {}:{} {}>'.format(
+            self._kind, self._id, 'done' if self.done() else 'pending')
+
+    @property
+    def kind(self):
+        """`'call'`, `'registration'` or `'request'`
+
+        :rtype: str
+        """
+        return self._kind
+
+    @property
+    def id(self):
+        """call id, registration id or transaction id, according to :attr:`kind`
+
+        :rtype: int
+        """
+        return self._id
+
+    def iter_provisional(self, timeout=None):
+        """Iterate provisional events, until the final one
+
+        :param float timeout: Seconds to wait for each event, `None` to wait forever
+        :raises queue.Empty: If no event comes within `timeout`
+        """
+        while True:
+            evt = self._provisional.get(timeout=timeout)
+            if evt is None:
+                return
+            yield evt
+
+    def _provisional_event(self, evt):
+        self._provisional.put(evt)
+
+    def _final_event(self, evt):
+        self._provisional.put(None)
+        if self.set_running_or_notify_cancel():
+            self.set_result(evt)
+
+    def _abort(self, exc):
+        self._provisional.put(None)
+        if self.set_running_or_notify_cancel():
+            self.set_exception(exc)
+
+
+class TransactionTracker(object):
+    """Index of pending :class:`TransactionFuture` objects of a context
+
+    :meth:`update` is called with every event, in the context's event loop thread.
+    Futures are added while the context is locked, just after their request was sent,
+    so that no event of the request can be processed before.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._registrations = {}
+        self._requests = {}
+
+    def __len__(self):
+        return len(self._calls) + len(self._registrations) + len(self._requests)
+
+    @staticmethod
+    def _watch(table, kind, id_):
+        fut = table.get(id_)
+        if fut is None:
+            fut = table[id_] = TransactionFuture(kind, id_)
+        return fut
+
+    def watch_call(self, cid):
+        """Future of the final response to a call's initial INVITE
+
+        :param int cid: call id
+        :rtype: TransactionFuture
+        """
+        return self._watch(self._calls, 'call', cid)
+
+    def watch_registration(self, rid):
+        """Future of the final response to a registration's REGISTER
+
+        :param int rid: registration id
+        :rtype: TransactionFuture
+        """
+        return self._watch(self._registrations, 'registration', rid)
+
+    def watch_request(self, tid):
+        """Future of the final response to a request, in or out of dialog
+
+        :param int tid: transaction id
+        :rtype: TransactionFuture
+        """
+        return self._watch(self._requests, 'request', tid)
+
+    def update(self, evt):
+        """Resolve pending futures with an event
+
+        :param event.Event evt: Event
+        """
+        type_ = evt.type
+        if self._calls and evt.cid > 0:
+            fut = self._calls.get(evt.cid)
+            if fut is not None:
+                if type_ in _CALL_FINAL and not _retried(fut, evt):
+                    del self._calls[evt.cid]
+                    fut._final_event(evt)
+                elif type_ in _CALL_PROVISIONAL or type_ in _CALL_FINAL:
+                    fut._provisional_event(evt)
+                elif type_ == EventType.call_released:
+                    del self._calls[evt.cid]
+                    fut._abort(OsipWrongState('Call {} released without final response'.format(evt.cid)))
+        if self._registrations and type_ in _REGISTRATION_FINAL:
+            fut = self._registrations.get(evt.rid)
+            if fut is not None:
+                if _retried(fut, evt):
+                    fut._provisional_event(evt)
+                else:
+                    del self._registrations[evt.rid]
+                    fut._final_event(evt)
+        if self._requests and evt.tid > 0:
+            fut = self._requests.get(evt.tid)
+            if fut is not None:
+                if type_ in _REQUEST_FINAL:
+                    del self._requests[evt.tid]
+                    fut._final_event(evt)
+                elif type_ in _REQUEST_PROVISIONAL:
+                    fut._provisional_event(evt)
+
+    def clear(self, exc=None):
+        """Abort all pending futures
+
+        :param Exception exc: Exception set to the futures, default is :class:`error.OsipWrongState`
+        """
+        for table in (self._calls, self._registrations, self._requests):
+            while table:
+                _, fut = table.popitem()
+                fut._abort(exc or OsipWrongState('Transaction aborted'))
+
+
+def _retried(fut, evt):
+    # eXosip's automatic action answers the first authentication challenge of calls and registrations,
+    # with the same call or registration id, so that failure is not final.
+    if fut._challenged or evt.response is None or evt.response.status_code not in _AUTH_CHALLENGES:
+        return False
+    fut._challenged = True
+    return True
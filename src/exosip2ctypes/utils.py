@@ -7,8 +7,12 @@ Some helper functions
 from __future__ import absolute_import, unicode_literals
 
 import logging
+import threading
+import time
 
-__all__ = ['to_bytes', 'to_str', 'to_unicode', 'LoggerMixin']
+__all__ = ['to_bytes', 'to_str', 'to_unicode', 'LoggerMixin', 'HandleTable', 'TokenBucket']
+
+_monotonic = getattr(time, 'monotonic', time.time)
 
 if bytes != str:  # Python 3
     #: Define text string data type, same as that in Python 2.x.
@@ -93,3 +97,153 @@ class LoggerMixin(object):
         except AttributeError:
             name = '{0.__module__:s}.{0.__name__:s}'.format(self.__class__)
         return logging.getLogger(name)
+
+
+class HandleTable(object):
+    """Thread-safe table of Python objects, referred by small integer handles
+
+    A handle is a positive integer, fit for a `void*` reference field of the C library:
+    the library keeps the handle, the Python object stays in the table,
+    resolving a handle is a list index.
+
+    Handles of removed objects are reused.
+    """
+
+    def __init__(self):
+        self._objects = [None]  # handle 0 is NULL
+        self._free = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objects) - 1 - len(self._free)
+
+    def __contains__(self, handle):
+        return self.get(handle) is not None
+
+    def add(self, obj):
+        """Add an object to the table
+
+        :param obj: Any object but `None`
+        :return: The object's handle
+        :rtype: int
+        """
+        if obj is None:
+            raise ValueError('Can not add None')
+        with self._lock:
+            if self._free:
+                handle = self._free.pop()
+                self._objects[handle] = obj
+            else:
+                handle = len(self._objects)
+                self._objects.append(obj)
+        return handle
+
+    def get(self, handle, default=None):
+        """Object of a handle
+
+        :param int handle: Handle returned by :meth:`add`
+        :param default: Returned if the handle refers to no object
+        """
+        try:
+            obj = self._objects[handle] if handle > 0 else None
+        except (IndexError, TypeError):
+            obj = None
+        return default if obj is None else obj
+
+    def replace(self, handle, obj):
+        """Replace the object of a handle
+
+        :param int handle: Handle returned by :meth:`add`
+        :param obj: New object, any object but `None`
+        :raises KeyError: If the handle refers to no object
+        """
+        if obj is None:
+            raise ValueError('Can not add None')
+        with self._lock:
+            if self.get(handle) is None:
+                raise KeyError(handle)
+            self._objects[handle] = obj
+
+    def remove(self, handle):
+        """Remove the object of a handle, the handle may be reused then
+
+        :param int handle: Handle returned by :meth:`add`
+        :return: The removed object, `None` if the handle refers to no object
+        """
+        with self._lock:
+            obj = self.get(handle)
+            if obj is not None:
+                self._objects[handle] = None
+                self._free.append(handle)
+        return obj
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket, to pace operations at a steady rate with bounded bursts
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param float rate: Tokens added per second
+        :param int burst: Max tokens saved up, default is `rate` (one second of operations)
+        """
+        if rate <= 0:
+            raise ValueError('"rate" must be positive')
+        self._rate = float(rate)
+        self._burst = float(burst if burst else max(1.0, self._rate))
+        self._tokens = self._burst
+        self._stamp = _monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """Tokens added per second
+
+        :rtype: float
+        """
+        return self._rate
+
+    @property
+    def burst(self):
+        """Max tokens saved up
+
+        :rtype: float
+        """
+        return self._burst
+
+    def _refill(self):
+        now = _monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+    def delay(self, n=1):
+        """Seconds to wait before `n` tokens are available, without taking them
+
+        :param int n: Count of tokens
+        :return: `0` if they are available now
+        :rtype: float
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (min(n, self._burst) - self._tokens) / self._rate)
+
+    def take(self, n=1, block=True):
+        """Take up to `n` tokens
+
+        :param int n: Max count of tokens to take
+        :param bool block: Wait for at least one token, or else return `0` at once if none is available
+        :return: Count of tokens taken, from `1` to `n` (`0` only if not blocking)
+        :rtype: int
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                available = int(self._tokens)
+                if available >= 1:
+                    taken = min(int(n), available)
+                    self._tokens -= taken
+                    return taken
+                if not block:
+                    return 0
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)